@@ -1,6 +1,8 @@
 #pragma once
 
 #include <string>
+#include <utility>
+#include <vector>
 
 using namespace std;
 
@@ -20,6 +22,9 @@ using namespace std;
  * 
  * Output: `LINK_TEMPLATE Expression 3 NODE Symbol Similarity LINK Expression 2 NODE Symbol Concept NODE Symbol "human" VARIABLE v1`
  *
+ * The expression may be surrounded by whitespace and comments, but it must be a single
+ * parenthesized expression. Tokens are split as by `scan_tokens()`.
+ *
  * @param expression The input MeTTa expression string to be tokenized.
  * @return A tokenized string stream representing the parsed expression.
  * @throws runtime_error if the expression is invalid.
@@ -27,4 +32,23 @@ using namespace std;
 string tokenize(const string& expression);
 
 // -------------------------------------------------------------------------------------------------
+/**
+ * @brief Splits MeTTa text into tokens.
+ *
+ * Tokens are parentheses, string literals (quotes included, `\` escapes the next character) and
+ * symbols (runs of characters other than ASCII whitespace, parentheses, `"` and `;`). Comments,
+ * from `;` to the end of the line, are skipped. This is the same grammar as the pure Python
+ * tokenizer in `hyperon_das.tokenizers.metta_tokenizer`.
+ *
+ * Text may be scanned in chunks: when `final` is false, a token reaching the end of the text may
+ * continue in the next chunk, so it's returned as the remainder to be prepended to the next chunk.
+ *
+ * @param text The text to be split.
+ * @param final Whether the text ends the input.
+ * @return The tokens and the remainder of the text which wasn't scanned.
+ * @throws runtime_error if `final` is true and the text ends in the middle of a string literal.
+ */
+pair<vector<string>, string> scan_tokens(const string& text, bool final);
+
+// -------------------------------------------------------------------------------------------------
 
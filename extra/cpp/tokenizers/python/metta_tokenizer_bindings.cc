@@ -0,0 +1,34 @@
+#include <pybind11/pybind11.h>
+#include <pybind11/stl.h>
+
+#include "metta_tokenizer.h"
+
+namespace py = pybind11;
+
+// -------------------------------------------------------------------------------------------------
+/**
+ * @brief Python bindings for the MeTTa tokenizer.
+ *
+ * Builds the `_metta_tokenizer` extension module used by `hyperon_das.tokenizers.metta_tokenizer`
+ * (see `make build-python-bindings`) to tokenize expressions and to split the MeTTa files loaded
+ * by `MettaLoader` into tokens. The GIL is released while tokenizing so expressions can be
+ * tokenized by several Python threads in parallel. `runtime_error` is raised as `RuntimeError`.
+ */
+PYBIND11_MODULE(_metta_tokenizer, m) {
+    m.doc() = "Native MeTTa tokenizer";
+    m.def(
+        "tokenize",
+        &tokenize,
+        py::arg("expression"),
+        py::call_guard<py::gil_scoped_release>(),
+        "Parses a MeTTa expression into a tokenized string stream.");
+    m.def(
+        "scan_tokens",
+        &scan_tokens,
+        py::arg("text"),
+        py::arg("final"),
+        py::call_guard<py::gil_scoped_release>(),
+        "Splits MeTTa text into tokens, returning them and the remainder of the text.");
+}
+
+// -------------------------------------------------------------------------------------------------
@@ -1,79 +1,130 @@
+#include <cctype>
 #include <stdexcept>
-#include <tuple>
+#include <utility>
 #include <vector>
 
 #include "metta_tokenizer.h"
 
 using namespace std;
 
+// -------------------------------------------------------------------------------------------------
+static bool is_delimiter(char ch) {
+    return isspace(static_cast<unsigned char>(ch)) or ch == '(' or ch == ')' or ch == '"'
+           or ch == ';';
+}
+
 // -------------------------------------------------------------------------------------------------
 /**
- * @brief Parses a MeTTa expression into a tokenized string stream.
- *
- * This function processes the input MeTTa expression string starting from the given cursor position
- * and returns a pair containing the updated cursor position and the tokenized string stream.
+ * @brief Finds the end of the string literal starting at `start`.
  *
- * @param expression The input MeTTa expression string to be tokenized.
- * @param cursor The starting position in the expression string. Defaults to 0.
- * @return A pair containing the updated cursor position and the tokenized string stream.
- * @throws runtime_error if the expression is invalid.
+ * @return The position after the closing quote, or `string::npos` if the literal isn't terminated
+ *         (an escaped line break also ends it unterminated).
  */
-pair<size_t, string> _tokenize(const string& expression, size_t cursor = 0) {
-    string output;
-    string header = "LINK Expression";
-    int target_count = 0;
-    string token;
-    char ch;
-    size_t start = cursor;
-
-    for (; cursor < expression.size(); cursor++) {
-        ch = expression[cursor];
-
-        if (ch == '(') {
-            if (cursor > start) {
-                tie(cursor, token) = _tokenize(expression, cursor);
-                output += " " + token;
-                target_count++;
+static size_t string_literal_end(const string& text, size_t start) {
+    for (size_t cursor = start + 1; cursor < text.size(); cursor++) {
+        if (text[cursor] == '\\') {
+            if (cursor + 1 >= text.size() or text[cursor + 1] == '\n') {
+                return string::npos;
             }
-            continue;
-
-        } else if (ch == ')') {
-            return make_pair(cursor, header + " " + to_string(target_count) + output);
+            cursor++;
+        } else if (text[cursor] == '"') {
+            return cursor + 1;
+        }
+    }
+    return string::npos;
+}
 
-        } else if (isspace(ch)) {
+// -------------------------------------------------------------------------------------------------
+pair<vector<string>, string> scan_tokens(const string& text, bool final) {
+    vector<string> tokens;
+    size_t cursor = 0;
+    while (cursor < text.size()) {
+        char ch = text[cursor];
+        if (isspace(static_cast<unsigned char>(ch))) {
+            cursor++;
             continue;
-
-        } else {
-            token.clear();
-            while (
-                cursor < expression.size()
-                and not isspace(expression[cursor])
-                and expression[cursor] != '('
-                and expression[cursor] != ')'
-            ) {
-                token += expression[cursor++];
+        }
+        size_t end;
+        if (ch == '"') {
+            end = string_literal_end(text, cursor);
+            if (end == string::npos) {
+                if (final) {
+                    throw runtime_error("Unterminated string literal");
+                }
+                // The literal may continue in the next chunk
+                return make_pair(tokens, text.substr(cursor));
             }
-            --cursor;
-
-            if (token[0] == '$') {
-                header = "LINK_TEMPLATE Expression";
-                output += " VARIABLE " + token.substr(1);
-                target_count++;
-            } else {
-                output += " NODE Symbol " + token;
-                target_count++;
+        } else if (ch == '(' or ch == ')') {
+            end = cursor + 1;
+        } else if (ch == ';') {
+            end = text.find('\n', cursor);
+            if (end == string::npos) {
+                end = text.size();
             }
+        } else {
+            end = cursor + 1;
+            while (end < text.size() and not is_delimiter(text[end])) {
+                end++;
+            }
+        }
+        if (not final and end == text.size()) {
+            // The token may continue in the next chunk
+            return make_pair(tokens, text.substr(cursor));
+        }
+        if (ch != ';') {
+            tokens.emplace_back(text, cursor, end - cursor);
         }
+        cursor = end;
     }
-
-    throw runtime_error("Invalid expression");
+    return make_pair(tokens, string());
 }
 
 // -------------------------------------------------------------------------------------------------
 string tokenize(const string& expression) {
-    auto [_, tokenized_query] = _tokenize(expression);
-    return tokenized_query;
+    struct Frame {
+        string targets;
+        int target_count = 0;
+        bool is_template = false;
+    };
+    vector<Frame> stack;
+    string tokenized;
+    bool done = false;
+
+    for (const string& token : scan_tokens(expression, true).first) {
+        if (done) {
+            throw runtime_error("Invalid expression: unexpected tokens after the expression");
+        }
+        if (token == "(") {
+            stack.emplace_back();
+            continue;
+        }
+        if (stack.empty()) {
+            throw runtime_error("Invalid expression: unexpected token '" + token + "'");
+        }
+        string tokens;
+        if (token == ")") {
+            Frame frame = move(stack.back());
+            stack.pop_back();
+            tokens = (frame.is_template ? "LINK_TEMPLATE" : "LINK") + string(" Expression ")
+                     + to_string(frame.target_count) + frame.targets;
+            if (stack.empty()) {
+                tokenized = move(tokens);
+                done = true;
+                continue;
+            }
+        } else if (token[0] == '$') {
+            tokens = "VARIABLE " + token.substr(1);
+            stack.back().is_template = true;
+        } else {
+            tokens = "NODE Symbol " + token;
+        }
+        stack.back().targets += " " + tokens;
+        stack.back().target_count++;
+    }
+    if (not done) {
+        throw runtime_error("Invalid expression");
+    }
+    return tokenized;
 }
 
 // -------------------------------------------------------------------------------------------------
-
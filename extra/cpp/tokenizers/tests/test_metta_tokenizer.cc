@@ -1,5 +1,7 @@
 #include <gtest/gtest.h>
 
+#include <tuple>
+
 #include "metta_tokenizer.h"
 
 TEST(MettaTokenizerTest, BasicAssertions) {
@@ -24,6 +26,34 @@ TEST(MettaTokenizerTest, BasicAssertions) {
     EXPECT_EQ(actual, expected);
 }
 
+TEST(MettaTokenizerTest, StringsCommentsAndWhitespace) {
+    EXPECT_EQ(
+        tokenize("  (Concept \"human (being)\")"),
+        "LINK Expression 2 NODE Symbol Concept NODE Symbol \"human (being)\"");
+    EXPECT_EQ(
+        tokenize("(Concept ; a comment (\n human) ; another one"),
+        "LINK Expression 2 NODE Symbol Concept NODE Symbol human");
+    EXPECT_EQ(tokenize("\n(a\t$b)\n"), "LINK_TEMPLATE Expression 2 NODE Symbol a VARIABLE b");
+}
+
+TEST(MettaTokenizerTest, InvalidExpressions) {
+    vector<string> expressions = {"", "Similarity", "(Similarity a", "(a) (b)", "(a) b", ")", "(a \"b)"};
+    for (const string& expression : expressions) {
+        EXPECT_THROW(tokenize(expression), runtime_error) << expression;
+    }
+}
+
+TEST(MettaTokenizerTest, ScanTokens) {
+    auto [tokens, rest] = scan_tokens("a\"b c\"d;e\n(f) gh", false);
+    EXPECT_EQ(tokens, vector<string>({"a", "\"b c\"", "d", "(", "f", ")"}));
+    EXPECT_EQ(rest, "gh");
+
+    tie(tokens, rest) = scan_tokens("(a \"b", false);
+    EXPECT_EQ(tokens, vector<string>({"(", "a"}));
+    EXPECT_EQ(rest, "\"b");
+    EXPECT_THROW(scan_tokens("(a \"b", true), runtime_error);
+}
+
 int main(int argc, char **argv) {
     ::testing::InitGoogleTest(&argc, argv);
     return RUN_ALL_TESTS();
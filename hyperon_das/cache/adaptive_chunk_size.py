@@ -0,0 +1,108 @@
+from threading import Lock
+from typing import Any, Dict, Hashable, Optional
+
+
+class AdaptiveChunkSize:
+    """
+    AdaptiveChunkSize chooses the chunk size of the pages fetched by paginated iterators. The
+    size doubles while the consumer keeps up with the fetches (i.e. it's waiting for the next
+    page) and the fetches are fast, and it's halved when fetches are slow, when pages pile up
+    because the consumer is slow or when the consumer stops before consuming the fetched pages.
+    It always stays within the configured bounds.
+
+    The same object may be shared by several iterators (e.g. by all the iterators of a custom
+    index), so what is learned from one iteration is used by the next ones.
+    """
+
+    def __init__(
+        self,
+        chunk_size: int,
+        min_chunk_size: int = 100,
+        max_chunk_size: int = 10000,
+        target_latency: float = 0.5,
+    ) -> None:
+        """
+        Args:
+            chunk_size (int): Initial chunk size.
+            min_chunk_size (int, optional): Minimum chunk size. Defaults to 100.
+            max_chunk_size (int, optional): Maximum chunk size. Defaults to 10000.
+            target_latency (float, optional): Fetches slower than this (in seconds) make the
+                chunk size shrink. Defaults to 0.5.
+        """
+        self.min_chunk_size = max(1, min_chunk_size)
+        self.max_chunk_size = max(self.min_chunk_size, max_chunk_size)
+        self.target_latency = target_latency
+        self._chunk_size = self._bounded(chunk_size)
+        self._lock = Lock()
+
+    @property
+    def chunk_size(self) -> int:
+        return self._chunk_size
+
+    def _bounded(self, chunk_size: int) -> int:
+        return min(self.max_chunk_size, max(self.min_chunk_size, chunk_size))
+
+    def record_fetch(self, latency: float, consumer_waiting: bool, consumer_behind: bool) -> None:
+        """
+        Adjusts the chunk size after a page is fetched.
+
+        Args:
+            latency (float): Time taken by the fetch, in seconds.
+            consumer_waiting (bool): Whether the consumer had consumed all the previous pages when
+                the page arrived.
+            consumer_behind (bool): Whether the page filled up the pages waiting to be consumed.
+        """
+        with self._lock:
+            if latency > self.target_latency or (consumer_behind and not consumer_waiting):
+                self._chunk_size = self._bounded(self._chunk_size // 2)
+            elif consumer_waiting:
+                self._chunk_size = self._bounded(self._chunk_size * 2)
+
+    def record_early_stop(self) -> None:
+        """
+        Shrinks the chunk size because the consumer stopped before consuming the fetched pages.
+        """
+        with self._lock:
+            self._chunk_size = self._bounded(self._chunk_size // 2)
+
+
+class AdaptiveChunkSizes:
+    """
+    Keeps one AdaptiveChunkSize per key (e.g. per custom index), configured by the system
+    parameters 'adaptive_chunk_size', 'min_chunk_size', 'max_chunk_size' and
+    'chunk_target_latency'.
+    """
+
+    def __init__(self, system_parameters: Dict[str, Any]) -> None:
+        self.system_parameters = system_parameters
+        self.chunk_sizes: Dict[Hashable, AdaptiveChunkSize] = {}
+        self.lock = Lock()
+
+    def enabled(self) -> bool:
+        return bool(self.system_parameters.get('adaptive_chunk_size'))
+
+    def get(self, key: Hashable, chunk_size: Optional[int] = None) -> Optional[AdaptiveChunkSize]:
+        """
+        Returns the AdaptiveChunkSize of the passed key, creating it if needed.
+
+        Args:
+            key (Hashable): The key.
+            chunk_size (Optional[int], optional): Initial chunk size of a new AdaptiveChunkSize.
+                Defaults to the minimum chunk size, which favors the time to the first results.
+
+        Returns:
+            Optional[AdaptiveChunkSize]: The AdaptiveChunkSize or None if adaptive chunk sizes
+                are disabled.
+        """
+        if not self.enabled():
+            return None
+        with self.lock:
+            if key not in self.chunk_sizes:
+                min_chunk_size = self.system_parameters.get('min_chunk_size', 100)
+                self.chunk_sizes[key] = AdaptiveChunkSize(
+                    chunk_size or min_chunk_size,
+                    min_chunk_size=min_chunk_size,
+                    max_chunk_size=self.system_parameters.get('max_chunk_size', 10000),
+                    target_latency=self.system_parameters.get('chunk_target_latency', 0.5),
+                )
+            return self.chunk_sizes[key]
@@ -0,0 +1,67 @@
+import math
+
+
+class BloomFilter:
+    """
+    A set of strings with fixed memory usage which may report that a string was added when it
+    actually wasn't (false positives), with a probability bounded by `error_rate` as long as no
+    more than `capacity` strings are added. It never reports that an added string is missing.
+
+    It's used to keep track of visited atoms in traversals where the number of visited atoms is
+    too large to keep their handles in a regular set.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001) -> None:
+        """
+        Args:
+            capacity (int): Expected maximum number of added strings.
+            error_rate (float, optional): Maximum probability of false positives when no more
+                than `capacity` strings are added. Defaults to 0.001.
+        """
+        if capacity <= 0:
+            raise ValueError('BloomFilter capacity must be positive')
+        if not 0 < error_rate < 1:
+            raise ValueError('BloomFilter error_rate must be between 0 and 1')
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value: str) -> range:
+        # Double hashing: the k positions are (first + i * second) for i in [0, k). Python's
+        # string hash is randomized per process, which is fine as filters aren't persisted.
+        first = hash(value) % self.size
+        second = hash((value,)) % self.size or 1
+        return range(first, first + self.hash_count * second, second)
+
+    def add(self, value: str) -> None:
+        """
+        Adds a string to the filter.
+
+        Args:
+            value (str): The string.
+        """
+        bits = self.bits
+        size = self.size
+        added = False
+        for position in self._positions(value):
+            position %= size
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                added = True
+        if added:
+            self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        bits = self.bits
+        size = self.size
+        for position in self._positions(value):
+            position %= size
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def __len__(self) -> int:
+        # Approximate: strings colliding with previously added ones aren't counted
+        return self.count
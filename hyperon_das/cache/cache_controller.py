@@ -1,7 +1,13 @@
+import copy
+import time
+from collections import OrderedDict
+from threading import Lock
 from typing import Any, Dict, List, Optional
 
 from hyperon_das.cache.attention_broker_gateway import AttentionBrokerGateway
 from hyperon_das.context import Context
+from hyperon_das.tokenizers.dict_query_tokenizer import DictQueryTokenizer
+from hyperon_das.type_alias import Query
 from hyperon_das.utils import QueryAnswer
 
 
@@ -27,11 +33,27 @@ class CacheController:
         Args:
             system_parameters (Dict[str, Any], optional): Relevant parameters and their defaults:
             {
-                'cache_enabled': False
+                'cache_enabled': False,
+                'query_cache_enabled': False,
+                'query_cache_ttl': 60,
+                'query_cache_max_size': 1000,
+                'negative_cache_enabled': False,
+                'negative_cache_ttl': 60,
+                'negative_cache_max_size': 100000,
+                'traverse_prefetch': False,
+                'traverse_cache_ttl': 60,
+                'traverse_cache_max_size': 10000
             }
         """
         self.system_parameters = system_parameters
         self.atom_table = {}
+        self.query_answer_table = OrderedDict()
+        self.query_answer_table_lock = Lock()
+        self.nonexistent_handles = OrderedDict()
+        self.nonexistent_handles_lock = Lock()
+        self.incoming_links_table = OrderedDict()
+        self.incoming_links_table_lock = Lock()
+        self.incoming_links_version = 0
         if self.enabled():
             self.attention_broker = AttentionBrokerGateway(system_parameters)
 
@@ -41,6 +63,26 @@ class CacheController:
         """
         return self.system_parameters.get("cache_enabled")
 
+    def query_cache_enabled(self):
+        """
+        Returns True iff the query answer cache is enabled (as defined by a system parameter).
+        """
+        return self.system_parameters.get("query_cache_enabled")
+
+    def negative_cache_enabled(self):
+        """
+        Returns True iff the cache of nonexistent handles is enabled (as defined by a system
+        parameter).
+        """
+        return self.system_parameters.get("negative_cache_enabled")
+
+    def traverse_prefetch_enabled(self):
+        """
+        Returns True iff traversal cursors prefetch the incoming links of their neighborhood into
+        the cache (as defined by a system parameter).
+        """
+        return self.system_parameters.get("traverse_prefetch")
+
     def regard_query_answer(self, query_answer: List[QueryAnswer]):
         """
         Feed this CacheController with the answers of a query made by an user. These answers are
@@ -98,3 +140,200 @@ class CacheController:
             List[Dict[str, Any]]
         """
         raise NotImplementedError()
+
+    def is_nonexistent_handle(self, handle: str) -> bool:
+        """
+        Returns True iff the passed handle is known not to exist in the remote DAS, i.e. a
+        previous lookup of this handle failed and the entry hasn't expired yet.
+
+        Args:
+            handle (str): Atom handle.
+
+        Returns:
+            bool: True if the handle is known to be nonexistent.
+        """
+        if not self.negative_cache_enabled():
+            return False
+        with self.nonexistent_handles_lock:
+            expiration_time = self.nonexistent_handles.get(handle)
+            if expiration_time is None:
+                return False
+            if expiration_time < time.monotonic():
+                del self.nonexistent_handles[handle]
+                return False
+            return True
+
+    def add_nonexistent_handle(self, handle: str) -> None:
+        """
+        Records that the passed handle doesn't exist in the remote DAS so repeated lookups can be
+        answered locally.
+
+        The set of nonexistent handles is bounded by the system parameters
+        'negative_cache_max_size' (oldest entries are evicted first) and 'negative_cache_ttl'
+        (in seconds).
+
+        Args:
+            handle (str): Atom handle.
+        """
+        if not self.negative_cache_enabled():
+            return
+        ttl = self.system_parameters.get("negative_cache_ttl", 60)
+        max_size = self.system_parameters.get("negative_cache_max_size", 100000)
+        with self.nonexistent_handles_lock:
+            self.nonexistent_handles[handle] = time.monotonic() + ttl
+            self.nonexistent_handles.move_to_end(handle)
+            while len(self.nonexistent_handles) > max_size:
+                self.nonexistent_handles.popitem(last=False)
+
+    def invalidate_nonexistent_handles(self) -> None:
+        """
+        Discards all the handles recorded as nonexistent.
+        """
+        with self.nonexistent_handles_lock:
+            self.nonexistent_handles.clear()
+
+    @staticmethod
+    def _query_answer_key(query: Query, parameters: Optional[Dict[str, Any]]) -> Optional[str]:
+        if isinstance(query, list):
+            query = {"and": query}
+        try:
+            tokens = DictQueryTokenizer.tokenize(query)
+        except (ValueError, AttributeError):
+            return None
+        parameters = {k: v for k, v in (parameters or {}).items() if k != "no_iterator"}
+        return f"{tokens} {sorted(parameters.items(), key=lambda item: item[0])}"
+
+    def get_query_answer(
+        self, query: Query, parameters: Optional[Dict[str, Any]] = None
+    ) -> Optional[List[QueryAnswer]]:
+        """
+        Returns the cached answer of a previous execution of the passed query or None if there's
+        no such answer in the cache or if it's expired.
+
+        Queries are identified by their canonical tokenized representation (as produced by
+        DictQueryTokenizer) plus the query parameters.
+
+        Args:
+            query (Query): The query.
+            parameters (Optional[Dict[str, Any]]): The query parameters.
+
+        Returns:
+            Optional[List[QueryAnswer]]: A copy of the cached answer or None.
+        """
+        if not self.query_cache_enabled():
+            return None
+        key = self._query_answer_key(query, parameters)
+        if key is None:
+            return None
+        with self.query_answer_table_lock:
+            entry = self.query_answer_table.get(key)
+            if entry is None:
+                return None
+            expiration_time, answer = entry
+            if expiration_time < time.monotonic():
+                del self.query_answer_table[key]
+                return None
+            self.query_answer_table.move_to_end(key)
+        # Answers are copied so callers can't change the cached ones
+        return copy.deepcopy(answer)
+
+    def add_query_answer(
+        self,
+        query: Query,
+        parameters: Optional[Dict[str, Any]],
+        answer: List[QueryAnswer],
+    ) -> None:
+        """
+        Stores the answer of a query so subsequent executions of the same query (with the same
+        parameters) can be answered without hitting the remote DAS.
+
+        The cache is bounded by the system parameters 'query_cache_max_size' (least recently used
+        entries are evicted first) and 'query_cache_ttl' (in seconds).
+
+        Args:
+            query (Query): The query.
+            parameters (Optional[Dict[str, Any]]): The query parameters.
+            answer (List[QueryAnswer]): The query answer.
+        """
+        if not self.query_cache_enabled():
+            return
+        key = self._query_answer_key(query, parameters)
+        if key is None:
+            return
+        ttl = self.system_parameters.get("query_cache_ttl", 60)
+        max_size = self.system_parameters.get("query_cache_max_size", 1000)
+        with self.query_answer_table_lock:
+            self.query_answer_table[key] = (time.monotonic() + ttl, copy.deepcopy(answer))
+            self.query_answer_table.move_to_end(key)
+            while len(self.query_answer_table) > max_size:
+                self.query_answer_table.popitem(last=False)
+
+    def invalidate_query_answers(self) -> None:
+        """
+        Discards all cached query answers. It's supposed to be called whenever the contents of the
+        AtomSpace change (e.g. atoms are added, fetched or committed).
+        """
+        with self.query_answer_table_lock:
+            self.query_answer_table.clear()
+
+    def get_incoming_links(self, handle: str) -> Optional[List[Any]]:
+        """
+        Returns the cached incoming links (with their targets documents) of the passed atom or
+        None if they aren't in the cache or if they're expired.
+
+        Args:
+            handle (str): Atom handle.
+
+        Returns:
+            Optional[List[Any]]: A copy of the cached incoming links or None.
+        """
+        if not self.traverse_prefetch_enabled():
+            return None
+        with self.incoming_links_table_lock:
+            entry = self.incoming_links_table.get(handle)
+            if entry is None:
+                return None
+            expiration_time, links = entry
+            if expiration_time < time.monotonic():
+                del self.incoming_links_table[handle]
+                return None
+            self.incoming_links_table.move_to_end(handle)
+        # Link documents are copied because traversal iterators change them
+        return [dict(link) if isinstance(link, dict) else link for link in links]
+
+    def add_incoming_links(
+        self, handle: str, links: List[Any], version: Optional[int] = None
+    ) -> None:
+        """
+        Stores the incoming links (with their targets documents) of an atom so traversal cursors
+        can get them without hitting the DAS.
+
+        The cache is bounded by the system parameters 'traverse_cache_max_size' (least recently
+        used entries are evicted first) and 'traverse_cache_ttl' (in seconds).
+
+        Args:
+            handle (str): Atom handle.
+            links (List[Any]): The incoming links of the atom.
+            version (Optional[int]): Value of `incoming_links_version` when the links were
+                requested. The links are discarded if the cache was invalidated since then.
+        """
+        if not self.traverse_prefetch_enabled():
+            return
+        ttl = self.system_parameters.get("traverse_cache_ttl", 60)
+        max_size = self.system_parameters.get("traverse_cache_max_size", 10000)
+        with self.incoming_links_table_lock:
+            if version is not None and version != self.incoming_links_version:
+                return
+            self.incoming_links_table[handle] = (time.monotonic() + ttl, list(links))
+            self.incoming_links_table.move_to_end(handle)
+            while len(self.incoming_links_table) > max_size:
+                self.incoming_links_table.popitem(last=False)
+
+    def invalidate_incoming_links(self) -> None:
+        """
+        Discards all cached incoming links. It's supposed to be called whenever the contents of
+        the AtomSpace change (e.g. atoms are added, fetched or committed).
+        """
+        with self.incoming_links_table_lock:
+            self.incoming_links_table.clear()
+            self.incoming_links_version += 1
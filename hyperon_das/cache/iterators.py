@@ -1,14 +1,20 @@
 import copy
+import time
+import weakref
 from abc import ABC, abstractmethod
 from collections import deque
+from functools import partial
 from itertools import product
-from threading import Semaphore, Thread
+from threading import Condition
 from typing import Any, Dict, Iterator, List
 
 from hyperon_das_atomdb import WILDCARD
 from hyperon_das_atomdb.database import LinkT
 
 import hyperon_das.link_filters as link_filters
+from hyperon_das.cache.adaptive_chunk_size import AdaptiveChunkSize
+from hyperon_das.cache.bloom_filter import BloomFilter
+from hyperon_das.cache.page_fetch_executor import PageFetchExecutor, default_page_fetch_executor
 from hyperon_das.query_engines.query_engine_protocol import QueryEngine
 from hyperon_das.utils import Assignment, QueryAnswer
 
@@ -98,8 +104,8 @@ class LazyQueryEvaluator(ProductIterator):
 
     def _replace_target_handles(self, link: LinkT) -> Dict[str, Any]:
         targets_documents = []
-        for target_handle in link.targets:
-            atom = self.query_engine.get_atom(target_handle)
+        # A remote engine fetches all the missing targets in a single (batch) request
+        for atom in self.query_engine.get_atoms(link.targets):
             if isinstance(atom, LinkT):
                 atom = self._replace_target_handles(atom)
             targets_documents.append(atom)
@@ -157,21 +163,141 @@ class LazyQueryEvaluator(ProductIterator):
         return next_value
 
 
+DEFAULT_PREFETCH_PAGES = 2
+"""Default maximum number of pages fetched ahead of the consumer by paginated iterators."""
+
+
+class PagePipeline:
+    """
+    Bounded buffer of pages shared by a paginated iterator (the consumer) and the fetches of its
+    next pages (the producer). A fetch is only scheduled while there's room for its page and the
+    consumer blocks while there's no page available, so pages are fetched ahead of the consumer
+    but never too far ahead.
+    """
+
+    def __init__(self, max_pages: int = DEFAULT_PREFETCH_PAGES) -> None:
+        """
+        Args:
+            max_pages (int, optional): Maximum number of pages fetched ahead of the consumer,
+                counting the ones waiting to be consumed and the one being fetched. Defaults to
+                DEFAULT_PREFETCH_PAGES.
+        """
+        self.max_pages = max(1, max_pages)
+        self.pages: deque[list[Any]] = deque()
+        self.condition = Condition()
+        self.closed = False
+        self.finished = False
+        self.fetching = False
+        self.error: Exception | None = None
+
+    def reserve(self) -> bool:
+        """
+        Reserves room for the next page. At most one page is fetched at a time, since each fetch
+        needs the cursor returned by the previous one.
+
+        Returns:
+            bool: True if the producer should fetch the next page, False if the pipeline is
+                full, closed or finished, or if a page is already being fetched.
+        """
+        with self.condition:
+            if self.closed or self.finished or self.fetching:
+                return False
+            if len(self.pages) >= self.max_pages:
+                return False
+            self.fetching = True
+            return True
+
+    def put(self, page: list[Any], last: bool) -> int:
+        """
+        Hands a page over to the consumer.
+
+        Args:
+            page (list[Any]): The page.
+            last (bool): Whether this is the last page.
+
+        Returns:
+            int: Number of pages which were waiting to be consumed when this one arrived.
+        """
+        with self.condition:
+            backlog = len(self.pages)
+            if not self.closed:
+                self.pages.append(page)
+            self.finished = last
+            self.fetching = False
+            self.condition.notify_all()
+            return backlog
+
+    def fail(self, error: Exception) -> None:
+        """
+        Stops the pipeline because fetching a page failed. The error is raised to the consumer
+        once it consumes the pages fetched before the failure.
+
+        Args:
+            error (Exception): The error.
+        """
+        with self.condition:
+            self.error = error
+            self.finished = True
+            self.fetching = False
+            self.condition.notify_all()
+
+    def get(self) -> list[Any] | None:
+        """
+        Blocks the consumer until the next page is available.
+
+        Returns:
+            list[Any] | None: The next page or None if there are no more pages.
+
+        Raises:
+            Exception: The error which stopped the producer, if any.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.pages or self.finished or self.closed)
+            if self.pages:
+                page = self.pages.popleft()
+                self.condition.notify_all()
+                return page
+            if self.error is not None and not self.closed:
+                raise self.error
+            return None
+
+    def close(self) -> bool:
+        """
+        Discards the pages which weren't consumed yet and stops the producer (a page being fetched
+        at the moment is discarded as well).
+
+        Returns:
+            bool: True if pages were discarded, i.e. the consumer stopped before the end.
+        """
+        with self.condition:
+            discarded = not self.closed and bool(self.pages or self.fetching)
+            self.closed = True
+            self.pages.clear()
+            self.condition.notify_all()
+            return discarded
+
+
 class BaseLinksIterator(QueryAnswerIterator, ABC):
     def __init__(self, source: ListIterator, **kwargs) -> None:
         super().__init__(source)
+        self.pipeline = None
         if not self.source.is_empty():
             if not hasattr(self, 'backend'):
                 self.backend = kwargs.get('backend')
             self.chunk_size = kwargs.get('chunk_size', 1000)
             self.cursor = kwargs.get('cursor', 0)
-            self.buffer_queue = deque()
+            self.chunk_sizer: AdaptiveChunkSize | None = kwargs.get('chunk_sizer')
             self.iterator = self.source
             self.current_value = self.get_current_value()
-            self.fetch_data_thread = Thread(target=self._fetch_data)
             if self.cursor not in (0, None):
-                self.semaphore = Semaphore(1)
-                self.fetch_data_thread.start()
+                self.executor: PageFetchExecutor = (
+                    kwargs.get('executor') or default_page_fetch_executor()
+                )
+                self.pipeline = PagePipeline(kwargs.get('prefetch_pages', DEFAULT_PREFETCH_PAGES))
+                self._schedule_fetch()
+
+    def __del__(self) -> None:
+        self.close()
 
     def __next__(self) -> Any:
         if self.iterator:
@@ -180,39 +306,63 @@ class BaseLinksIterator(QueryAnswerIterator, ABC):
             except StopIteration as e:
                 self.current_value = None
                 self.iterator = None
-                if self.fetch_data_thread.is_alive():
-                    self.fetch_data_thread.join()
-                if self.cursor in (0, None) and len(self.buffer_queue) == 0:
-                    self.current_value = None
+                page = self.pipeline.get() if self.pipeline is not None else None
+                if page is None:
+                    self.close()
                     raise e
-                self._refresh_iterator()
-                self.fetch_data_thread = Thread(target=self._fetch_data)
-                if self.cursor != 0:
-                    self.fetch_data_thread.start()
+                self._schedule_fetch()
+                self._refresh_iterator(page)
                 return self.__next__()
         raise StopIteration
 
-    def _fetch_data(self) -> None:
-        kwargs = self.get_fetch_data_kwargs()
-        while True:
-            if self.semaphore.acquire(blocking=False):
-                try:
-                    cursor, answer = self.get_fetch_data(**kwargs)
-                    self.cursor = cursor
-                    self.buffer_queue.extend(answer)
-                finally:
-                    self.semaphore.release()
-                break
+    def close(self) -> None:
+        """
+        Stops fetching pages. It's supposed to be called when the consumer stops iterating before
+        the iterator is exhausted.
+        """
+        if getattr(self, 'pipeline', None) is not None:
+            if self.pipeline.close() and self.chunk_sizer is not None:
+                self.chunk_sizer.record_early_stop()
+            self.executor.cancel(self.pipeline)
+
+    def _schedule_fetch(self) -> None:
+        if self.pipeline.reserve():
+            # Fetches don't keep the iterator alive, so an iterator abandoned by its consumer is
+            # collected and its pipeline closed.
+            self.executor.submit(
+                self.pipeline,
+                partial(BaseLinksIterator._fetch_page, weakref.ref(self), self.pipeline),
+            )
 
-    def _refresh_iterator(self) -> None:
-        if self.semaphore.acquire(blocking=False):
-            try:
-                self.source = ListIterator(list(self.buffer_queue))
-                self.iterator = self.source
-                self.current_value = self.get_current_value()
-                self.buffer_queue.clear()
-            finally:
-                self.semaphore.release()
+    @staticmethod
+    def _fetch_page(iterator_ref: weakref.ref, pipeline: PagePipeline) -> None:
+        iterator = iterator_ref()
+        if iterator is None:
+            pipeline.close()
+            return
+        if iterator.chunk_sizer is not None:
+            iterator.chunk_size = iterator.chunk_sizer.chunk_size
+        start = time.perf_counter()
+        try:
+            cursor, page = iterator.get_fetch_data(**iterator.get_fetch_data_kwargs())
+        except Exception as e:
+            pipeline.fail(e)
+            return
+        latency = time.perf_counter() - start
+        iterator.cursor = cursor
+        backlog = pipeline.put(page, cursor in (0, None))
+        if iterator.chunk_sizer is not None:
+            iterator.chunk_sizer.record_fetch(
+                latency,
+                consumer_waiting=backlog == 0,
+                consumer_behind=backlog + 1 >= pipeline.max_pages,
+            )
+        iterator._schedule_fetch()
+
+    def _refresh_iterator(self, page: list[Any]) -> None:
+        self.source = ListIterator(page)
+        self.iterator = self.source
+        self.current_value = self.get_current_value()
 
     def is_empty(self) -> bool:
         return not self.iterator
@@ -234,10 +384,19 @@ class BaseLinksIterator(QueryAnswerIterator, ABC):
         raise NotImplementedError("Subclasses must implement get_fetch_data method")
 
 
+INCOMING_LINKS_FILTERS = ('link_type', 'cursor_position', 'target_type')
+"""Structural filters of incoming links which are applied by the backend (or remote server)."""
+
+
+def _incoming_links_filters(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: kwargs[key] for key in INCOMING_LINKS_FILTERS if kwargs.get(key) is not None}
+
+
 class LocalIncomingLinks(BaseLinksIterator):
     def __init__(self, source: ListIterator, **kwargs) -> None:
         self.atom_handle = kwargs.get('atom_handle')
         self.targets_document = kwargs.get('targets_document', False)
+        self.filters = _incoming_links_filters(kwargs)
         super().__init__(source, **kwargs)
 
     def get_next_value(self) -> Any:
@@ -259,7 +418,12 @@ class LocalIncomingLinks(BaseLinksIterator):
                 return None
 
     def get_fetch_data_kwargs(self) -> Dict[str, Any]:
-        return {'handles_only': True, 'cursor': self.cursor, 'chunk_size': self.chunk_size}
+        return {
+            'handles_only': True,
+            'cursor': self.cursor,
+            'chunk_size': self.chunk_size,
+            **self.filters,
+        }
 
     def get_fetch_data(self, **kwargs) -> tuple:
         if self.backend:
@@ -270,25 +434,13 @@ class RemoteIncomingLinks(BaseLinksIterator):
     def __init__(self, source: ListIterator, **kwargs) -> None:
         self.atom_handle = kwargs.get('atom_handle')
         self.targets_document = kwargs.get('targets_document', False)
-        self.returned_handles = set()
+        self.filters = _incoming_links_filters(kwargs)
         super().__init__(source, **kwargs)
 
     def get_next_value(self) -> Any:
+        # Pages are requested with continuation tokens, which never return a link twice
         if not self.is_empty():
-            while True:
-                link_document = next(self.iterator)
-                if isinstance(link_document, tuple) or isinstance(link_document, list):
-                    handle = link_document[0]['handle']
-                elif isinstance(link_document, dict):
-                    handle = link_document['handle']
-                elif isinstance(link_document, str):
-                    handle = link_document
-                else:
-                    raise ValueError(f"Invalid link document: {link_document}")
-                if handle not in self.returned_handles:
-                    self.returned_handles.add(handle)
-                    self.current_value = link_document
-                    break
+            self.current_value = next(self.iterator)
         return self.current_value
 
     def get_current_value(self) -> Any:
@@ -299,23 +451,34 @@ class RemoteIncomingLinks(BaseLinksIterator):
 
     def get_fetch_data_kwargs(self) -> Dict[str, Any]:
         return {
-            'cursor': self.cursor,
+            'continuation_token': self.cursor,
             'chunk_size': self.chunk_size,
             'targets_document': self.targets_document,
+            **self.filters,
         }
 
     def get_fetch_data(self, **kwargs) -> tuple:
         if self.backend:
-            return self.backend.get_incoming_links(self.atom_handle, **kwargs)
+            return self.backend.get_incoming_links_page(self.atom_handle, **kwargs)
 
 
 class CustomQuery(BaseLinksIterator):
     def __init__(self, source: ListIterator, **kwargs) -> None:
         self.index_id = kwargs.pop('index_id', None)
+        self.query = kwargs.pop('query', [])
         self.backend = kwargs.pop('backend', None)
         self.is_remote = kwargs.pop('is_remote', False)
+        prefetch_pages = kwargs.pop('prefetch_pages', DEFAULT_PREFETCH_PAGES)
+        executor = kwargs.pop('executor', None)
+        chunk_sizer = kwargs.pop('chunk_sizer', None)
         self.kwargs = kwargs
-        super().__init__(source, **kwargs)
+        super().__init__(
+            source,
+            prefetch_pages=prefetch_pages,
+            executor=executor,
+            chunk_sizer=chunk_sizer,
+            **kwargs,
+        )
 
     def get_next_value(self) -> Any:
         if not self.is_empty():
@@ -336,13 +499,14 @@ class CustomQuery(BaseLinksIterator):
     def get_fetch_data(self, **kwargs) -> tuple:
         if self.backend:
             if self.is_remote:
-                return self.backend.custom_query(
-                    self.index_id, query=kwargs.get('query', []), **kwargs
+                # Remote scans are paged with continuation tokens
+                kwargs = dict(kwargs)
+                continuation_token = kwargs.pop('cursor')
+                return self.backend.custom_query_page(
+                    self.index_id, self.query, continuation_token, **kwargs
                 )
             else:
-                return self.backend.get_atoms_by_index(
-                    self.index_id, query=kwargs.get('query', []), **kwargs
-                )
+                return self.backend.get_atoms_by_index(self.index_id, query=self.query, **kwargs)
 
 
 class TraverseLinksIterator(QueryAnswerIterator):
@@ -446,7 +610,17 @@ class TraverseNeighborsIterator(QueryAnswerIterator):
         self.buffered_answer = None
         self.cursor = self.source.cursor
         self.target_type = self.source.target_type
-        self.visited_neighbors = []
+        # Neighbors reachable through several links are returned only once. When
+        # `visited_capacity` is passed, visited neighbors are kept in a BloomFilter, so memory
+        # usage is bounded but some neighbors (with probability `visited_error_rate`) may be
+        # mistaken for visited ones and skipped.
+        visited_capacity = kwargs.get('visited_capacity')
+        if visited_capacity:
+            self.visited_neighbors: set[str] | BloomFilter = BloomFilter(
+                visited_capacity, kwargs.get('visited_error_rate', 0.001)
+            )
+        else:
+            self.visited_neighbors = set()
         self.custom_filter = kwargs.get('filter')
         if not self.source.is_empty():
             self.iterator = source
@@ -480,16 +654,16 @@ class TraverseNeighborsIterator(QueryAnswerIterator):
         for target in targets:
             if self._filter(target):
                 match_found = True
-                self.visited_neighbors.append(target['handle'])
+                self.visited_neighbors.add(target['handle'])
                 answer.append(target)
         return (answer, match_found)
 
     def _filter(self, target: Dict[str, Any]) -> bool:
         handle = target['handle']
-        if not (
-            self.cursor != handle
-            and handle not in self.visited_neighbors
-            and (self.target_type == target['named_type'] or not self.target_type)
+        if (
+            handle == self.cursor
+            or (self.target_type and self.target_type != target['named_type'])
+            or handle in self.visited_neighbors
         ):
             return False
 
@@ -0,0 +1,151 @@
+from collections import deque
+from threading import Condition, Lock, Thread
+from typing import Callable, Deque, Dict, Hashable, List, Optional
+
+from hyperon_das.logger import logger
+
+DEFAULT_MAX_IN_FLIGHT = 8
+"""Default maximum number of page fetches running at the same time in a PageFetchExecutor."""
+
+
+class PageFetchExecutor:
+    """
+    PageFetchExecutor runs the page fetches of paginated iterators in a bounded set of worker
+    threads shared by all the iterators, so the number of threads (and of requests in flight)
+    doesn't grow with the number of open iterators.
+
+    Fetches are submitted on behalf of an owner (usually an iterator). Owners with pending
+    fetches are served in turns, one fetch each, so an owner submitting many fetches doesn't
+    delay the others.
+    """
+
+    def __init__(self, max_in_flight: int = DEFAULT_MAX_IN_FLIGHT) -> None:
+        """
+        Args:
+            max_in_flight (int, optional): Maximum number of fetches running at the same time,
+                which is also the maximum number of worker threads. Defaults to
+                DEFAULT_MAX_IN_FLIGHT.
+        """
+        self.max_in_flight = max(1, max_in_flight)
+        self.tasks: Dict[Hashable, Deque[Callable[[], None]]] = {}
+        self.turns: Deque[Hashable] = deque()
+        self.pending = 0
+        self.in_flight = 0
+        self.idle_workers = 0
+        self.workers: List[Thread] = []
+        self.shut_down = False
+        self.condition = Condition()
+
+    def submit(self, owner: Hashable, task: Callable[[], None]) -> None:
+        """
+        Schedules a fetch. Fetches of the same owner run in the order they are submitted.
+
+        Args:
+            owner (Hashable): Owner of the fetch.
+            task (Callable[[], None]): The fetch. Errors should be handled by the task itself,
+                they are only logged here.
+
+        Raises:
+            RuntimeError: If the executor was shut down.
+        """
+        with self.condition:
+            if self.shut_down:
+                raise RuntimeError('PageFetchExecutor was shut down')
+            if owner not in self.tasks:
+                self.tasks[owner] = deque()
+                self.turns.append(owner)
+            self.tasks[owner].append(task)
+            self.pending += 1
+            if self.pending > self.idle_workers and len(self.workers) < self.max_in_flight:
+                worker = Thread(target=self._work, name='das-page-fetch', daemon=True)
+                self.workers.append(worker)
+                worker.start()
+            self.condition.notify_all()
+
+    def cancel(self, owner: Hashable) -> None:
+        """
+        Discards the fetches of the passed owner which haven't started yet.
+
+        Args:
+            owner (Hashable): Owner of the fetches.
+        """
+        with self.condition:
+            tasks = self.tasks.pop(owner, None)
+            if tasks is not None:
+                self.pending -= len(tasks)
+                self.turns.remove(owner)
+                self.condition.notify_all()
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until there are no pending or running fetches.
+
+        Args:
+            timeout (Optional[float], optional): Maximum time to wait, in seconds. Defaults to
+                None (wait forever).
+
+        Returns:
+            bool: False if the timeout expired, True otherwise.
+        """
+        with self.condition:
+            return self.condition.wait_for(lambda: not self.pending and not self.in_flight, timeout)
+
+    def shutdown(self) -> None:
+        """
+        Stops the worker threads, discarding the fetches which haven't started yet.
+        """
+        with self.condition:
+            self.shut_down = True
+            self.tasks.clear()
+            self.turns.clear()
+            self.pending = 0
+            self.condition.notify_all()
+
+    def _next_task(self) -> Callable[[], None]:
+        owner = self.turns.popleft()
+        tasks = self.tasks[owner]
+        task = tasks.popleft()
+        if tasks:
+            self.turns.append(owner)
+        else:
+            del self.tasks[owner]
+        self.pending -= 1
+        return task
+
+    def _work(self) -> None:
+        while True:
+            with self.condition:
+                self.idle_workers += 1
+                self.condition.wait_for(lambda: self.turns or self.shut_down)
+                self.idle_workers -= 1
+                if self.shut_down:
+                    return
+                task = self._next_task()
+                self.in_flight += 1
+            try:
+                task()
+            except Exception as e:
+                logger().error(f'Page fetch failed: {str(e)}')
+            finally:
+                with self.condition:
+                    self.in_flight -= 1
+                    self.condition.notify_all()
+
+
+_default_executor: Optional[PageFetchExecutor] = None
+_default_executor_lock = Lock()
+
+
+def default_page_fetch_executor() -> PageFetchExecutor:
+    """
+    Returns the process-wide PageFetchExecutor used by paginated iterators which aren't given
+    one (i.e. iterators created outside of a DistributedAtomSpace).
+
+    Returns:
+        PageFetchExecutor: The executor.
+    """
+    global _default_executor
+    with _default_executor_lock:
+        if _default_executor is None:
+            _default_executor = PageFetchExecutor()
+        return _default_executor
@@ -0,0 +1,203 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Condition
+from typing import Any, Callable, Dict, List, Optional
+
+from hyperon_das_atomdb.database import HandleT
+
+from hyperon_das.cache.cache_controller import CacheController
+from hyperon_das.logger import logger
+
+
+def neighbor_handles(handle: HandleT, links: List[Any]) -> List[HandleT]:
+    """
+    Returns the handles of the targets of the passed incoming links of an atom (i.e. its
+    neighbors), in the order they appear in the links, without repetitions and without the atom
+    itself.
+
+    Args:
+        handle (HandleT): Handle of the atom.
+        links (List[Any]): Incoming links of the atom, either dicts with a 'targets_document' key,
+            (link, targets documents) tuples or links of a local backend (LinkT).
+
+    Returns:
+        List[HandleT]: The neighbors' handles.
+    """
+    neighbors: Dict[HandleT, None] = {}
+    for link in links:
+        if isinstance(link, tuple):
+            targets = [target['handle'] for target in link[1]]
+        elif isinstance(link, dict):
+            targets = [target['handle'] for target in link.get('targets_document', [])]
+        else:
+            targets = getattr(link, 'targets', None) or []
+        for target in targets:
+            if target != handle:
+                neighbors[target] = None
+    return list(neighbors)
+
+
+class TraversePrefetcher:
+    """
+    TraversePrefetcher warms up the cache of incoming links used by traversal cursors. When a
+    cursor moves to an atom, the incoming links of the atom's neighbors (which are the likely next
+    positions of the cursor) are fetched in background threads and stored in the cache, so
+    follow_link() and get_neighbors() usually don't have to wait for the DAS. Optionally, the
+    neighbors of these neighbors are prefetched as well, and so on.
+
+    Links being fetched aren't requested again: callers asking for them wait for the ongoing
+    request instead.
+    """
+
+    def __init__(
+        self,
+        fetch_incoming_links: Callable[[HandleT], List[Any]],
+        cache_controller: CacheController,
+        depth: int = 1,
+        max_neighbors: int = 10,
+        max_workers: int = 4,
+    ) -> None:
+        """
+        Args:
+            fetch_incoming_links (Callable[[HandleT], List[Any]]): Function used to fetch all the
+                incoming links (with their targets documents) of an atom.
+            cache_controller (CacheController): Cache where the fetched links are stored.
+            depth (int, optional): Number of hops away from the cursor whose links are
+                prefetched. Defaults to 1 (only the cursor's neighbors).
+            max_neighbors (int, optional): Maximum number of neighbors of each atom whose links
+                are prefetched. Defaults to 10.
+            max_workers (int, optional): Number of background threads. Defaults to 4.
+        """
+        self.fetch_incoming_links = fetch_incoming_links
+        self.cache_controller = cache_controller
+        self.depth = depth
+        self.max_neighbors = max_neighbors
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='das-traverse-prefetch'
+        )
+        self.in_flight: Dict[HandleT, Future] = {}
+        self.pending_callbacks = 0
+        self.condition = Condition()
+        self.closed = False
+
+    def get_incoming_links(self, handle: HandleT) -> Optional[List[Any]]:
+        """
+        Returns the incoming links of the passed atom if they are in the cache or being fetched
+        (in which case the caller waits for them).
+
+        Args:
+            handle (HandleT): Atom handle.
+
+        Returns:
+            Optional[List[Any]]: The incoming links or None if they weren't prefetched (or the
+                prefetch failed).
+        """
+        links = self.cache_controller.get_incoming_links(handle)
+        if links is not None:
+            return links
+        with self.condition:
+            future = self.in_flight.get(handle)
+        if future is None:
+            return None
+        try:
+            future.result()
+        except Exception:
+            return None
+        return self.cache_controller.get_incoming_links(handle)
+
+    def prefetch(self, handle: HandleT, depth: Optional[int] = None) -> None:
+        """
+        Fetches, in background, the incoming links of the passed atom and of its neighborhood.
+
+        Args:
+            handle (HandleT): Atom handle (usually the current position of a cursor).
+            depth (Optional[int], optional): Number of hops away from the atom whose links are
+                prefetched. Defaults to the depth passed to the constructor.
+        """
+        if self.closed:
+            return
+        depth = self.depth if depth is None else depth
+        future = self._fetch(handle)
+        if depth > 0:
+            with self.condition:
+                self.pending_callbacks += 1
+            future.add_done_callback(lambda f: self._on_fetched(handle, f, depth))
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until all the ongoing prefetches are finished.
+
+        Args:
+            timeout (Optional[float], optional): Maximum time to wait, in seconds. Defaults to
+                None (wait forever).
+
+        Returns:
+            bool: False if the timeout expired, True otherwise.
+        """
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: not self.in_flight and self.pending_callbacks == 0, timeout
+            )
+
+    def shutdown(self) -> None:
+        """
+        Stops the background threads, discarding prefetches that haven't started yet. Later
+        calls to prefetch() have no effect. Calling shutdown() more than once has no effect.
+        """
+        with self.condition:
+            if self.closed:
+                return
+            self.closed = True
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _fetch(self, handle: HandleT) -> Future:
+        with self.condition:
+            future = self.in_flight.get(handle)
+            if future is not None:
+                return future
+            if self.closed:
+                # Neighbors of links fetched before the shutdown aren't prefetched
+                future = Future()
+                future.cancel()
+                return future
+            # Links are stored in the cache before they're removed from `in_flight`
+            links = self.cache_controller.get_incoming_links(handle)
+            if links is not None:
+                future = Future()
+                future.set_result(links)
+                return future
+            future = self.executor.submit(self._fetch_and_store, handle)
+            self.in_flight[handle] = future
+        return future
+
+    def _fetch_and_store(self, handle: HandleT) -> List[Any]:
+        version = self.cache_controller.incoming_links_version
+        try:
+            links = self.fetch_incoming_links(handle)
+            self.cache_controller.add_incoming_links(handle, links, version)
+            return links
+        finally:
+            with self.condition:
+                del self.in_flight[handle]
+                self.condition.notify_all()
+
+    def _on_fetched(self, handle: HandleT, future: Future, depth: int) -> None:
+        try:
+            if future.cancelled():
+                return
+            if (exception := future.exception()) is not None:
+                logger().debug(f'Prefetch of incoming links of {handle} failed: {str(exception)}')
+                return
+            self._prefetch_neighbors(handle, future.result(), depth)
+        except RuntimeError:
+            # Executor shut down
+            pass
+        finally:
+            with self.condition:
+                self.pending_callbacks -= 1
+                self.condition.notify_all()
+
+    def _prefetch_neighbors(self, handle: HandleT, links: List[Any], depth: int) -> None:
+        if depth <= 0:
+            return
+        for neighbor in neighbor_handles(handle, links)[: self.max_neighbors]:
+            self.prefetch(neighbor, depth - 1)
@@ -1,12 +1,16 @@
 import contextlib
 import pickle
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from threading import Lock
 from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 from hyperon_das_atomdb import AtomDoesNotExist
 from hyperon_das_atomdb.database import AtomT, IncomingLinksT
-from requests import exceptions, sessions
+from requests import Response, exceptions, sessions
 
 from hyperon_das.exceptions import (
+    CircuitOpenError,
     FunctionsConnectionError,
     FunctionsTimeoutError,
     HTTPError,
@@ -14,32 +18,141 @@ from hyperon_das.exceptions import (
 )
 from hyperon_das.link_filters import LinkFilter
 from hyperon_das.logger import logger
-from hyperon_das.type_alias import Query
+from hyperon_das.request_policy import RETRYABLE_STATUS_CODES, RequestPolicy
+from hyperon_das.type_alias import BatchEntryT, BatchOperationT, Query
 from hyperon_das.utils import connect_to_server, das_error, deserialize, serialize
 
+BATCHABLE_ACTIONS = ('get_atom', 'get_links', 'get_incoming_links')
+"""Actions which can be sent in batch requests."""
+
 
 class FunctionsClient:
-    def __init__(self, host: str, port: int, name: Optional[str] = None) -> None:
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        name: Optional[str] = None,
+        request_policy: Optional[RequestPolicy] = None,
+        handshake_cache_file: Optional[str] = None,
+        handshake_cache_ttl: float = 3600.0,
+    ) -> None:
         if not host and not port:
             das_error(ValueError("'host' and 'port' are mandatory parameters"))
         self.name = name if name else f'client_{host}:{port}'
-        self.status_code, self.url = connect_to_server(host, port)
+        self.status_code, self.url = connect_to_server(
+            host, port, cache_file=handshake_cache_file, cache_ttl=handshake_cache_ttl
+        )
+        self.request_policy = request_policy or RequestPolicy()
+        # Requests to this client's URL share a single circuit breaker
+        self.circuit_breaker = self.request_policy.circuit_breaker()
+        self._hedge_executor: Optional[ThreadPoolExecutor] = None
+        self._hedge_executor_lock = Lock()
+
+    def close(self) -> None:
+        """
+        Stops the threads which send hedged requests. Slower requests still running are left to
+        finish in the background. Later requests start new threads.
+        """
+        with self._hedge_executor_lock:
+            executor, self._hedge_executor = self._hedge_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    @staticmethod
+    def _normalize_input(payload: Dict[str, Any]) -> None:
+        if payload.get('input'):
+            normalized_input = {k: v for k, v in payload['input'].items() if v is not None}
+            payload['input'] = normalized_input
+
+    def _post(self, payload_serialized: bytes, timeout: Optional[float]) -> Response:
+        with sessions.Session() as session:
+            return session.request(
+                method='POST',
+                url=self.url,
+                data=payload_serialized,
+                headers={'Content-Type': 'application/octet-stream'},
+                timeout=timeout,
+            )
+
+    def _get_hedge_executor(self) -> ThreadPoolExecutor:
+        with self._hedge_executor_lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(thread_name_prefix='das-hedged-request')
+            return self._hedge_executor
+
+    def _hedged_post(self, payload_serialized: bytes, timeout: Optional[float]) -> Response:
+        # A second request is sent if the first one is slow and the first response is used. The
+        # slower request can't be cancelled, its response is just ignored.
+        executor = self._get_hedge_executor()
+        first = executor.submit(self._post, payload_serialized, timeout)
+        done, _ = wait([first], timeout=self.request_policy.hedge_delay)
+        if done:
+            return first.result()
+        logger().debug(f'Hedging slow request to {self.url}')
+        pending = {first, executor.submit(self._post, payload_serialized, timeout)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _attempt_request(self, action: str, payload_serialized: bytes) -> Response:
+        allowed, trial = self.circuit_breaker.allow_request()
+        if not allowed:
+            das_error(
+                CircuitOpenError(
+                    message=f"Requests to '{self.url}' are suspended after repeated failures",
+                    details=f'action: {action}',
+                )
+            )
+        timeout = self.request_policy.timeout_for(action)
+        try:
+            if self.request_policy.should_hedge(action):
+                response = self._hedged_post(payload_serialized, timeout)
+            else:
+                response = self._post(payload_serialized, timeout)
+        except (exceptions.ConnectionError, exceptions.Timeout):
+            self.circuit_breaker.record_failure(trial=trial)
+            raise
+        except Exception:
+            # Other errors (e.g. an invalid URL) say nothing about the remote DAS, but a trial
+            # request failing with them must still end, or no request would be let through
+            if trial:
+                self.circuit_breaker.end_trial()
+            raise
+        if response.status_code in RETRYABLE_STATUS_CODES:
+            self.circuit_breaker.record_failure(trial=trial)
+        else:
+            self.circuit_breaker.record_success(trial=trial)
+        return response
+
+    def _send_with_retries(self, action: str, payload_serialized: bytes) -> Response:
+        attempt = 0
+        while True:
+            try:
+                response = self._attempt_request(action, payload_serialized)
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    return response
+                if not self.request_policy.should_retry(action, attempt):
+                    return response
+                logger().debug(f'{action} request got status {response.status_code}, retrying')
+            except (exceptions.ConnectionError, exceptions.Timeout) as e:
+                if not self.request_policy.should_retry(action, attempt):
+                    raise
+                logger().debug(f'{action} request failed ({type(e).__name__}), retrying')
+            time.sleep(self.request_policy.backoff_delay(attempt))
+            attempt += 1
 
     def _send_request(self, payload) -> Any:
         try:
-            if payload.get('input'):
-                normalized_input = {k: v for k, v in payload['input'].items() if v is not None}
-                payload['input'] = normalized_input
+            self._normalize_input(payload)
 
             payload_serialized = serialize(payload)
 
-            with sessions.Session() as session:
-                response = session.request(
-                    method='POST',
-                    url=self.url,
-                    data=payload_serialized,
-                    headers={'Content-Type': 'application/octet-stream'},
-                )
+            response = self._send_with_retries(payload.get('action'), payload_serialized)
 
             response.raise_for_status()
 
@@ -86,31 +199,61 @@ class FunctionsClient:
                 )
             )
 
-    def get_atom(self, handle: str, **kwargs) -> Union[str, Dict]:
-        payload = {
+    @staticmethod
+    def _handle_operation_error(action: str, error: HTTPError) -> Any:
+        # Maps the HTTP errors of the batchable actions, returning the fallback results of the
+        # actions which have one
+        if action == 'get_incoming_links':
+            logger().debug(f'Error during `get_incoming_links` request on remote Das: {str(error)}')
+            return []
+        if error.status_code == 404:
+            raise AtomDoesNotExist('Nonexistent atom')
+        elif error.status_code == 400 and action == 'get_links':
+            raise ValueError(str(error))
+        raise error
+
+    @staticmethod
+    def get_atom_operation(handle: str, **kwargs) -> BatchOperationT:
+        return {
             'action': 'get_atom',
             'input': {'handle': handle},
         }
+
+    def get_atom(self, handle: str, **kwargs) -> Union[str, Dict]:
+        payload = self.get_atom_operation(handle, **kwargs)
         try:
             return self._send_request(payload)
         except HTTPError as e:
-            if e.status_code == 404:
-                raise AtomDoesNotExist('Nonexistent atom')
-            else:
-                raise e
+            return self._handle_operation_error('get_atom', e)
+
+    @staticmethod
+    def _link_filter_input(link_filter: LinkFilter) -> Dict[str, Any]:
+        return {
+            "filter_type": link_filter.filter_type,
+            "toplevel_only": link_filter.toplevel_only,
+            "link_type": link_filter.link_type or "",
+            "target_types": link_filter.target_types or [],
+            "targets": link_filter.targets or [],
+        }
+
+    @classmethod
+    def get_links_operation(cls, link_filter: LinkFilter) -> BatchOperationT:
+        return {
+            'action': 'get_links',
+            "input": {"link_filter": cls._link_filter_input(link_filter)},
+        }
 
     def get_links(self, link_filter: LinkFilter) -> Union[List[str], List[Dict]]:
+        payload = self.get_links_operation(link_filter)
+        try:
+            return self._send_request(payload)
+        except HTTPError as e:
+            return self._handle_operation_error('get_links', e)
+
+    def get_link_handles(self, link_filter: LinkFilter) -> List[str]:
         payload = {
-            'action': 'get_links',
-            "input": {
-                "link_filter": {
-                    "filter_type": link_filter.filter_type,
-                    "toplevel_only": link_filter.toplevel_only,
-                    "link_type": link_filter.link_type or "",
-                    "target_types": link_filter.target_types or [],
-                    "targets": link_filter.targets or [],
-                }
-            },
+            'action': 'get_link_handles',
+            "input": {"link_filter": self._link_filter_input(link_filter)},
         }
         try:
             return self._send_request(payload)
@@ -164,16 +307,124 @@ class FunctionsClient:
             else:
                 raise e
 
-    def get_incoming_links(self, atom_handle: str, **kwargs) -> IncomingLinksT | Iterator:
-        payload = {
+    @staticmethod
+    def get_incoming_links_operation(atom_handle: str, **kwargs) -> BatchOperationT:
+        return {
             'action': 'get_incoming_links',
             'input': {'atom_handle': atom_handle, 'kwargs': kwargs},
         }
+
+    def get_incoming_links(self, atom_handle: str, **kwargs) -> IncomingLinksT | Iterator:
+        payload = self.get_incoming_links_operation(atom_handle, **kwargs)
         try:
             return self._send_request(payload)
         except HTTPError as e:
-            logger().debug(f'Error during `get_incoming_links` request on remote Das: {str(e)}')
-            return []
+            return self._handle_operation_error('get_incoming_links', e)
+
+    def batch(self, operations: List[BatchOperationT]) -> List[BatchEntryT]:
+        """
+        Sends several operations in a single request. Operations are built by the
+        `*_operation()` methods (e.g. get_atom_operation()) and are run by the remote DAS
+        independently of each other, so an operation failing doesn't affect the others.
+
+        Args:
+            operations (List[BatchOperationT]): The operations.
+
+        Returns:
+            List[BatchEntryT]: The outcome of each operation, in the same order as the
+                operations. Use batch_result() to get the actual results.
+        """
+        for operation in operations:
+            if operation['action'] not in BATCHABLE_ACTIONS:
+                das_error(ValueError(f"Action '{operation['action']}' can't be batched"))
+            self._normalize_input(operation)
+        payload = {
+            'action': 'batch',
+            'input': {'operations': operations},
+        }
+        try:
+            return self._send_request(payload)
+        except HTTPError as e:
+            if e.status_code == 400:
+                raise ValueError(str(e))
+            else:
+                raise e
+
+    @classmethod
+    def batch_result(cls, operation: BatchOperationT, entry: BatchEntryT) -> Any:
+        """
+        Returns the result of an operation of a batch request, or raises the same error the
+        equivalent single request would raise.
+
+        Args:
+            operation (BatchOperationT): The operation.
+            entry (BatchEntryT): Its outcome, as returned by batch().
+
+        Returns:
+            Any: The result of the operation.
+        """
+        if 'error' not in entry:
+            return entry.get('result')
+        error = HTTPError(
+            message="Batched operation failed.",
+            details=entry['error'],
+            status_code=entry.get('status_code'),
+        )
+        return cls._handle_operation_error(operation['action'], error)
+
+    def get_incoming_links_page(
+        self,
+        atom_handle: str,
+        continuation_token: Optional[str] = None,
+        chunk_size: int = 500,
+        **kwargs,
+    ) -> Tuple[Optional[str], IncomingLinksT]:
+        payload = {
+            'action': 'get_incoming_links_page',
+            'input': {
+                'atom_handle': atom_handle,
+                'continuation_token': continuation_token,
+                'chunk_size': chunk_size,
+                'kwargs': kwargs,
+            },
+        }
+        try:
+            return self._send_request(payload)
+        except HTTPError as e:
+            if e.status_code == 400:
+                raise ValueError(str(e))
+            else:
+                raise e
+
+    def expand(
+        self,
+        handle: str,
+        depth: int = 1,
+        link_type: Optional[str] = None,
+        target_type: Optional[str] = None,
+        max_nodes: Optional[int] = None,
+        strategy: str = 'bfs',
+    ) -> List[AtomT]:
+        payload = {
+            'action': 'expand',
+            'input': {
+                'handle': handle,
+                'depth': depth,
+                'link_type': link_type,
+                'target_type': target_type,
+                'max_nodes': max_nodes,
+                'strategy': strategy,
+            },
+        }
+        try:
+            return self._send_request(payload)
+        except HTTPError as e:
+            if e.status_code == 404:
+                raise AtomDoesNotExist('nonexistent atom')
+            elif e.status_code == 400:
+                raise ValueError(str(e))
+            else:
+                raise e
 
     def create_field_index(
         self,
@@ -215,6 +466,32 @@ class FunctionsClient:
         except HTTPError as e:
             raise e
 
+    def custom_query_page(
+        self,
+        index_id: str,
+        query: Query,
+        continuation_token: Optional[str] = None,
+        chunk_size: int = 1000,
+        **kwargs,
+    ) -> Tuple[Optional[str], List[AtomT]]:
+        payload = {
+            'action': 'custom_query_page',
+            'input': {
+                'index_id': index_id,
+                'query': {v['field']: v['value'] for v in query},
+                'continuation_token': continuation_token,
+                'chunk_size': chunk_size,
+                'kwargs': kwargs,
+            },
+        }
+        try:
+            return self._send_request(payload)
+        except HTTPError as e:
+            if e.status_code == 400:
+                raise ValueError(str(e))
+            else:
+                raise e
+
     def fetch(
         self,
         query: Union[List[dict], dict],
@@ -231,6 +508,45 @@ class FunctionsClient:
         except HTTPError as e:
             raise e
 
+    def fetch_page(
+        self,
+        query: Optional[Union[List[dict], dict]],
+        cursor: Optional[str] = None,
+        page_size: int = 1000,
+        handle_range: Optional[Tuple[Optional[str], Optional[str]]] = None,
+    ) -> Tuple[Optional[str], List[AtomT]]:
+        payload = {
+            'action': 'fetch_page',
+            'input': {
+                'query': query,
+                'cursor': cursor,
+                'page_size': page_size,
+                'handle_range': handle_range,
+            },
+        }
+        try:
+            return self._send_request(payload)
+        except HTTPError as e:
+            if e.status_code == 400:
+                raise ValueError(str(e))
+            else:
+                raise e
+
+    def fetch_delta(
+        self, query: Optional[Union[List[dict], dict]], marks: Dict[str, str]
+    ) -> Tuple[Dict[str, str], List[AtomT]]:
+        payload = {
+            'action': 'fetch_delta',
+            'input': {'query': query, 'marks': marks},
+        }
+        try:
+            return self._send_request(payload)
+        except HTTPError as e:
+            if e.status_code == 400:
+                raise ValueError(str(e))
+            else:
+                raise e
+
     def create_context(self, name: str, queries: Optional[List[Query]]) -> Any:
         payload = {
             'action': 'create_context',
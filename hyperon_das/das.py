@@ -1,4 +1,9 @@
-from typing import Any, Dict, Iterator, List, Optional, Type, Union
+import json
+import os
+from dataclasses import replace
+from itertools import islice
+from threading import Lock
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Type, Union
 
 from hyperon_das_atomdb import AtomDB, AtomDoesNotExist
 from hyperon_das_atomdb.adapters import InMemoryDB, RedisMongoDB
@@ -12,10 +17,14 @@ from hyperon_das_atomdb.database import (
     NodeT,
 )
 from hyperon_das_atomdb.exceptions import InvalidAtomDB
+from hyperon_das_atomdb.utils.expression_hasher import ExpressionHasher
 
 from hyperon_das.cache.cache_controller import CacheController
+from hyperon_das.cache.page_fetch_executor import PageFetchExecutor
+from hyperon_das.cache.traverse_prefetcher import TraversePrefetcher
 from hyperon_das.constants import DasType
 from hyperon_das.context import Context
+from hyperon_das.delta_fetch import DeltaMarksT
 from hyperon_das.exceptions import (
     GetTraversalCursorException,
     InvalidDASParameters,
@@ -23,11 +32,14 @@ from hyperon_das.exceptions import (
 )
 from hyperon_das.link_filters import LinkFilter
 from hyperon_das.logger import logger
+from hyperon_das.metta_loader import MettaLoader
+from hyperon_das.paged_fetch import ContinuationTokenT, FetchProgress, HandleRangeT, PagedFetch
 from hyperon_das.query_engines.local_query_engine import LocalQueryEngine
 from hyperon_das.query_engines.remote_query_engine import RemoteQueryEngine
-from hyperon_das.traverse_engines import TraverseEngine
-from hyperon_das.type_alias import Query
+from hyperon_das.traverse_engines import TraverseEngine, get_incoming_links
+from hyperon_das.type_alias import BatchEntryT, BatchOperationT, Query
 from hyperon_das.utils import QueryAnswer, get_package_version
+from hyperon_das.write_behind import WriteBehindBuffer
 
 
 class DistributedAtomSpace:
@@ -43,9 +55,90 @@ class DistributedAtomSpace:
         using kwargs options.
 
         Args:
-            system_parameters (Dict[str, Any]): Sets the system parameters. Defaults to {
-                'running_on_server': False, 'cache_enabled': False, 'attention_broker_hostname':
-                'localhost', 'attention_broker_port': 27000}.
+            system_parameters (Dict[str, Any]): Sets the system parameters below. Missing
+                parameters take their default values.
+
+                running_on_server (bool): Whether this DAS is run by a DAS server. Defaults to
+                    False.
+                cache_enabled (bool): Enables the attention broker cache. Defaults to False.
+                attention_broker_hostname (str): Attention broker's hostname. Defaults to
+                    'localhost'.
+                attention_broker_port (int): Attention broker's port. Defaults to 27000.
+                query_cache_enabled (bool): Keeps answers of remote queries in a local cache
+                    until the AtomSpace is changed locally. Defaults to False.
+                query_cache_ttl (int): Seconds a query answer is cached. Defaults to 60.
+                query_cache_max_size (int): Maximum number of cached query answers. Defaults
+                    to 1000.
+                negative_cache_enabled (bool): Caches handles known not to exist in the remote
+                    DAS until commit_changes() or fetch(). Defaults to False.
+                negative_cache_ttl (int): Seconds a nonexistent handle is cached. Defaults to 60.
+                negative_cache_max_size (int): Maximum number of cached nonexistent handles.
+                    Defaults to 100000.
+                commit_chunk_size (int): Maximum number of atoms sent to the remote DAS in each
+                    request of commit_changes(). Defaults to 1000.
+                write_behind (bool): Commits atoms added by add_node() and add_link() in a
+                    background thread. Only available for remote DAS in 'read-write' mode and
+                    for 'redis_mongo' AtomDB. Defaults to False.
+                write_behind_max_atoms (int): Number of pending atoms which triggers a
+                    write-behind commit. Defaults to 10000.
+                write_behind_max_age (float): Age in seconds of the oldest pending atom which
+                    triggers a write-behind commit. Defaults to 5.0.
+                write_behind_max_pending (int): Number of atoms waiting to be committed above
+                    which writers block. Defaults to 100000.
+                write_behind_max_wait (float): Seconds after which blocked writers fail with
+                    WriteBehindBufferFull (e.g. when commits keep failing). Defaults to 60.0.
+                traverse_prefetch (bool): Makes traversal cursors prefetch, in background
+                    threads, the incoming links of nearby atoms. Defaults to False.
+                traverse_prefetch_depth (int): Hops away from the cursor of prefetched atoms.
+                    Defaults to 1.
+                traverse_prefetch_max_neighbors (int): Maximum number of neighbors of each atom
+                    which are prefetched. Defaults to 10.
+                traverse_prefetch_threads (int): Number of prefetching threads. Defaults to 4.
+                traverse_cache_ttl (int): Seconds prefetched links are cached, unless the
+                    AtomSpace is changed locally. Defaults to 60.
+                traverse_cache_max_size (int): Maximum number of atoms whose prefetched links
+                    are cached. Defaults to 10000.
+                page_fetch_max_in_flight (int): Maximum number of chunks of paginated iterators
+                    (e.g. of custom_query()) fetched at the same time. Defaults to 8.
+                adaptive_chunk_size (bool): Makes the chunks of paginated iterators grow while
+                    the consumer keeps up and shrink when fetches are slow or the consumer falls
+                    behind. Defaults to False.
+                min_chunk_size (int): Minimum size of adaptive chunks. Defaults to 100.
+                max_chunk_size (int): Maximum size of adaptive chunks. Defaults to 10000.
+                chunk_target_latency (float): Seconds a chunk fetch should take at most.
+                    Defaults to 0.5.
+                scan_snapshots_max (int): Maximum number of snapshots of paged scans (sorted
+                    atoms whose following pages are served from it) kept. Defaults to 32.
+                scan_snapshots_ttl (float): Seconds a snapshot is kept after its last use.
+                    Defaults to 300.0.
+                request_batch_window (float): Seconds within which get_atom(), get_links() and
+                    get_incoming_links() requests to a remote DAS are coalesced into batch
+                    requests. Defaults to 0 (disabled).
+                request_batch_size (int): Maximum number of operations in a batch request.
+                    Defaults to 100.
+                request_timeout (float): Seconds after which requests to a remote DAS time out.
+                    Defaults to None (no timeout).
+                long_request_timeout (float): Timeout of the requests of long running
+                    operations (query(), commit_changes(), fetch(), create_context() and
+                    create_field_index()). Defaults to None (no timeout).
+                request_max_retries (int): Number of retries of read-only requests which fail
+                    with a connection error, a timeout or a transient HTTP status. Defaults to 2.
+                request_retry_backoff (float): Maximum random delay in seconds before the first
+                    retry, doubled at each retry. Defaults to 0.1.
+                request_retry_max_backoff (float): Maximum delay in seconds before a retry.
+                    Defaults to 5.0.
+                request_hedge_delay (float): Seconds after which a read-only request is sent
+                    again, using the first response. Defaults to None (disabled).
+                circuit_breaker_threshold (int): Consecutive failures after which requests fail
+                    right away with CircuitOpenError. Defaults to 5 (0 disables it).
+                circuit_breaker_reset (float): Seconds requests fail right away once the circuit
+                    is open. Defaults to 30.0.
+                handshake_cache_file (str): File where handshakes with remote DAS servers are
+                    cached across processes. Defaults to None (cached in this process only).
+                handshake_cache_ttl (float): Seconds a handshake is cached in that file.
+                    Defaults to 3600.0.
+                replica_health_check_interval (float): Seconds between handshakes with failed
+                    replicas (see `endpoints`). Defaults to 5.0.
 
         Keyword Args:
             atomdb (str, optional): AtomDB type supported values are 'ram' and 'redis_mongo'.
@@ -58,6 +151,21 @@ class DistributedAtomSpace:
                 the query_engine is equal to 'remote'.
             port (str, optional): Sets the port for the remote query engine, it's mandatory when
                 the query_engine is equal to 'remote'.
+            endpoints (List[Tuple[str, int]], optional): Host and port of several replicas of the
+                remote query engine, used instead of host and port. Requests are balanced among
+                the replicas, sending each one to the replica with fewer requests in flight
+                among two random ones. Replicas which fail are checked with handshakes every
+                'replica_health_check_interval' seconds and skipped until they answer again.
+                Read operations that fail on a replica are retried on another one.
+            shards (List[Tuple[str, int]], optional): Host and port of several remote query
+                engines each holding part of the AtomSpace, used instead of host and port.
+                Atoms are partitioned by handle: the space of handles is split in as many
+                consecutive ranges of similar size as there are shards, in the same order.
+                Requests for an atom go to the shard which holds it, while get_links(),
+                query(), count_atoms() and the like are sent to all shards and their answers
+                are merged. Queries only find answers whose links are held by a single shard.
+                Paged scans (fetch_page(), custom_query() and the like) go through all shards,
+                while expand() isn't supported.
             mode (str, optional): Set query engine's ACL privileges, only available when the
                 query_engine is set to 'remote', accepts 'read-only' or 'read-write'. Defaults
                 to 'read-only'.
@@ -88,7 +196,14 @@ class DistributedAtomSpace:
         self._set_default_system_parameters()
         self._set_backend(**kwargs)
         self.cache_controller = CacheController(self.system_parameters)
+        self.page_fetch_executor = PageFetchExecutor(
+            max_in_flight=self.system_parameters['page_fetch_max_in_flight']
+        )
         self._set_query_engine(**kwargs)
+        self._write_lock = Lock()
+        self._fetch_marks: Dict[Tuple[Optional[str], Optional[int], str], DeltaMarksT] = {}
+        self._traverse_prefetcher: Optional[TraversePrefetcher] = None
+        self._set_write_behind(**kwargs)
 
     def _set_default_system_parameters(self) -> None:
         # Internals
@@ -101,6 +216,92 @@ class DistributedAtomSpace:
             self.system_parameters['attention_broker_hostname'] = 'localhost'
         if not self.system_parameters.get('attention_broker_port'):
             self.system_parameters['attention_broker_port'] = 27000
+        # Query answer cache
+        if not self.system_parameters.get('query_cache_enabled'):
+            self.system_parameters['query_cache_enabled'] = False
+        if not self.system_parameters.get('query_cache_ttl'):
+            self.system_parameters['query_cache_ttl'] = 60
+        if not self.system_parameters.get('query_cache_max_size'):
+            self.system_parameters['query_cache_max_size'] = 1000
+        # Nonexistent handles cache
+        if not self.system_parameters.get('negative_cache_enabled'):
+            self.system_parameters['negative_cache_enabled'] = False
+        if not self.system_parameters.get('negative_cache_ttl'):
+            self.system_parameters['negative_cache_ttl'] = 60
+        if not self.system_parameters.get('negative_cache_max_size'):
+            self.system_parameters['negative_cache_max_size'] = 100000
+        # Remote commits
+        if not self.system_parameters.get('commit_chunk_size'):
+            self.system_parameters['commit_chunk_size'] = 1000
+        # Write-behind
+        if not self.system_parameters.get('write_behind'):
+            self.system_parameters['write_behind'] = False
+        if not self.system_parameters.get('write_behind_max_atoms'):
+            self.system_parameters['write_behind_max_atoms'] = 10000
+        if not self.system_parameters.get('write_behind_max_age'):
+            self.system_parameters['write_behind_max_age'] = 5.0
+        if not self.system_parameters.get('write_behind_max_pending'):
+            self.system_parameters['write_behind_max_pending'] = 100000
+        if not self.system_parameters.get('write_behind_max_wait'):
+            self.system_parameters['write_behind_max_wait'] = 60.0
+        # Traversal prefetch
+        if not self.system_parameters.get('traverse_prefetch'):
+            self.system_parameters['traverse_prefetch'] = False
+        if self.system_parameters.get('traverse_prefetch_depth') is None:
+            self.system_parameters['traverse_prefetch_depth'] = 1
+        if not self.system_parameters.get('traverse_prefetch_max_neighbors'):
+            self.system_parameters['traverse_prefetch_max_neighbors'] = 10
+        if not self.system_parameters.get('traverse_prefetch_threads'):
+            self.system_parameters['traverse_prefetch_threads'] = 4
+        if not self.system_parameters.get('traverse_cache_ttl'):
+            self.system_parameters['traverse_cache_ttl'] = 60
+        if not self.system_parameters.get('traverse_cache_max_size'):
+            self.system_parameters['traverse_cache_max_size'] = 10000
+        # Paginated iterators
+        if not self.system_parameters.get('page_fetch_max_in_flight'):
+            self.system_parameters['page_fetch_max_in_flight'] = 8
+        if not self.system_parameters.get('adaptive_chunk_size'):
+            self.system_parameters['adaptive_chunk_size'] = False
+        if not self.system_parameters.get('min_chunk_size'):
+            self.system_parameters['min_chunk_size'] = 100
+        if not self.system_parameters.get('max_chunk_size'):
+            self.system_parameters['max_chunk_size'] = 10000
+        if not self.system_parameters.get('chunk_target_latency'):
+            self.system_parameters['chunk_target_latency'] = 0.5
+        if not self.system_parameters.get('scan_snapshots_max'):
+            self.system_parameters['scan_snapshots_max'] = 32
+        if not self.system_parameters.get('scan_snapshots_ttl'):
+            self.system_parameters['scan_snapshots_ttl'] = 300.0
+        # Request batching
+        if not self.system_parameters.get('request_batch_window'):
+            self.system_parameters['request_batch_window'] = 0
+        if not self.system_parameters.get('request_batch_size'):
+            self.system_parameters['request_batch_size'] = 100
+        # Remote requests
+        if not self.system_parameters.get('request_timeout'):
+            self.system_parameters['request_timeout'] = None
+        if not self.system_parameters.get('long_request_timeout'):
+            self.system_parameters['long_request_timeout'] = None
+        if self.system_parameters.get('request_max_retries') is None:
+            self.system_parameters['request_max_retries'] = 2
+        if not self.system_parameters.get('request_retry_backoff'):
+            self.system_parameters['request_retry_backoff'] = 0.1
+        if not self.system_parameters.get('request_retry_max_backoff'):
+            self.system_parameters['request_retry_max_backoff'] = 5.0
+        if not self.system_parameters.get('request_hedge_delay'):
+            self.system_parameters['request_hedge_delay'] = None
+        if self.system_parameters.get('circuit_breaker_threshold') is None:
+            self.system_parameters['circuit_breaker_threshold'] = 5
+        if not self.system_parameters.get('circuit_breaker_reset'):
+            self.system_parameters['circuit_breaker_reset'] = 30.0
+        # Handshakes
+        if not self.system_parameters.get('handshake_cache_file'):
+            self.system_parameters['handshake_cache_file'] = None
+        if not self.system_parameters.get('handshake_cache_ttl'):
+            self.system_parameters['handshake_cache_ttl'] = 3600.0
+        # Replicas
+        if not self.system_parameters.get('replica_health_check_interval'):
+            self.system_parameters['replica_health_check_interval'] = 5.0
 
     def _set_backend(self, **kwargs) -> None:
         if self.atomdb == "ram":
@@ -134,10 +335,30 @@ class DistributedAtomSpace:
     ) -> None:
         self._das_type = das_type
         self.query_engine = engine_type(
-            self.backend, self.cache_controller, self.system_parameters, **kwargs
+            self.backend,
+            self.cache_controller,
+            self.system_parameters,
+            page_fetch_executor=self.page_fetch_executor,
+            **kwargs,
         )
         logger().info(f"Started {das_type} DAS")
 
+    def _set_write_behind(self, **kwargs) -> None:
+        self._write_behind = None
+        if not self.system_parameters.get('write_behind'):
+            return
+        if self._das_type == DasType.REMOTE and kwargs.get('mode', 'read-only') != 'read-write':
+            raise InvalidDASParameters(
+                message="Write-behind mode requires a remote DAS in 'read-write' mode"
+            )
+        self._write_behind = WriteBehindBuffer(
+            self.commit_changes,
+            max_atoms=self.system_parameters['write_behind_max_atoms'],
+            max_age_seconds=self.system_parameters['write_behind_max_age'],
+            max_pending=self.system_parameters['write_behind_max_pending'],
+            max_wait_seconds=self.system_parameters['write_behind_max_wait'],
+        )
+
     def _create_context(
         self,
         name: str,
@@ -366,6 +587,9 @@ class DistributedAtomSpace:
         """
         Retrieve the handle of all links that match the passed filtering criteria.
 
+        Unlike get_links(), a remote DAS only sends the handles of the matching links, not their
+        documents.
+
         Args:
             link_filter (LinkFilter): Filtering criteria to be used to select links
 
@@ -383,6 +607,11 @@ class DistributedAtomSpace:
 
         Keyword Args:
             handles_only (bool, optional): Returns a list of links handles.
+            link_type (str, optional): Only links of this type are returned.
+            cursor_position (int, optional): Only links which have the passed atom at this
+                position of their targets are returned.
+            target_type (str, optional): Only links with at least one target of this type are
+                returned. Targets documents are only fetched for links that pass these filters.
 
         Returns:
             List[str] (when `handles_only` is True): A list of strings containing the link handles.
@@ -401,6 +630,119 @@ class DistributedAtomSpace:
         """
         return self.query_engine.get_incoming_links(atom_handle, **kwargs)
 
+    def get_incoming_links_page(
+        self,
+        atom_handle: HandleT,
+        continuation_token: Optional[ContinuationTokenT] = None,
+        chunk_size: int = 500,
+        **kwargs,
+    ) -> Tuple[Optional[ContinuationTokenT], IncomingLinksT]:
+        """
+        Retrieve one page of the links which have the passed handle as one of their targets.
+
+        Links are paged by handle and each page comes with an opaque continuation token used to
+        request the next one. Requesting a page again with the same token (e.g. after a failed
+        request or a reconnection) returns the same links, and no link is returned in two pages.
+        A remote DAS which doesn't support paged requests is sent a single get_incoming_links()
+        request with the first page, and its answer is paged locally.
+
+        Args:
+            atom_handle (HandleT): Atom's handle
+            continuation_token (Optional[ContinuationTokenT], optional): Token returned with the
+                previous page or None to get the first page. Defaults to None.
+            chunk_size (int, optional): Maximum number of links in the page. Defaults to 500.
+
+        Keyword Args:
+            Same as get_incoming_links().
+
+        Raises:
+            ValueError: If the token is invalid or was issued for another atom or filters.
+
+        Returns:
+            Tuple[Optional[ContinuationTokenT], IncomingLinksT]: Token of the next page (None if
+                this is the last page) and the links in the page.
+
+        Examples:
+            >>> token, links = das.get_incoming_links_page(rhino, chunk_size=2)
+            >>> while token is not None:
+            >>>     token, more_links = das.get_incoming_links_page(rhino, token, chunk_size=2)
+        """
+        return self.query_engine.get_incoming_links_page(
+            atom_handle, continuation_token, chunk_size, **kwargs
+        )
+
+    def batch(self, operations: List[BatchOperationT]) -> List[BatchEntryT]:
+        """
+        Run several get_atom(), get_links() and get_incoming_links() operations in a single
+        request. Operations run independently of each other, so an operation failing doesn't
+        affect the others.
+
+        Args:
+            operations (List[BatchOperationT]): The operations, built by the `*_operation()`
+                methods of FunctionsClient (e.g. FunctionsClient.get_atom_operation()).
+
+        Returns:
+            List[BatchEntryT]: The outcome of each operation, in the same order as the
+                operations: {'result': <result>} or {'error': <message>, 'status_code': <code>},
+                where the status code is the one of the equivalent single request.
+
+        Examples:
+            >>> entries = das.batch(
+                    [
+                        FunctionsClient.get_atom_operation(human),
+                        FunctionsClient.get_incoming_links_operation(human, handles_only=True),
+                    ]
+                )
+            >>> atom = entries[0]['result']
+        """
+        return self.query_engine.batch(operations)
+
+    def expand(
+        self,
+        handle: HandleT,
+        depth: int = 1,
+        link_type: Optional[str] = None,
+        target_type: Optional[str] = None,
+        max_nodes: Optional[int] = None,
+        strategy: str = 'bfs',
+    ) -> Iterator[AtomT] | List[AtomT]:
+        """
+        Traverse the hypergraph starting at the passed atom, moving from each visited atom to
+        its neighbors (the targets of the links pointing to it), and return the visited atoms
+        as they are visited.
+
+        The whole traversal is made by the query engine: in a local DAS the atoms are streamed
+        while the traversal goes on, and in a remote DAS it's made by the server in a single
+        request. Each atom is visited only once and the starting atom isn't returned.
+
+        Args:
+            handle (HandleT): Handle of the atom where the traversal starts.
+            depth (int, optional): Maximum distance (number of hops) from the starting atom.
+                Defaults to 1 (only the neighbors of the atom).
+            link_type (str, optional): Only links of this type are followed. Defaults to None.
+            target_type (str, optional): Only atoms of this type are visited. Defaults to None.
+            max_nodes (int, optional): Maximum number of visited atoms. Defaults to None (no
+                limit).
+            strategy (str, optional): Either 'bfs' (breadth-first) or 'dfs' (depth-first).
+                Defaults to 'bfs'.
+
+        Returns:
+            Iterator[AtomT] | List[AtomT]: The visited atoms (a list when running on a server).
+
+        Raises:
+            NotImplementedError: If the DAS is connected to sharded remote query engines
+                (see `shards`), since traversals would go from shard to shard.
+
+        Examples:
+            >>> human = das.compute_node_handle('Concept', 'human')
+            >>> for atom in das.expand(human, depth=2, link_type='Similarity'):
+            >>>     print(atom.name)
+            chimp
+            monkey
+            ent
+        """
+        return self.query_engine.expand(handle, depth, link_type, target_type, max_nodes, strategy)
+
     def count_atoms(self, parameters: Dict[str, Any] = {}) -> Dict[str, int]:
         """
         Count atoms, nodes and links in DAS.
@@ -543,11 +885,19 @@ class DistributedAtomSpace:
                 If the query_engine is set to 'remote' it always return an iterator.
                 Defaults to True.
             cursor (Any, optional): Cursor position in the iterator, starts retrieving links from redis at the cursor
-                position. Defaults to 0.
-            chunk_size (int, optional): Chunk size. Defaults to 1000.
+                position. Defaults to 0. In a remote DAS, only the cursor of a previous iterator
+                is accepted, as a `continuation_token`.
+            continuation_token (str, optional): Only for remote DAS. Token used to resume a scan
+                from the page following the last one returned by a previous iterator (its
+                `cursor`). Defaults to None.
+            chunk_size (int, optional): Chunk size. Defaults to 1000. When the system parameter
+                'adaptive_chunk_size' is set, it's only the initial chunk size of the index.
+            prefetch_pages (int, optional): Maximum number of chunks fetched in background ahead
+                of the iteration. Defaults to 2.
 
         Raises:
             NotImplementedError: If called from Local DAS in RAM only.
+            ValueError: If a remote DAS is passed a `cursor` which isn't a continuation token.
 
         Returns:
             Iterator | List[AtomT]: An iterator or a list of Atom instances (Nodes or Links).
@@ -563,6 +913,52 @@ class DistributedAtomSpace:
             index_id, [{'field': k, 'value': v} for k, v in query.items()], **kwargs
         )
 
+    def custom_query_page(
+        self,
+        index_id: str,
+        query: Query,
+        continuation_token: Optional[ContinuationTokenT] = None,
+        chunk_size: int = 1000,
+        **kwargs,
+    ) -> Tuple[Optional[ContinuationTokenT], List[AtomT]]:
+        """
+        Perform one page of a query using a previously created custom index.
+
+        Atoms are paged by handle and each page comes with an opaque continuation token used to
+        request the next one. Requesting a page again with the same token (e.g. after a failed
+        request or a reconnection) returns the same atoms, and no atom is returned in two pages.
+        Remote iterators returned by custom_query() are paged this way. A remote DAS which
+        doesn't support paged requests is sent a single custom_query() request with the first
+        page, and its answer is paged locally.
+
+        Args:
+            index_id (str): custom index id to be used in the query.
+            query (Dict[str, Any]): Query dict, as in custom_query().
+            continuation_token (Optional[ContinuationTokenT], optional): Token returned with the
+                previous page or None to get the first page. Defaults to None.
+            chunk_size (int, optional): Maximum number of atoms in the page. Defaults to 1000.
+
+        Raises:
+            NotImplementedError: If called from Local DAS in RAM only.
+            ValueError: If the token is invalid or was issued for another index or query.
+
+        Returns:
+            Tuple[Optional[ContinuationTokenT], List[AtomT]]: Token of the next page (None if
+                this is the last page) and the atoms in the page.
+        """
+        if isinstance(self.query_engine, LocalQueryEngine) and isinstance(self.backend, InMemoryDB):
+            raise NotImplementedError(
+                "custom_query_page() is not implemented for Local DAS in RAM only"
+            )
+
+        return self.query_engine.custom_query_page(
+            index_id,
+            [{'field': k, 'value': v} for k, v in query.items()],
+            continuation_token,
+            chunk_size,
+            **kwargs,
+        )
+
     def get_atoms_by_field(self, query: Query) -> HandleListT:
         """
         Search for the atoms containing field and value, performance is improved if an index was
@@ -626,7 +1022,10 @@ class DistributedAtomSpace:
             traversing, etc. but it also keeps a local Atomspace in RAM which is
             used as a cache. Atom changes are made initially in this local cache.
             When commit_changes() is called in this type of DAS, these changes are
-            propagated to the remote DAS Server.
+            propagated to the remote DAS Server. Only the atoms added since the last
+            commit are sent, in chunks of at most 'commit_chunk_size' atoms. Each chunk
+            is acknowledged by the server before the next one is sent, so if a request
+            fails the atoms which were not acknowledged are kept for the next commit.
 
         2. When called in a DAS instantiated with query_engine=local and
            atomdb='ram'.
@@ -640,7 +1039,46 @@ class DistributedAtomSpace:
             DBs until commit_changes() is called (or until that buffers size reach a
             threshold).
         """
-        self.query_engine.commit(**kwargs)
+        if self._das_type == DasType.REMOTE:
+            self.query_engine.commit(**kwargs)
+        else:
+            with self._write_lock:
+                self.query_engine.commit(**kwargs)
+        self.cache_controller.invalidate_query_answers()
+        self.cache_controller.invalidate_incoming_links()
+        self.cache_controller.invalidate_nonexistent_handles()
+
+    def flush(self) -> None:
+        """
+        Commit all pending changes right away.
+
+        When write-behind mode is enabled (system parameter 'write_behind'), atoms added by
+        add_node() and add_link() are committed in background. This method can be used to make
+        sure all of them have been committed before proceeding. When write-behind mode is
+        disabled it's equivalent to commit_changes().
+        """
+        if self._write_behind:
+            self._write_behind.flush()
+        else:
+            self.commit_changes()
+
+    def close(self) -> None:
+        """
+        Release the background resources of this DAS.
+
+        In write-behind mode, pending atoms are committed and the background thread which
+        commits them is stopped. The threads which prefetch the neighborhood of traversal cursors
+        (see get_traversal_cursor()) are stopped as well. In a remote DAS, the threads which check
+        unhealthy replicas, send requests to the shards or send hedged and batched requests are
+        stopped. The DAS shouldn't be used after it's closed. Calling close() more than once has
+        no effect.
+        """
+        if self._write_behind:
+            self._write_behind.close()
+        if self._traverse_prefetcher:
+            self._traverse_prefetcher.shutdown()
+        if isinstance(self.query_engine, RemoteQueryEngine):
+            self.query_engine.close()
 
     def add_node(self, node_params: NodeT) -> NodeT:
         """
@@ -675,7 +1113,14 @@ class DistributedAtomSpace:
                 )
             >>> das.add_node(node_params)
         """
-        return self.backend.add_node(node_params)
+        self.cache_controller.invalidate_query_answers()
+        self.cache_controller.invalidate_incoming_links()
+        with self._write_lock:
+            node = self.backend.add_node(node_params)
+            self.query_engine.regard_added_atom(node)
+        if self._write_behind:
+            self._write_behind.regard_added_atoms()
+        return node
 
     def add_link(self, link_params: LinkT) -> LinkT:
         """
@@ -721,7 +1166,184 @@ class DistributedAtomSpace:
                 )
             >>> das.add_link(link_params)
         """
-        return self.backend.add_link(link_params)
+        self.cache_controller.invalidate_query_answers()
+        self.cache_controller.invalidate_incoming_links()
+        with self._write_lock:
+            link = self.backend.add_link(link_params)
+            self.query_engine.regard_added_atom(link)
+        if self._write_behind:
+            self._write_behind.regard_added_atoms()
+        return link
+
+    def _build_atom_documents(self, atoms: List[AtomT]) -> Tuple[HandleSetT, Dict[HandleT, AtomT]]:
+        # Builds the documents of the passed nodes and links, and of their nested targets, in the
+        # shape stored by the AtomDB (see get_node() and get_link()). Each distinct atom of the
+        # batch gets a single document (the last one wins) and target objects shared among links
+        # (e.g. the same NodeT) are hashed only once. Links are walked in post-order without
+        # recursion so deeply nested expressions can be added.
+        documents: Dict[HandleT, AtomT] = {}
+        built: Dict[int, AtomT] = {}
+        toplevel_ids = {id(atom) for atom in atoms}
+        stack: List[Tuple[AtomT, bool]] = [(atom, False) for atom in reversed(atoms)]
+        while stack:
+            atom, targets_built = stack.pop()
+            if id(atom) in built:
+                continue
+            if isinstance(atom, LinkT) and not targets_built:
+                stack.append((atom, True))
+                stack.extend((target, False) for target in reversed(atom.targets))
+                continue
+            named_type_hash = ExpressionHasher.named_type_hash(atom.type)
+            if isinstance(atom, LinkT):
+                targets = [built[id(target)] for target in atom.targets]
+                handle = self.compute_link_handle(atom.type, [target.handle for target in targets])
+                document = replace(
+                    atom,
+                    _id=handle,
+                    handle=handle,
+                    named_type=atom.type,
+                    named_type_hash=named_type_hash,
+                    composite_type=[named_type_hash]
+                    + [
+                        target.composite_type
+                        if isinstance(target, LinkT)
+                        else target.composite_type_hash
+                        for target in targets
+                    ],
+                    composite_type_hash=ExpressionHasher.composite_hash(
+                        [named_type_hash] + [target.composite_type_hash for target in targets]
+                    ),
+                    targets=[target.handle for target in targets],
+                    is_toplevel=id(atom) in toplevel_ids
+                    or getattr(documents.get(handle), 'is_toplevel', False),
+                )
+            else:
+                handle = self.compute_node_handle(atom.type, atom.name)
+                document = replace(
+                    atom,
+                    _id=handle,
+                    handle=handle,
+                    named_type=atom.type,
+                    composite_type_hash=named_type_hash,
+                )
+            built[id(atom)] = documents[handle] = document
+        return {built[id(atom)].handle for atom in atoms}, documents
+
+    def _add_atoms_batch(self, atoms: List[AtomT]) -> int:
+        handles, documents = self._build_atom_documents(atoms)
+        with self._write_lock:
+            self.backend.bulk_insert(list(documents.values()))
+            for document in documents.values():
+                self.query_engine.regard_added_atom(document)
+        self.cache_controller.invalidate_query_answers()
+        self.cache_controller.invalidate_incoming_links()
+        if self._write_behind and documents:
+            self._write_behind.regard_added_atoms(len(documents))
+        return len(handles)
+
+    def add_nodes(self, nodes: Iterable[NodeT], batch_size: int = 1000) -> int:
+        """
+        Adds many nodes to DAS.
+
+        Nodes are consumed from the passed iterable in batches of `batch_size` nodes so it can
+        be e.g. a generator reading nodes from a file. The handles of each batch are computed at
+        once and the batch is inserted with a single bulk insertion in the AtomDB. Nodes with
+        the same handle in the same batch are added only once (the last one wins).
+
+        Args:
+            nodes (Iterable[NodeT]): Nodes to be added. See add_node().
+            batch_size (int, optional): Number of nodes added at once. Defaults to 1000.
+
+        Returns:
+            int: Number of (distinct per batch) nodes added.
+
+        Examples:
+            >>> das = DistributedAtomSpace()
+            >>> das.add_nodes(NodeT(type='Concept', name=name) for name in ['human', 'monkey'])
+            2
+        """
+        count = 0
+        iterator = iter(nodes)
+        while batch := list(islice(iterator, batch_size)):
+            count += self._add_atoms_batch(batch)
+        return count
+
+    def add_links(self, links: Iterable[LinkT], batch_size: int = 1000) -> int:
+        """
+        Adds many links to DAS, along with their targets.
+
+        Links are consumed from the passed iterable in batches of `batch_size` links so it can
+        be e.g. a generator reading links from a file. The handles of each batch are computed at
+        once, hashing nested targets shared among links only once, and the batch (including
+        its targets) is inserted with a single bulk insertion in the AtomDB. Links with the
+        same handle in the same batch are added only once (the last one wins).
+
+        Args:
+            links (Iterable[LinkT]): Links to be added. See add_link().
+            batch_size (int, optional): Number of links added at once. Defaults to 1000.
+
+        Returns:
+            int: Number of (distinct per batch) links added, not counting their targets.
+
+        Examples:
+            >>> das = DistributedAtomSpace()
+            >>> human = NodeT(type='Concept', name='human')
+            >>> das.add_links(
+                    LinkT(type='Similarity', targets=[human, NodeT(type='Concept', name=name)])
+                    for name in ['monkey', 'chimp']
+                )
+            2
+        """
+        count = 0
+        iterator = iter(links)
+        while batch := list(islice(iterator, batch_size)):
+            count += self._add_atoms_batch(batch)
+        return count
+
+    def load_metta(
+        self,
+        path_or_stream: Union[str, os.PathLike, IO],
+        batch_size: int = 1000,
+        processes: int = 1,
+        **kwargs,
+    ) -> Dict[str, Any]:
+        """
+        Loads the contents of a MeTTa file into DAS.
+
+        Each top-level expression is added as an `Expression` link whose targets are `Symbol`
+        nodes or nested `Expression` links. Expressions prefixed by `!` are skipped. The input is
+        parsed incrementally and atoms are added in batches (see add_links()) so memory usage
+        doesn't grow with the input size. Throughput is reported in the log as the load goes.
+
+        Args:
+            path_or_stream (Union[str, os.PathLike, IO]): Path to a MeTTa file or a stream with
+                MeTTa contents.
+            batch_size (int, optional): Number of expressions added at once. Defaults to 1000.
+            processes (int, optional): Number of processes used to parse the input file, each one
+                parsing a different chunk of it. Requires a path and top-level expressions
+                starting in the first column of a line. Defaults to 1.
+
+        Keyword Args:
+            chunk_bytes (int, optional): Approximate size of the chunks of the input file parsed
+                by each process. Defaults to 16MB.
+            encoding (str, optional): Encoding of the input. Defaults to 'utf-8'.
+            report_interval (int, optional): Throughput is logged whenever this number of
+                expressions is loaded. Defaults to 100000.
+
+        Returns:
+            Dict[str, Any]: Load statistics: number of loaded `expressions`, `elapsed_seconds` and
+                `expressions_per_second`.
+
+        Raises:
+            ValueError: If the input is not valid MeTTa.
+
+        Examples:
+            >>> das = DistributedAtomSpace()
+            >>> das.load_metta(io.StringIO('(: "human" Concept) (Similarity "human" "monkey")'))
+            {'expressions': 2, 'elapsed_seconds': 0.0001, 'expressions_per_second': 20000.0}
+        """
+        loader = MettaLoader(self, batch_size=batch_size, processes=processes, **kwargs)
+        return loader.load(path_or_stream)
 
     def reindex(self, pattern_index_templates: Optional[Dict[str, Dict[str, Any]]] = None):
         """
@@ -802,6 +1424,9 @@ class DistributedAtomSpace:
         the neighborhood and to use cache's "atom paging" capabilities to minimize
         latency when used in remote DAS.
 
+        When the system parameter 'traverse_prefetch' is True, the incoming links of the
+        cursor's neighborhood are fetched into the cache in background whenever the cursor moves.
+
         Args:
             handle (str): Atom's handle
 
@@ -812,11 +1437,24 @@ class DistributedAtomSpace:
         Returns:
             TraverseEngine: The object that allows traversal of the hypergraph.
         """
+        if self.cache_controller.traverse_prefetch_enabled():
+            kwargs.setdefault('prefetcher', self._get_traverse_prefetcher())
         try:
             return TraverseEngine(handle, das=self, **kwargs)
         except AtomDoesNotExist:
             raise GetTraversalCursorException(message="Cannot start Traversal. Atom does not exist")
 
+    def _get_traverse_prefetcher(self) -> TraversePrefetcher:
+        if self._traverse_prefetcher is None:
+            self._traverse_prefetcher = TraversePrefetcher(
+                lambda handle: list(get_incoming_links(self, handle)),
+                self.cache_controller,
+                depth=self.system_parameters['traverse_prefetch_depth'],
+                max_neighbors=self.system_parameters['traverse_prefetch_max_neighbors'],
+                max_workers=self.system_parameters['traverse_prefetch_threads'],
+            )
+        return self._traverse_prefetcher
+
     def create_field_index(
         self,
         atom_type: str,
@@ -879,7 +1517,7 @@ class DistributedAtomSpace:
         host: Optional[str] = None,
         port: Optional[int] = None,
         **kwargs,
-    ) -> Union[None, List[AtomT]]:
+    ) -> Union[None, List[AtomT], FetchProgress]:
         """
         Fetch, from a DAS Server, all atoms that match the passed query or
         all atoms in the server if None is passed as query.
@@ -897,18 +1535,43 @@ class DistributedAtomSpace:
         Variables can be used as link targets as well as nodes. Nested links are
         allowed as well.
 
+        When `page_size` is passed, atoms are fetched in pages (sorted by handle) which are
+        inserted as soon as they arrive, so the whole answer is never kept in memory. The space of
+        handles can be split in `partitions` ranges fetched in parallel. A FetchProgress is passed
+        to `progress_callback` after each inserted page; if the fetch is interrupted (e.g. by a
+        network error) the last one can be passed as `resume_from` to fetch only the remaining
+        pages.
+
+        When `delta` is True, only the atoms added or changed since the previous delta fetch of
+        the same query from the same server are transferred. High-water marks (digests of the
+        atoms the server had, per bucket of handles) are kept per server and query, and the
+        server sends only the buckets whose digests changed. Atoms removed from the server are
+        not removed locally.
+
         Args:
             query (Optional[Union[List[dict], dict]]): A pattern described as a link (possibly with
                 nested links) with nodes and variables used to query the knowledge base. Defaults to None
             host (Optional[str], optional): Address to remote server. Defaults to None.
             port (Optional[int], optional): Port to remote server. Defaults to None.
 
+        Keyword Args:
+            page_size (int, optional): Enables paged fetch with pages of this number of atoms.
+            partitions (int, optional): Number of handle ranges fetched in parallel in a paged
+                fetch. Defaults to 1.
+            progress_callback (Callable[[FetchProgress], None], optional): Called after each page
+                inserted by a paged fetch.
+            resume_from (FetchProgress, optional): Resumes an interrupted paged fetch (with the
+                same query and server). Its number of partitions is used.
+            delta (bool, optional): Fetches only atoms added or changed since the previous delta
+                fetch. Defaults to False.
+
         Raises:
             ValueError: If parameters ar somehow invalid.
 
         Returns:
-            Union[None, List[AtomT]]: Returns None.
-            If running on the server returns a list of Atom instances.
+            Union[None, List[AtomT], FetchProgress]: Returns the fetched atoms or, for a paged
+            fetch, the final FetchProgress. If running on the server returns a list of Atom
+            instances.
 
         Examples:
             >>> query = {
@@ -928,10 +1591,136 @@ class DistributedAtomSpace:
             if self._das_type != DasType.REMOTE and (not host or not port):
                 raise ValueError("'host' and 'port' are mandatory parameters to local DAS")
 
+        if kwargs.pop('delta', False):
+            return self._delta_fetch(query, host, port)
+
+        page_size = kwargs.pop('page_size', None)
+        resume_from = kwargs.pop('resume_from', None)
+        if page_size is not None or resume_from is not None:
+            return self._paged_fetch(
+                query,
+                host,
+                port,
+                page_size=page_size or 1000,
+                partitions=kwargs.pop('partitions', 1),
+                progress_callback=kwargs.pop('progress_callback', None),
+                resume_from=resume_from,
+            )
+
         documents = self.query_engine.fetch(query, host, port, **kwargs)
         self.backend.bulk_insert(documents)
+        self.cache_controller.invalidate_query_answers()
+        self.cache_controller.invalidate_incoming_links()
+        self.cache_controller.invalidate_nonexistent_handles()
+        return documents
+
+    def _paged_fetch(
+        self,
+        query: Optional[Union[List[dict], dict]],
+        host: Optional[str],
+        port: Optional[int],
+        page_size: int,
+        partitions: int,
+        progress_callback: Optional[Callable[[FetchProgress], None]],
+        resume_from: Optional[FetchProgress],
+    ) -> FetchProgress:
+        def insert(documents: List[AtomT]) -> None:
+            with self._write_lock:
+                self.backend.bulk_insert(documents)
+            self.cache_controller.invalidate_query_answers()
+            self.cache_controller.invalidate_incoming_links()
+            self.cache_controller.invalidate_nonexistent_handles()
+
+        def fetch_page(cursor, size, handle_range):
+            return self.query_engine.fetch_page(query, cursor, size, handle_range, host, port)
+
+        progress = PagedFetch(
+            fetch_page,
+            insert,
+            page_size=page_size,
+            partitions=partitions,
+            progress_callback=progress_callback,
+            progress=resume_from,
+        ).run()
+        logger().info(f'Fetched {progress.atoms} atoms in {progress.pages} pages')
+        return progress
+
+    def _delta_fetch(
+        self,
+        query: Optional[Union[List[dict], dict]],
+        host: Optional[str],
+        port: Optional[int],
+    ) -> List[AtomT]:
+        key = (host, port, json.dumps(query, sort_keys=True))
+        marks, documents = self.query_engine.fetch_delta(
+            query, self._fetch_marks.get(key, {}), host, port
+        )
+        with self._write_lock:
+            self.backend.bulk_insert(documents)
+        self.cache_controller.invalidate_query_answers()
+        self.cache_controller.invalidate_incoming_links()
+        self.cache_controller.invalidate_nonexistent_handles()
+        self._fetch_marks[key] = marks
         return documents
 
+    def fetch_delta(
+        self,
+        query: Optional[Union[List[dict], dict]] = None,
+        marks: Optional[DeltaMarksT] = None,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+    ) -> Tuple[DeltaMarksT, List[AtomT]]:
+        """
+        Fetch the atoms that match the passed query (or all atoms if None is passed as query)
+        which were added or changed since the passed marks were computed, without inserting them.
+
+        This is what fetch() uses when `delta` is True.
+
+        Args:
+            query (Optional[Union[List[dict], dict]]): A pattern used to select atoms (see
+                fetch()). Defaults to None.
+            marks (Optional[DeltaMarksT], optional): Marks returned by the previous delta fetch
+                of the same query. Defaults to None (fetch all atoms).
+            host (Optional[str], optional): Address to remote server. Defaults to None.
+            port (Optional[int], optional): Port to remote server. Defaults to None.
+
+        Returns:
+            Tuple[DeltaMarksT, List[AtomT]]: The current marks and the added or changed atoms.
+        """
+        return self.query_engine.fetch_delta(query, marks or {}, host, port)
+
+    def fetch_page(
+        self,
+        query: Optional[Union[List[dict], dict]] = None,
+        cursor: Optional[HandleT] = None,
+        page_size: int = 1000,
+        handle_range: Optional[HandleRangeT] = None,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+    ) -> Tuple[Optional[HandleT], List[AtomT]]:
+        """
+        Fetch one page of the atoms that match the passed query (or all atoms if None is passed
+        as query), without inserting them. Atoms are sorted by handle.
+
+        This is what fetch() uses, page after page, when `page_size` is passed.
+
+        Args:
+            query (Optional[Union[List[dict], dict]]): A pattern used to select atoms (see
+                fetch()). Defaults to None.
+            cursor (Optional[HandleT], optional): Handle of the last atom of the previous page or
+                None to get the first page. Defaults to None.
+            page_size (int, optional): Maximum number of atoms in the page. Defaults to 1000.
+            handle_range (Optional[HandleRangeT], optional): Only atoms with handles in this
+                range ([first, last), None meaning unbounded) are selected. Defaults to None.
+            host (Optional[str], optional): Address to remote server. Defaults to None.
+            port (Optional[int], optional): Port to remote server. Defaults to None.
+
+        Returns:
+            Tuple[Optional[HandleT], List[AtomT]]: Cursor to the next page (None if this is the
+                last page) and the atoms in the page.
+        """
+        return self.query_engine.fetch_page(query, cursor, page_size, handle_range, host, port)
+
     def create_context(
         self,
         name: str,
@@ -0,0 +1,59 @@
+import hashlib
+import json
+from typing import Dict, Iterable, List, Tuple
+
+from hyperon_das_atomdb.database import AtomT
+
+DeltaMarksT = Dict[str, str]
+"""High-water marks of a delta fetch: digest of the fetched atoms per bucket of handles."""
+
+DELTA_BUCKET_PREFIX_LENGTH = 3
+"""Atoms are grouped in buckets by the first characters of their handles (4096 buckets)."""
+
+
+def atom_digest(atom: AtomT) -> int:
+    """
+    Computes a digest of the contents of an atom: its handle (which covers type, name and
+    targets) and its custom attributes.
+
+    Args:
+        atom (AtomT): The atom.
+
+    Returns:
+        int: The digest.
+    """
+    custom_attributes = json.dumps(
+        getattr(atom, 'custom_attributes', None), sort_keys=True, default=str
+    )
+    content = f'{atom.handle} {custom_attributes}'.encode()
+    return int.from_bytes(hashlib.md5(content).digest(), 'big')
+
+
+def delta_atoms(atoms: Iterable[AtomT], marks: DeltaMarksT) -> Tuple[DeltaMarksT, List[AtomT]]:
+    """
+    Selects, out of the passed atoms, the ones in buckets which changed since the passed marks
+    were computed, i.e. buckets with atoms which were added or changed.
+
+    Args:
+        atoms (Iterable[AtomT]): All the atoms that match a query.
+        marks (DeltaMarksT): Marks returned by the previous delta fetch of the same query (or
+            an empty dict to select all atoms).
+
+    Returns:
+        Tuple[DeltaMarksT, List[AtomT]]: The current marks and the selected atoms.
+    """
+    buckets: Dict[str, List[AtomT]] = {}
+    digests: Dict[str, int] = {}
+    for atom in atoms:
+        bucket = atom.handle[:DELTA_BUCKET_PREFIX_LENGTH]
+        buckets.setdefault(bucket, []).append(atom)
+        # A sum makes the digest of a bucket independent of the order of its atoms
+        digests[bucket] = (digests.get(bucket, 0) + atom_digest(atom)) % (1 << 128)
+    current_marks = {bucket: f'{digest:032x}' for bucket, digest in digests.items()}
+    changed_atoms = [
+        atom
+        for bucket, mark in current_marks.items()
+        if marks.get(bucket) != mark
+        for atom in buckets[bucket]
+    ]
+    return current_marks, changed_atoms
@@ -35,6 +35,10 @@ class FunctionsConnectionError(_ConnectionError):
     """Exception raised for functions connection errors."""
 
 
+class CircuitOpenError(FunctionsConnectionError):
+    """Exception raised when requests to a failing remote DAS are refused by its circuit breaker."""
+
+
 class _TimeoutError(QueryEngineBaseException):
     """Exception raised for timeout errors."""
 
@@ -67,5 +71,9 @@ class InvalidQueryEngine(QueryEngineBaseException):
     """Exception raised for invalid query engines."""
 
 
+class WriteBehindBufferFull(QueryEngineBaseException):
+    """Exception raised when writers wait too long for pending atoms to be committed."""
+
+
 class GetTraversalCursorException(QueryEngineBaseException):
     """Exception raised for errors in getting traversal cursor."""
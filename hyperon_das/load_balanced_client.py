@@ -0,0 +1,210 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from threading import Condition, Thread, current_thread
+from typing import Any, Callable, List, Optional, Tuple
+
+from hyperon_das.client import FunctionsClient
+from hyperon_das.exceptions import FunctionsConnectionError, FunctionsTimeoutError, HTTPError
+from hyperon_das.logger import logger
+from hyperon_das.request_policy import IDEMPOTENT_ACTIONS, RETRYABLE_STATUS_CODES, RequestPolicy
+from hyperon_das.utils import check_server_connection, das_error
+
+EndpointT = Tuple[str, int]
+
+REMOTE_ACTIONS = IDEMPOTENT_ACTIONS | {'commit_changes', 'create_context', 'create_field_index'}
+"""FunctionsClient methods which send a request, named after their actions."""
+
+
+class ReplicaEndpoint:
+    """
+    A replica of the remote DAS and the state used to balance the load among the replicas: the
+    number of requests in flight and whether it's healthy.
+    """
+
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+        self.client: Optional[FunctionsClient] = None
+        self.outstanding = 0
+        self.healthy = False
+
+    def __repr__(self) -> str:
+        return f'{self.host}:{self.port}'
+
+
+class LoadBalancedClient:
+    """
+    LoadBalancedClient sends the requests of a DAS to several replicas of the remote DAS, i.e.
+    query-engine servers serving the same AtomSpace. It has the same methods as FunctionsClient.
+
+    Each request goes to the healthy replica with fewer requests in flight among two random ones
+    (power of two choices). Replicas failing with connection errors or timeouts are deemed
+    unhealthy and checked in the background with handshakes until they answer again. Read
+    operations failing that way are sent again to another replica (failover), while updates are
+    sent to a single replica.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[EndpointT],
+        request_policy: Optional[RequestPolicy] = None,
+        health_check_interval: float = 5.0,
+        client_factory: Callable[..., FunctionsClient] = FunctionsClient,
+        **client_kwargs,
+    ) -> None:
+        """
+        Args:
+            endpoints (List[EndpointT]): Host and port of each replica.
+            request_policy (Optional[RequestPolicy], optional): Policy of the requests to each
+                replica. Defaults to RequestPolicy().
+            health_check_interval (float, optional): Time, in seconds, between handshakes with
+                unhealthy replicas. Defaults to 5.0.
+            client_factory (Callable[..., FunctionsClient], optional): Builds the client of each
+                replica. Defaults to FunctionsClient.
+            **client_kwargs: Other FunctionsClient arguments.
+
+        Raises:
+            FunctionsConnectionError: If no replica can be connected to.
+        """
+        if not endpoints:
+            das_error(ValueError("At least one endpoint is required"))
+        self.request_policy = request_policy or RequestPolicy()
+        self.health_check_interval = health_check_interval
+        self.client_factory = client_factory
+        self.client_kwargs = client_kwargs
+        self.endpoints = [ReplicaEndpoint(host, port) for host, port in endpoints]
+        self.condition = Condition()
+        self.health_checker: Optional[Thread] = None
+        self.closed = False
+        # Handshakes with the replicas are made concurrently
+        with ThreadPoolExecutor(max_workers=len(self.endpoints)) as executor:
+            list(executor.map(self._connect, self.endpoints))
+        if not any(endpoint.healthy for endpoint in self.endpoints):
+            das_error(
+                FunctionsConnectionError(
+                    message='Failed to connect to any remote DAS replica',
+                    details=', '.join(str(endpoint) for endpoint in self.endpoints),
+                )
+            )
+        self._start_health_checker()
+
+    def close(self) -> None:
+        """
+        Stops the background thread which checks unhealthy replicas and closes the client of
+        each replica. Calling close() more than once has no effect.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+            health_checker = self.health_checker
+        if health_checker is not None and health_checker is not current_thread():
+            health_checker.join()
+        for endpoint in self.endpoints:
+            if endpoint.client is not None:
+                endpoint.client.close()
+
+    def _connect(self, endpoint: ReplicaEndpoint) -> None:
+        try:
+            endpoint.client = self.client_factory(
+                endpoint.host,
+                endpoint.port,
+                request_policy=self.request_policy,
+                **self.client_kwargs,
+            )
+            endpoint.healthy = True
+        except Exception as e:
+            logger().warning(f'Remote DAS replica {endpoint} is unavailable: {str(e)}')
+
+    def _check_health(self, endpoint: ReplicaEndpoint) -> bool:
+        if endpoint.client is None:
+            self._connect(endpoint)
+            return endpoint.healthy
+        status_code, _ = check_server_connection(endpoint.client.url)
+        return status_code == HTTPStatus.OK
+
+    def _start_health_checker(self) -> None:
+        with self.condition:
+            if self.closed or self.health_checker is not None:
+                return
+            if all(e.healthy for e in self.endpoints):
+                return
+            self.health_checker = Thread(
+                target=self._run_health_checks, name='das-replica-health-check', daemon=True
+            )
+            self.health_checker.start()
+
+    def _run_health_checks(self) -> None:
+        while True:
+            with self.condition:
+                unhealthy = [endpoint for endpoint in self.endpoints if not endpoint.healthy]
+                if unhealthy and not self.closed:
+                    self.condition.wait_for(lambda: self.closed, self.health_check_interval)
+                if not unhealthy or self.closed:
+                    self.health_checker = None
+                    return
+            for endpoint in unhealthy:
+                if self._check_health(endpoint):
+                    logger().info(f'Remote DAS replica {endpoint} is available again')
+                    with self.condition:
+                        endpoint.healthy = True
+                        self.condition.notify_all()
+
+    def _mark_unhealthy(self, endpoint: ReplicaEndpoint, error: Exception) -> None:
+        logger().warning(f'Remote DAS replica {endpoint} failed: {str(error)}')
+        with self.condition:
+            endpoint.healthy = False
+        self._start_health_checker()
+
+    def _choose(self, excluded: List[ReplicaEndpoint]) -> Optional[ReplicaEndpoint]:
+        with self.condition:
+            candidates = [e for e in self.endpoints if e.healthy and e not in excluded]
+            if not candidates:
+                return None
+            if len(candidates) == 1:
+                endpoint = candidates[0]
+            else:
+                first, second = random.sample(candidates, 2)
+                endpoint = first if first.outstanding <= second.outstanding else second
+            endpoint.outstanding += 1
+            return endpoint
+
+    def _release(self, endpoint: ReplicaEndpoint) -> None:
+        with self.condition:
+            endpoint.outstanding -= 1
+
+    def _call(self, action: str, *args, **kwargs) -> Any:
+        tried: List[ReplicaEndpoint] = []
+        error: Optional[Exception] = None
+        while (endpoint := self._choose(tried)) is not None:
+            tried.append(endpoint)
+            try:
+                return getattr(endpoint.client, action)(*args, **kwargs)
+            except (FunctionsConnectionError, FunctionsTimeoutError, HTTPError) as e:
+                if isinstance(e, HTTPError) and e.status_code not in RETRYABLE_STATUS_CODES:
+                    raise
+                self._mark_unhealthy(endpoint, e)
+                if action not in IDEMPOTENT_ACTIONS:
+                    raise
+                error = e
+            finally:
+                self._release(endpoint)
+        if error is not None:
+            raise error
+        das_error(
+            FunctionsConnectionError(
+                message='No remote DAS replica is available',
+                details=f'action: {action}',
+            )
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        if name in REMOTE_ACTIONS:
+            return lambda *args, **kwargs: self._call(name, *args, **kwargs)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    # Operations of batch requests are built and interpreted in the same way for all replicas
+    get_atom_operation = staticmethod(FunctionsClient.get_atom_operation)
+    get_links_operation = staticmethod(FunctionsClient.get_links_operation)
+    get_incoming_links_operation = staticmethod(FunctionsClient.get_incoming_links_operation)
+    batch_result = staticmethod(FunctionsClient.batch_result)
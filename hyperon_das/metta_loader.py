@@ -0,0 +1,184 @@
+import io
+import os
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import IO, TYPE_CHECKING, Any, Deque, Dict, Iterator, List, Union
+
+from hyperon_das_atomdb.database import LinkT, NodeT
+
+from hyperon_das.logger import logger
+from hyperon_das.tokenizers.metta_tokenizer import MettaExpression, iter_expressions
+
+if TYPE_CHECKING:  # pragma no cover
+    from hyperon_das.das import DistributedAtomSpace
+
+METTA_LINK_TYPE = 'Expression'
+METTA_NODE_TYPE = 'Symbol'
+
+
+def _find_chunks(path: Union[str, os.PathLike], chunk_bytes: int) -> List[tuple[int, int]]:
+    # Chunks are split right before lines starting a top-level expression, i.e. lines starting
+    # with '(' or '!' in the first column (nested lines of an expression are expected to be
+    # indented).
+    size = os.path.getsize(path)
+    offsets = [0]
+    with open(path, 'rb') as file:
+        while offsets[-1] + chunk_bytes < size:
+            file.seek(offsets[-1] + chunk_bytes)
+            file.readline()
+            while (line := file.readline()) and not line.startswith((b'(', b'!')):
+                pass
+            if not line:
+                break
+            offsets.append(file.tell() - len(line))
+    offsets.append(size)
+    return list(zip(offsets, offsets[1:]))
+
+
+def _parse_chunk(
+    path: Union[str, os.PathLike], start: int, end: int, encoding: str
+) -> List[MettaExpression]:
+    with open(path, 'rb') as file:
+        file.seek(start)
+        text = file.read(end - start).decode(encoding)
+    return list(iter_expressions(io.StringIO(text)))
+
+
+class MettaLoader:
+    """
+    Loads MeTTa files into a DAS, mapping each top-level expression to an `Expression` link whose
+    targets are `Symbol` nodes or nested `Expression` links (the same mapping used by the MeTTa
+    tokenizer). Top-level symbols are added as `Symbol` nodes.
+
+    The input is parsed incrementally and atoms are added in batches so memory usage is bounded
+    regardless of the input size. Parsing can optionally be spread across processes, each one
+    parsing a different chunk of the input file. The input is split into tokens by the compiled
+    MeTTa tokenizer when it's built (see iter_tokens()).
+    """
+
+    def __init__(
+        self,
+        das: 'DistributedAtomSpace',
+        batch_size: int = 1000,
+        processes: int = 1,
+        chunk_bytes: int = 1 << 24,
+        encoding: str = 'utf-8',
+        report_interval: int = 100000,
+    ) -> None:
+        """
+        Args:
+            das (DistributedAtomSpace): The DAS where the atoms are added.
+            batch_size (int, optional): Number of expressions added to the DAS at once. Defaults
+                to 1000.
+            processes (int, optional): Number of processes used to parse the input. Defaults to 1
+                (parse in the caller's process).
+            chunk_bytes (int, optional): Approximate size of the chunks of the input file parsed
+                by each process. Defaults to 16MB.
+            encoding (str, optional): Encoding of the input file. Defaults to 'utf-8'.
+            report_interval (int, optional): Throughput is logged whenever this number of
+                expressions is loaded. Defaults to 100000.
+        """
+        self.das = das
+        self.batch_size = batch_size
+        self.processes = processes
+        self.chunk_bytes = chunk_bytes
+        self.encoding = encoding
+        self.report_interval = report_interval
+
+    def load(self, source: Union[str, os.PathLike, IO]) -> Dict[str, Any]:
+        """
+        Loads all the expressions in the passed file or stream.
+
+        Args:
+            source (Union[str, os.PathLike, IO]): Path to a MeTTa file or a (text or binary)
+                stream with MeTTa contents. Parallel parsing requires a path.
+
+        Returns:
+            Dict[str, Any]: Load statistics: number of loaded `expressions`, `elapsed_seconds`
+                and `expressions_per_second`.
+
+        Raises:
+            ValueError: If the input is not valid MeTTa or if parallel parsing is requested for a
+                stream.
+        """
+        start_time = time.monotonic()
+        expressions = 0
+        next_report = self.report_interval
+        for batch in self._iter_batches(source):
+            self._add_batch(batch)
+            expressions += len(batch)
+            if expressions >= next_report:
+                next_report += self.report_interval
+                logger().info(self._report(expressions, start_time))
+        logger().info(self._report(expressions, start_time))
+        elapsed_seconds = time.monotonic() - start_time
+        return {
+            'expressions': expressions,
+            'elapsed_seconds': elapsed_seconds,
+            'expressions_per_second': expressions / elapsed_seconds if elapsed_seconds else 0.0,
+        }
+
+    @staticmethod
+    def _report(expressions: int, start_time: float) -> str:
+        elapsed_seconds = time.monotonic() - start_time
+        rate = expressions / elapsed_seconds if elapsed_seconds else 0.0
+        return (
+            f'MeTTa loader: {expressions} expressions loaded in {elapsed_seconds:.2f}s '
+            f'({rate:.0f} expressions/s)'
+        )
+
+    def _iter_batches(self, source: Union[str, os.PathLike, IO]) -> Iterator[List[MettaExpression]]:
+        if isinstance(source, (str, os.PathLike)):
+            if self.processes > 1:
+                yield from self._iter_parallel_batches(source)
+            else:
+                with open(source, encoding=self.encoding) as stream:
+                    yield from self._split(iter_expressions(stream))
+        else:
+            if self.processes > 1:
+                raise ValueError('Parallel parsing requires a path, not a stream')
+            if isinstance(source, (io.RawIOBase, io.BufferedIOBase)):
+                source = io.TextIOWrapper(source, encoding=self.encoding)
+            yield from self._split(iter_expressions(source))
+
+    def _iter_parallel_batches(
+        self, path: Union[str, os.PathLike]
+    ) -> Iterator[List[MettaExpression]]:
+        # At most two chunks per process are parsed (or waiting to be consumed) at any time so
+        # parsing can't get too far ahead of insertion.
+        chunks = iter(_find_chunks(path, self.chunk_bytes))
+        pending: Deque[Future] = deque()
+        with ProcessPoolExecutor(max_workers=self.processes) as executor:
+            while True:
+                for start, end in islice(chunks, 2 * self.processes - len(pending)):
+                    pending.append(executor.submit(_parse_chunk, path, start, end, self.encoding))
+                if not pending:
+                    return
+                yield from self._split(iter(pending.popleft().result()))
+
+    def _split(self, expressions: Iterator[MettaExpression]) -> Iterator[List[MettaExpression]]:
+        while batch := list(islice(expressions, self.batch_size)):
+            yield batch
+
+    def _add_batch(self, batch: List[MettaExpression]) -> None:
+        # A single NodeT is built per distinct symbol of the batch and shared among the links
+        # which use it, so it's hashed only once (see add_links())
+        symbols: Dict[str, NodeT] = {}
+
+        def to_atom(expression: MettaExpression) -> Union[NodeT, LinkT]:
+            if isinstance(expression, str):
+                if (node := symbols.get(expression)) is None:
+                    node = symbols[expression] = NodeT(type=METTA_NODE_TYPE, name=expression)
+                return node
+            if not expression:
+                raise ValueError('Empty expressions are not supported')
+            return LinkT(type=METTA_LINK_TYPE, targets=[to_atom(target) for target in expression])
+
+        links = [to_atom(expression) for expression in batch if not isinstance(expression, str)]
+        nodes = [to_atom(expression) for expression in batch if isinstance(expression, str)]
+        if nodes:
+            self.das.add_nodes(nodes, batch_size=len(nodes))
+        if links:
+            self.das.add_links(links, batch_size=len(links))
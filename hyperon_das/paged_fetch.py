@@ -0,0 +1,308 @@
+import base64
+import hashlib
+import json
+import time
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from threading import Event, Lock
+from typing import Any, Callable, Generic, Iterable, List, Optional, Tuple, TypeVar
+
+from hyperon_das_atomdb.database import AtomT, HandleT
+
+HandleRangeT = Tuple[Optional[str], Optional[str]]
+"""A range of handles: [first, last). None means unbounded."""
+
+FetchPageT = Callable[[Optional[HandleT], int, HandleRangeT], Tuple[Optional[HandleT], List[AtomT]]]
+"""Fetches a page: (cursor, page_size, handle_range) -> (next cursor or None, atoms)."""
+
+HANDLE_RANGE_PREFIX_LENGTH = 8
+
+ContinuationTokenT = str
+"""Opaque token used to request the page following the ones already returned by a scan."""
+
+T = TypeVar('T')
+
+
+def split_handle_range(partitions: int) -> List[HandleRangeT]:
+    """
+    Splits the space of handles (hexadecimal strings) in consecutive ranges of similar size.
+
+    Args:
+        partitions (int): Number of ranges.
+
+    Returns:
+        List[HandleRangeT]: The handle ranges.
+    """
+    space = 16**HANDLE_RANGE_PREFIX_LENGTH
+    bounds: List[Optional[str]] = [
+        f'{i * space // partitions:0{HANDLE_RANGE_PREFIX_LENGTH}x}' for i in range(1, partitions)
+    ]
+    bounds = [None, *bounds, None]
+    return list(zip(bounds, bounds[1:]))
+
+
+def in_handle_range(handle: HandleT, handle_range: Optional[HandleRangeT]) -> bool:
+    first, last = handle_range or (None, None)
+    return (first is None or handle >= first) and (last is None or handle < last)
+
+
+class _Snapshot(Generic[T]):
+    def __init__(self, items: List[T], handles: List[HandleT]) -> None:
+        self.items = items
+        self.handles = handles
+        self.last_used = time.monotonic()
+
+
+class ScanSnapshots:
+    """
+    ScanSnapshots keeps, for the scans (i.e. paged requests) in progress, the items they return
+    sorted by handle, so each page is found by bisecting the snapshot instead of gathering and
+    sorting all the items of the scan again. As pages are ranges of handles, requesting the same
+    page twice returns the same items and no item is returned in two pages.
+
+    The snapshot of a scan is taken when its first page is requested, or when a later page is
+    requested and the snapshot isn't available anymore (it's discarded after `ttl` seconds
+    without use or when there are more than `max_snapshots` snapshots).
+    """
+
+    def __init__(self, max_snapshots: int = 32, ttl: float = 300.0) -> None:
+        """
+        Args:
+            max_snapshots (int, optional): Maximum number of snapshots kept. The least recently
+                used ones are discarded first. Defaults to 32.
+            ttl (float, optional): Time, in seconds, a snapshot is kept without being used.
+                Defaults to 300.0.
+        """
+        self.max_snapshots = max_snapshots
+        self.ttl = ttl
+        self.snapshots: OrderedDict[str, _Snapshot] = OrderedDict()
+        self.lock = Lock()
+
+    def page(
+        self,
+        scan: Any,
+        cursor: Optional[HandleT],
+        page_size: int,
+        load: Callable[[], Iterable[T]],
+        handle_of: Callable[[T], HandleT],
+    ) -> Tuple[Optional[HandleT], List[T]]:
+        """
+        Selects the page of items of a scan whose handles follow `cursor`.
+
+        Args:
+            scan (Any): JSON serializable description of the scan (e.g. its parameters).
+            cursor (Optional[HandleT]): Handle of the last item of the previous page or None to
+                get the first page.
+            page_size (int): Maximum number of items in the page.
+            load (Callable[[], Iterable[T]]): Function which returns all the items of the scan,
+                called to take a snapshot.
+            handle_of (Callable[[T], HandleT]): Function which returns the handle of an item.
+
+        Returns:
+            Tuple[Optional[HandleT], List[T]]: Cursor to the next page (None if this is the last
+                page) and the items in the page.
+        """
+        key = _scan_digest(scan)
+        snapshot = None if cursor is None else self._get(key)
+        taken = snapshot is None
+        if taken:
+            items = sorted(load(), key=handle_of)
+            snapshot = _Snapshot(items, [handle_of(item) for item in items])
+        start = 0 if cursor is None else bisect_right(snapshot.handles, cursor)
+        end = start + page_size
+        next_cursor = snapshot.handles[end - 1] if end < len(snapshot.handles) else None
+        if next_cursor is None:
+            # The scan is over
+            with self.lock:
+                self.snapshots.pop(key, None)
+        elif taken:
+            self._put(key, snapshot)
+        return next_cursor, snapshot.items[start:end]
+
+    def _get(self, key: str) -> Optional[_Snapshot]:
+        with self.lock:
+            self._discard_expired()
+            if (snapshot := self.snapshots.get(key)) is not None:
+                snapshot.last_used = time.monotonic()
+                self.snapshots.move_to_end(key)
+            return snapshot
+
+    def _put(self, key: str, snapshot: _Snapshot) -> None:
+        with self.lock:
+            self.snapshots[key] = snapshot
+            self.snapshots.move_to_end(key)
+            while len(self.snapshots) > self.max_snapshots:
+                self.snapshots.popitem(last=False)
+
+    def _discard_expired(self) -> None:
+        now = time.monotonic()
+        while self.snapshots:
+            key, snapshot = next(iter(self.snapshots.items()))
+            if now - snapshot.last_used < self.ttl:
+                return
+            del self.snapshots[key]
+
+
+def _scan_digest(scan: Any) -> str:
+    content = json.dumps(scan, sort_keys=True, default=str).encode()
+    return hashlib.md5(content).hexdigest()[:16]
+
+
+def encode_continuation_token(cursor: HandleT, scan: Any) -> ContinuationTokenT:
+    """
+    Builds the continuation token of a scan, i.e. a paged request (e.g. all the incoming links
+    of an atom), which resumes it after the item with the passed handle.
+
+    Args:
+        cursor (HandleT): Handle of the last item returned by the scan.
+        scan (Any): JSON serializable description of the scan (e.g. its parameters). Tokens
+            can only be used to resume the scan they were built for.
+
+    Returns:
+        ContinuationTokenT: The token.
+    """
+    data = json.dumps({'after': cursor, 'scan': _scan_digest(scan)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+
+def decode_continuation_token(token: Optional[ContinuationTokenT], scan: Any) -> Optional[HandleT]:
+    """
+    Extracts, from a continuation token built by encode_continuation_token(), the handle after
+    which the scan is resumed.
+
+    Args:
+        token (Optional[ContinuationTokenT]): The token or None to start the scan.
+        scan (Any): Description of the scan being resumed.
+
+    Returns:
+        Optional[HandleT]: The handle or None if no token was passed.
+
+    Raises:
+        ValueError: If the token is malformed or was built for another scan.
+    """
+    if token is None:
+        return None
+    try:
+        data = json.loads(base64.urlsafe_b64decode(token.encode()))
+        cursor, digest = data['after'], data['scan']
+    except (ValueError, KeyError, TypeError, AttributeError):
+        raise ValueError(f'Invalid continuation token: {token}')
+    if digest != _scan_digest(scan):
+        raise ValueError('Continuation token was issued for a different request')
+    return cursor
+
+
+@dataclass
+class FetchProgress:
+    """
+    Progress of a paged fetch. It can be passed back to fetch() to resume an interrupted fetch.
+
+    Attributes:
+        cursors (List[Optional[HandleT]]): Per handle range, handle of the last atom of the last
+            inserted page.
+        finished (List[bool]): Per handle range, whether all of its pages were inserted.
+        pages (int): Number of inserted pages.
+        atoms (int): Number of inserted atoms.
+    """
+
+    cursors: List[Optional[HandleT]]
+    finished: List[bool]
+    pages: int = 0
+    atoms: int = 0
+
+    @property
+    def done(self) -> bool:
+        return all(self.finished)
+
+
+class PagedFetch:
+    """
+    PagedFetch fetches atoms page by page, inserting each page as soon as it arrives, so only a
+    few pages are kept in memory at any time. The space of handles is split in ranges which are
+    fetched in parallel, each one page after page. Progress is reported after each inserted page
+    and an interrupted fetch can be resumed from it.
+    """
+
+    def __init__(
+        self,
+        fetch_page: FetchPageT,
+        insert: Callable[[List[AtomT]], None],
+        page_size: int = 1000,
+        partitions: int = 1,
+        progress_callback: Optional[Callable[[FetchProgress], None]] = None,
+        progress: Optional[FetchProgress] = None,
+    ) -> None:
+        """
+        Args:
+            fetch_page (FetchPageT): Function used to fetch a page.
+            insert (Callable[[List[AtomT]], None]): Function used to insert the atoms of a page.
+            page_size (int, optional): Maximum number of atoms per page. Defaults to 1000.
+            partitions (int, optional): Number of handle ranges fetched in parallel. Defaults
+                to 1.
+            progress_callback (Optional[Callable[[FetchProgress], None]], optional): Called with
+                a snapshot of the progress after each inserted page. Defaults to None.
+            progress (Optional[FetchProgress], optional): Progress of a previous (interrupted)
+                fetch to be resumed. The number of partitions is taken from it. Defaults to None.
+        """
+        self.fetch_page = fetch_page
+        self.insert = insert
+        self.page_size = page_size
+        self.progress_callback = progress_callback
+        if progress is None:
+            self.progress = FetchProgress(
+                cursors=[None] * partitions, finished=[False] * partitions
+            )
+        else:
+            self.progress = self._copy(progress)
+        self.lock = Lock()
+        self.stop = Event()
+
+    @staticmethod
+    def _copy(progress: FetchProgress) -> FetchProgress:
+        return replace(progress, cursors=list(progress.cursors), finished=list(progress.finished))
+
+    def run(self) -> FetchProgress:
+        """
+        Fetches and inserts all the (remaining) pages.
+
+        Returns:
+            FetchProgress: Final progress.
+
+        Raises:
+            Exception: The first error raised while fetching or inserting a page. The last
+                progress passed to `progress_callback` can then be used to resume the fetch.
+        """
+        handle_ranges = split_handle_range(len(self.progress.cursors))
+        pending = [i for i, finished in enumerate(self.progress.finished) if not finished]
+        if len(pending) == 1:
+            self._fetch_range(pending[0], handle_ranges[pending[0]])
+        elif pending:
+            with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+                futures = [executor.submit(self._fetch_range, i, handle_ranges[i]) for i in pending]
+            for future in futures:
+                future.result()
+        return self._copy(self.progress)
+
+    def _fetch_range(self, index: int, handle_range: HandleRangeT) -> None:
+        cursor = self.progress.cursors[index]
+        try:
+            while not self.stop.is_set():
+                next_cursor, atoms = self.fetch_page(cursor, self.page_size, handle_range)
+                if atoms:
+                    self.insert(atoms)
+                with self.lock:
+                    if atoms:
+                        cursor = self.progress.cursors[index] = atoms[-1].handle
+                    self.progress.finished[index] = next_cursor is None
+                    self.progress.pages += 1
+                    self.progress.atoms += len(atoms)
+                    if self.progress_callback:
+                        self.progress_callback(self._copy(self.progress))
+                if next_cursor is None:
+                    return
+        except Exception:
+            # Other ranges stop after their current page
+            self.stop.set()
+            raise
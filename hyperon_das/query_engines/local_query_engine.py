@@ -1,5 +1,6 @@
-from collections import OrderedDict
-from typing import Any, Dict, Iterator, List, Optional, Set, Union
+from collections import OrderedDict, deque
+from threading import Lock
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 
 from hyperon_das_atomdb import WILDCARD, AtomDB
 from hyperon_das_atomdb.adapters import InMemoryDB
@@ -14,24 +15,54 @@ from hyperon_das_atomdb.database import (
 )
 from hyperon_das_atomdb.exceptions import AtomDoesNotExist
 
+from hyperon_das.cache.adaptive_chunk_size import AdaptiveChunkSizes
 from hyperon_das.cache.cache_controller import CacheController
 from hyperon_das.cache.iterators import (
+    DEFAULT_PREFETCH_PAGES,
+    INCOMING_LINKS_FILTERS,
     AndEvaluator,
     CustomQuery,
     LazyQueryEvaluator,
     ListIterator,
+    LocalIncomingLinks,
     QueryAnswerIterator,
 )
+from hyperon_das.cache.page_fetch_executor import PageFetchExecutor
 from hyperon_das.client import FunctionsClient
 from hyperon_das.context import Context
+from hyperon_das.delta_fetch import DeltaMarksT, delta_atoms
 from hyperon_das.exceptions import UnexpectedQueryFormat
 from hyperon_das.link_filters import LinkFilter, LinkFilterType
 from hyperon_das.logger import logger
+from hyperon_das.paged_fetch import (
+    ContinuationTokenT,
+    HandleRangeT,
+    ScanSnapshots,
+    decode_continuation_token,
+    encode_continuation_token,
+    in_handle_range,
+)
 from hyperon_das.query_engines.query_engine_protocol import QueryEngine
-from hyperon_das.type_alias import Query
+from hyperon_das.request_policy import RequestPolicy
+from hyperon_das.type_alias import BatchEntryT, BatchOperationT, Query
 from hyperon_das.utils import Assignment, QueryAnswer, das_error
 
 
+def _document_handle(document: Any) -> HandleT:
+    return document['handle'] if isinstance(document, dict) else document.handle
+
+
+def _link_filter(link_filter_input: Dict[str, Any]) -> LinkFilter:
+    # Inverse of FunctionsClient._link_filter_input()
+    return LinkFilter(
+        filter_type=LinkFilterType(link_filter_input['filter_type']),
+        toplevel_only=link_filter_input.get('toplevel_only', False),
+        link_type=link_filter_input.get('link_type') or WILDCARD,
+        target_types=link_filter_input.get('target_types') or None,
+        targets=link_filter_input.get('targets') or None,
+    )
+
+
 class LocalQueryEngine(QueryEngine):
     def __init__(
         self,
@@ -42,8 +73,18 @@ class LocalQueryEngine(QueryEngine):
     ) -> None:
         self.system_parameters = system_parameters
         self.local_backend = backend
-        self.buffer: list[dict[str, Any]] = []
+        self.track_changes = False
+        self.dirty_handles: Set[HandleT] = set()
+        self.dirty_handles_lock = Lock()
         self.cache_controller = cache_controller
+        self.fetch_clients: Dict[Tuple[str, int], FunctionsClient] = {}
+        self.fetch_clients_lock = Lock()
+        self.page_fetch_executor: Optional[PageFetchExecutor] = kwargs.get('page_fetch_executor')
+        self.chunk_sizes = AdaptiveChunkSizes(system_parameters)
+        self.scan_snapshots = ScanSnapshots(
+            max_snapshots=system_parameters.get('scan_snapshots_max', 32),
+            ttl=system_parameters.get('scan_snapshots_ttl', 300.0),
+        )
 
     def _recursive_query(
         self,
@@ -121,34 +162,28 @@ class LocalQueryEngine(QueryEngine):
         except AtomDoesNotExist:
             return []
 
-    def _process_link(self, query: dict) -> List[LinkT]:
+    def _process_link(self, query: dict) -> Iterator[AtomT]:
+        # Breadth-first traversal from the matched links down to their (nested) targets. The
+        # visited set is checked before any lookup so atoms shared by several links are looked
+        # up once.
         target_handles = self._generate_target_handles(query['targets'])
         matched_links = self.local_backend.get_matched_links(
             link_type=query["type"], target_handles=target_handles
         )
-        unique_handles = set()
-        result = []
-
-        for link_handle in matched_links:
-            link_targets = self.get_atom(link_handle).targets
-
-            if link_handle not in unique_handles:
-                unique_handles.add(link_handle)
-                result.append(self.local_backend.get_atom(link_handle, no_target_format=True))
-
-            for target in link_targets:
-                atoms = self._handle_to_atoms(target)
-                if isinstance(atoms, list):
-                    for atom in atoms:
-                        if atom.id not in unique_handles:
-                            unique_handles.add(atom.id)
-                            result.append(atom)
-                else:
-                    if atoms.id not in unique_handles:
-                        unique_handles.add(atoms.id)
-                        result.append(atoms)
-
-        return result
+        visited: Set[HandleT] = set()
+        frontier = deque(matched_links)
+        while frontier:
+            handle = frontier.popleft()
+            if handle in visited:
+                continue
+            visited.add(handle)
+            try:
+                atom = self.local_backend.get_atom(handle, no_target_format=True)
+            except AtomDoesNotExist:
+                continue
+            yield atom
+            if isinstance(atom, LinkT):
+                frontier.extend(target for target in atom.targets if target not in visited)
 
     def _generate_target_handles(
         self, targets: List[Dict[str, Any]]
@@ -166,28 +201,46 @@ class LocalQueryEngine(QueryEngine):
             targets_hash.append(handle)
         return targets_hash
 
-    def _handle_to_atoms(self, handle: str) -> Union[List[AtomT], AtomT]:
-        try:
-            atom = self.local_backend.get_atom(handle, no_target_format=True)
-        except AtomDoesNotExist:
-            return []
-
-        if isinstance(atom, NodeT):
-            return atom
-        else:  # link
-            answer = [atom]
-            for target in atom.targets:
-                answer.append(self._handle_to_atoms(target))
-            return answer
+    def regard_added_atom(self, atom: AtomT) -> None:
+        if not self.track_changes or atom is None:
+            return
+        pending = [atom.handle]
+        with self.dirty_handles_lock:
+            while pending:
+                handle = pending.pop()
+                if handle in self.dirty_handles:
+                    continue
+                self.dirty_handles.add(handle)
+                try:
+                    added_atom = self.local_backend.get_atom(handle)
+                except AtomDoesNotExist:
+                    continue
+                if isinstance(added_atom, LinkT):
+                    pending.extend(added_atom.targets)
 
     def has_buffer(self) -> bool:
         if isinstance(self.local_backend, InMemoryDB):
-            atoms = self.local_backend.db.node
-            atoms.update(self.local_backend.db.link)
-            self.buffer = list(atoms.values())
-            return bool(atoms)
+            return bool(self.dirty_handles)
         return False
 
+    def get_buffer_chunks(self, chunk_size: int) -> Iterator[tuple[list[HandleT], list[AtomT]]]:
+        with self.dirty_handles_lock:
+            handles = list(self.dirty_handles)
+        for start in range(0, len(handles), chunk_size):
+            chunk_handles = handles[start : start + chunk_size]
+            chunk = []
+            for handle in chunk_handles:
+                atom = self.local_backend.db.node.get(handle) or self.local_backend.db.link.get(
+                    handle
+                )
+                if atom is not None:
+                    chunk.append(atom)
+            yield chunk_handles, chunk
+
+    def discard_from_buffer(self, handles: list[HandleT]) -> None:
+        with self.dirty_handles_lock:
+            self.dirty_handles.difference_update(handles)
+
     def get_atom(self, handle: str, **kwargs) -> AtomT:
         try:
             return self.local_backend.get_atom(handle, **kwargs)
@@ -197,7 +250,14 @@ class LocalQueryEngine(QueryEngine):
     def get_atoms(self, handles: str, **kwargs) -> List[AtomT]:
         return [self.local_backend.get_atom(handle, **kwargs) for handle in handles]
 
-    def get_link_handles(self, link_filter: LinkFilter) -> HandleSetT:
+    def get_link_handles(self, link_filter: LinkFilter) -> HandleSetT | HandleListT:
+        handles = self._get_link_handles(link_filter)
+        if self.system_parameters.get('running_on_server'):
+            # Sent to clients as a plain (compact) list
+            return list(handles)
+        return handles
+
+    def _get_link_handles(self, link_filter: LinkFilter) -> HandleSetT:
         if link_filter.filter_type == LinkFilterType.FLAT_TYPE_TEMPLATE:
             return self.local_backend.get_matched_type_template(
                 [link_filter.link_type, *link_filter.target_types],
@@ -222,10 +282,148 @@ class LocalQueryEngine(QueryEngine):
             return []
 
     def get_incoming_links(self, atom_handle: str, **kwargs) -> IncomingLinksT:
+        if not kwargs.pop('no_iterator', True):
+            # The links of the following pages (if any) are requested by the iterator as it goes.
+            # Pages left empty by the filters are skipped, as the iterator stops at an empty one
+            handles_kwargs = {**kwargs, 'handles_only': True}
+            cursor, handles = self._incoming_links_page(
+                self.get_incoming_links(atom_handle, **handles_kwargs)
+            )
+            while not handles and cursor not in (0, None):
+                handles_kwargs['cursor'] = cursor
+                cursor, handles = self._incoming_links_page(
+                    self.get_incoming_links(atom_handle, **handles_kwargs)
+                )
+            iterator = LocalIncomingLinks(
+                ListIterator(handles),
+                backend=self,
+                chunk_size=kwargs.get('chunk_size', 500),
+                cursor=cursor,
+                atom_handle=atom_handle,
+                targets_document=kwargs.get('targets_document', False),
+                executor=self.page_fetch_executor,
+                **{key: kwargs.get(key) for key in INCOMING_LINKS_FILTERS},
+            )
+            return cursor, iterator
+        link_type = kwargs.pop('link_type', None)
+        cursor_position = kwargs.pop('cursor_position', None)
+        target_type = kwargs.pop('target_type', None)
+        if link_type or cursor_position is not None or target_type:
+            # Links are checked against the structural filters on their own so the documents of
+            # the targets (if requested) are only looked up for links which pass them. A page
+            # of the backend (when `cursor` is passed) stays a page, with the backend's cursor.
+            page = self.local_backend.get_incoming_links_handles(atom_handle, **kwargs)
+            cursor, handles = self._incoming_links_page(page)
+            handles = [
+                handle
+                for handle in handles
+                if self._is_matching_incoming_link(
+                    atom_handle, handle, link_type, cursor_position, target_type
+                )
+            ]
+            if kwargs.get("handles_only", False):
+                links = handles
+            else:
+                links = [self.local_backend.get_atom(handle, **kwargs) for handle in handles]
+            return (cursor, links) if isinstance(page, tuple) else links
         if kwargs.get("handles_only", False):
             return self.local_backend.get_incoming_links_handles(atom_handle, **kwargs)
         return self.local_backend.get_incoming_links_atoms(atom_handle, **kwargs)
 
+    @staticmethod
+    def _incoming_links_page(page: IncomingLinksT) -> Tuple[Any, List[Any]]:
+        # Backends return a (cursor, links) page when a cursor is passed and may return all the
+        # links at once otherwise
+        return page if isinstance(page, tuple) else (0, page)
+
+    def _is_matching_incoming_link(
+        self,
+        atom_handle: HandleT,
+        link_handle: HandleT,
+        link_type: Optional[str],
+        cursor_position: Optional[int],
+        target_type: Optional[str],
+    ) -> bool:
+        try:
+            link = self.local_backend.get_atom(link_handle)
+        except AtomDoesNotExist:
+            return False
+        if link_type and link.named_type != link_type:
+            return False
+        if cursor_position is not None:
+            try:
+                if link.targets[cursor_position] != atom_handle:
+                    return False
+            except IndexError:
+                return False
+        if target_type:
+            return any(
+                self.local_backend.get_atom_type(target) == target_type for target in link.targets
+            )
+        return True
+
+    def expand(
+        self,
+        handle: HandleT,
+        depth: int = 1,
+        link_type: Optional[str] = None,
+        target_type: Optional[str] = None,
+        max_nodes: Optional[int] = None,
+        strategy: str = 'bfs',
+    ) -> Iterator[AtomT] | List[AtomT]:
+        if strategy not in ('bfs', 'dfs'):
+            das_error(ValueError(f"Invalid strategy: {strategy}. Use 'bfs' or 'dfs' instead."))
+        atoms = self._expand(handle, depth, link_type, target_type, max_nodes, strategy)
+        if self.system_parameters.get('running_on_server'):
+            return list(atoms)
+        return atoms
+
+    def _expand(
+        self,
+        handle: HandleT,
+        depth: int,
+        link_type: Optional[str],
+        target_type: Optional[str],
+        max_nodes: Optional[int],
+        strategy: str,
+    ) -> Iterator[AtomT]:
+        # The frontier holds (handle, distance) pairs: it's used as a FIFO queue in BFS and as a
+        # stack in DFS. Atoms (and links) are looked up once, even if they are reached through
+        # several paths, so in DFS an atom may be visited through a path longer than the
+        # shortest one.
+        visited: Set[HandleT] = {handle}
+        visited_links: Set[HandleT] = set()
+        frontier = deque([(handle, 0)])
+        count = 0
+        while frontier and depth > 0:
+            current, distance = frontier.popleft() if strategy == 'bfs' else frontier.pop()
+            for link_handle in self.local_backend.get_incoming_links_handles(current):
+                if link_handle in visited_links:
+                    continue
+                visited_links.add(link_handle)
+                try:
+                    link = self.local_backend.get_atom(link_handle)
+                except AtomDoesNotExist:
+                    continue
+                if link_type and link.named_type != link_type:
+                    continue
+                for target_handle in link.targets:
+                    if target_handle in visited:
+                        continue
+                    visited.add(target_handle)
+                    try:
+                        target = self.local_backend.get_atom(target_handle)
+                    except AtomDoesNotExist:
+                        continue
+                    if target_type and target.named_type != target_type:
+                        continue
+                    yield target
+                    count += 1
+                    if max_nodes is not None and count >= max_nodes:
+                        return
+                    if distance + 1 < depth:
+                        frontier.append((target_handle, distance + 1))
+
     def query(
         self,
         query: Query,
@@ -249,17 +447,120 @@ class LocalQueryEngine(QueryEngine):
     def custom_query(
         self, index_id: str, query: list[OrderedDict[str, str]], **kwargs
     ) -> Iterator | tuple[int, list[AtomT]]:
+        prefetch_pages = kwargs.pop('prefetch_pages', DEFAULT_PREFETCH_PAGES)
         if kwargs.pop('no_iterator', True):
             return self.local_backend.get_atoms_by_index(index_id, query=query, **kwargs)
         else:
             if kwargs.get('cursor') is None:
                 kwargs['cursor'] = 0
+            chunk_sizer = self.chunk_sizes.get(index_id, kwargs.get('chunk_size'))
+            if chunk_sizer is not None:
+                kwargs['chunk_size'] = chunk_sizer.chunk_size
             cursor, answer = self.local_backend.get_atoms_by_index(index_id, query=query, **kwargs)
             kwargs['backend'] = self.local_backend
             kwargs['index_id'] = index_id
+            kwargs['query'] = query
             kwargs['cursor'] = cursor
+            kwargs['prefetch_pages'] = prefetch_pages
+            kwargs['executor'] = self.page_fetch_executor
+            kwargs['chunk_sizer'] = chunk_sizer
             return CustomQuery(ListIterator(answer), **kwargs)
 
+    def get_incoming_links_page(
+        self,
+        atom_handle: HandleT,
+        continuation_token: Optional[ContinuationTokenT] = None,
+        chunk_size: int = 500,
+        **kwargs,
+    ) -> Tuple[Optional[ContinuationTokenT], IncomingLinksT]:
+        filters = {key: kwargs.pop(key) for key in INCOMING_LINKS_FILTERS if key in kwargs}
+        handles_only = kwargs.pop('handles_only', False)
+        scan = ['get_incoming_links', atom_handle, filters]
+        cursor = self._decode_continuation_token(continuation_token, scan)
+
+        # The handles are gathered once per scan and the following pages come from the snapshot
+        def load() -> List[HandleT]:
+            return self.get_incoming_links(atom_handle, handles_only=True, **filters)
+
+        next_cursor, page = self.scan_snapshots.page(
+            scan, cursor, chunk_size, load, lambda handle: handle
+        )
+        if not handles_only:
+            page = [self.local_backend.get_atom(handle, **kwargs) for handle in page]
+        return self._continuation_token(next_cursor, scan), page
+
+    def custom_query_page(
+        self,
+        index_id: str,
+        query: Query,
+        continuation_token: Optional[ContinuationTokenT] = None,
+        chunk_size: int = 1000,
+        **kwargs,
+    ) -> Tuple[Optional[ContinuationTokenT], List[AtomT]]:
+        scan = ['custom_query', index_id, query, kwargs]
+        cursor = self._decode_continuation_token(continuation_token, scan)
+
+        # The index is scanned with its own (unstable) cursor once per scan and paged by handle
+        # from the snapshot instead
+        def load() -> List[AtomT]:
+            index_cursor, atoms = self.local_backend.get_atoms_by_index(
+                index_id, query=query, cursor=0, chunk_size=chunk_size, **kwargs
+            )
+            atoms = list(atoms)
+            while index_cursor:
+                index_cursor, chunk = self.local_backend.get_atoms_by_index(
+                    index_id, query=query, cursor=index_cursor, chunk_size=chunk_size, **kwargs
+                )
+                atoms.extend(chunk)
+            return atoms
+
+        next_cursor, page = self.scan_snapshots.page(
+            scan, cursor, chunk_size, load, _document_handle
+        )
+        return self._continuation_token(next_cursor, scan), page
+
+    def batch(self, operations: List[BatchOperationT]) -> List[BatchEntryT]:
+        entries = []
+        for operation in operations:
+            try:
+                entries.append({'result': self._run_batch_operation(operation)})
+            except AtomDoesNotExist as exception:
+                entries.append({'error': str(exception), 'status_code': 404})
+            except (ValueError, KeyError, TypeError) as exception:
+                entries.append({'error': str(exception), 'status_code': 400})
+            except Exception as exception:
+                entries.append({'error': str(exception), 'status_code': 500})
+        return entries
+
+    def _run_batch_operation(self, operation: BatchOperationT) -> Any:
+        action = operation.get('action')
+        operation_input = operation.get('input', {})
+        if action == 'get_atom':
+            return self.get_atom(operation_input['handle'])
+        elif action == 'get_links':
+            return self.get_links(_link_filter(operation_input['link_filter']))
+        elif action == 'get_incoming_links':
+            return self.get_incoming_links(
+                operation_input['atom_handle'], **operation_input.get('kwargs', {})
+            )
+        else:
+            das_error(ValueError(f"Action '{action}' can't be batched"))
+
+    @staticmethod
+    def _decode_continuation_token(
+        continuation_token: Optional[ContinuationTokenT], scan: List[Any]
+    ) -> Optional[HandleT]:
+        try:
+            return decode_continuation_token(continuation_token, scan)
+        except ValueError as e:
+            das_error(ValueError(str(e)))
+
+    @staticmethod
+    def _continuation_token(
+        cursor: Optional[HandleT], scan: List[Any]
+    ) -> Optional[ContinuationTokenT]:
+        return None if cursor is None else encode_continuation_token(cursor, scan)
+
     def count_atoms(self, parameters: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
         if parameters and parameters.get('context') == 'remote':
             return {}
@@ -294,30 +595,82 @@ class LocalQueryEngine(QueryEngine):
     ) -> Any:
         if not self.system_parameters.get('running_on_server'):  # Local
             if host is not None and port is not None:
-                server = FunctionsClient(host, port)
+                server = self._new_fetch_client(host, port)
             else:
                 server = self.local_backend
             return server.fetch(query=query, **kwargs)
         else:
-            if query is None:
-                try:
-                    return self.local_backend.retrieve_all_atoms()
-                except Exception as e:
-                    das_error(e)
+            return list(self._fetch_atoms(query))
+
+    def _fetch_atoms(self, query: Optional[Query]) -> Iterable[AtomT]:
+        if query is None:
+            try:
+                return self.local_backend.retrieve_all_atoms()
+            except Exception as e:
+                das_error(e)
+        else:
+            if 'atom_type' not in query:
+                das_error(ValueError('Invalid query: missing atom_type'))
+
+            atom_type = query['atom_type']
+
+            if atom_type == 'node':
+                return self._process_node(query)
+            elif atom_type == 'link':
+                return self._process_link(query)
             else:
-                if 'atom_type' not in query:
-                    das_error(ValueError('Invalid query: missing atom_type'))
+                das_error(
+                    ValueError("Invalid atom type: {atom_type}. Use 'node' or 'link' instead.")
+                )
 
-                atom_type = query['atom_type']
+    def _get_fetch_client(self, host: str, port: int) -> FunctionsClient:
+        with self.fetch_clients_lock:
+            if (client := self.fetch_clients.get((host, port))) is None:
+                client = self.fetch_clients[(host, port)] = self._new_fetch_client(host, port)
+        return client
+
+    def _new_fetch_client(self, host: str, port: int) -> FunctionsClient:
+        return FunctionsClient(
+            host,
+            port,
+            request_policy=RequestPolicy.from_system_parameters(self.system_parameters),
+            handshake_cache_file=self.system_parameters.get('handshake_cache_file'),
+            handshake_cache_ttl=self.system_parameters.get('handshake_cache_ttl', 3600.0),
+        )
 
-                if atom_type == 'node':
-                    return self._process_node(query)
-                elif atom_type == 'link':
-                    return self._process_link(query)
-                else:
-                    das_error(
-                        ValueError("Invalid atom type: {atom_type}. Use 'node' or 'link' instead.")
-                    )
+    def fetch_page(
+        self,
+        query: Optional[Query],
+        cursor: Optional[HandleT] = None,
+        page_size: int = 1000,
+        handle_range: Optional[HandleRangeT] = None,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+    ) -> Tuple[Optional[HandleT], List[AtomT]]:
+        if not self.system_parameters.get('running_on_server'):
+            if host is not None and port is not None:
+                client = self._get_fetch_client(host, port)
+                return client.fetch_page(query, cursor, page_size, handle_range)
+
+        # The atoms are fetched once per scan and the following pages come from the snapshot
+        def load() -> List[AtomT]:
+            atoms = self._fetch_atoms(query)
+            return [atom for atom in atoms if in_handle_range(atom.handle, handle_range)]
+
+        scan = ['fetch', query, handle_range]
+        return self.scan_snapshots.page(scan, cursor, page_size, load, lambda atom: atom.handle)
+
+    def fetch_delta(
+        self,
+        query: Optional[Query],
+        marks: DeltaMarksT,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+    ) -> Tuple[DeltaMarksT, List[AtomT]]:
+        if not self.system_parameters.get('running_on_server'):
+            if host is not None and port is not None:
+                return self._get_fetch_client(host, port).fetch_delta(query, marks)
+        return delta_atoms(self._fetch_atoms(query), marks)
 
     def create_context(
         self,
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Iterator, List, Optional, Union
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 from hyperon_das_atomdb.database import (
     AtomT,
@@ -11,8 +11,10 @@ from hyperon_das_atomdb.database import (
 )
 
 from hyperon_das.context import Context
+from hyperon_das.delta_fetch import DeltaMarksT
 from hyperon_das.link_filters import LinkFilter
-from hyperon_das.type_alias import Query
+from hyperon_das.paged_fetch import ContinuationTokenT, HandleRangeT
+from hyperon_das.type_alias import BatchEntryT, BatchOperationT, Query
 from hyperon_das.utils import QueryAnswer
 
 
@@ -102,6 +104,78 @@ class QueryEngine(ABC):
         """
         ...
 
+    @abstractmethod
+    def get_incoming_links_page(
+        self,
+        atom_handle: HandleT,
+        continuation_token: Optional[ContinuationTokenT] = None,
+        chunk_size: int = 500,
+        **kwargs,
+    ) -> Tuple[Optional[ContinuationTokenT], IncomingLinksT]:
+        """
+        Retrieves one page of the incoming links of an atom. Links are paged by handle, so the
+        same continuation token always returns the same page and no link is returned twice.
+
+        Args:
+            atom_handle (HandleT): Handle of the atom.
+            continuation_token (Optional[ContinuationTokenT]): Token returned with the previous
+                page or None to get the first page. Defaults to None.
+            chunk_size (int): Maximum number of links in the page. Defaults to 500.
+
+        Keyword Args:
+            **kwargs: Filters and format options, as in get_incoming_links().
+
+        Returns:
+            Tuple[Optional[ContinuationTokenT], IncomingLinksT]: Token of the next page (None if
+                this is the last page) and the links in the page.
+        """
+        ...
+
+    @abstractmethod
+    def batch(self, operations: List[BatchOperationT]) -> List[BatchEntryT]:
+        """
+        Runs several get_atom(), get_links() and get_incoming_links() operations, independently
+        of each other, as a single request.
+
+        Args:
+            operations (List[BatchOperationT]): The operations, as built by FunctionsClient.
+
+        Returns:
+            List[BatchEntryT]: The result or the error of each operation, in the same order as
+                the operations.
+        """
+        ...
+
+    @abstractmethod
+    def expand(
+        self,
+        handle: HandleT,
+        depth: int = 1,
+        link_type: Optional[str] = None,
+        target_type: Optional[str] = None,
+        max_nodes: Optional[int] = None,
+        strategy: str = 'bfs',
+    ) -> Iterator[AtomT] | List[AtomT]:
+        """
+        Traverses the hypergraph starting at the passed atom, moving from each visited atom to
+        its neighbors, i.e. the targets of the links pointing to it, and returns the visited
+        atoms (except the starting one) as they are visited. Each atom is visited only once.
+
+        Args:
+            handle (HandleT): Handle of the atom where the traversal starts.
+            depth (int): Maximum distance (number of hops) from the starting atom. Defaults to 1.
+            link_type (Optional[str]): Only links of this type are followed. Defaults to None.
+            target_type (Optional[str]): Only atoms of this type are visited. Defaults to None.
+            max_nodes (Optional[int]): Maximum number of visited atoms. Defaults to None (no
+                limit).
+            strategy (str): Either 'bfs' (breadth-first) or 'dfs' (depth-first). Defaults to
+                'bfs'.
+
+        Returns:
+            Iterator[AtomT] | List[AtomT]: The visited atoms (a list when running on a server).
+        """
+        ...
+
     @abstractmethod
     def query(
         self, query: Query, parameters: dict[str, Any] | None = None
@@ -156,6 +230,32 @@ class QueryEngine(ABC):
         """
         ...
 
+    @abstractmethod
+    def custom_query_page(
+        self,
+        index_id: str,
+        query: Query,
+        continuation_token: Optional[ContinuationTokenT] = None,
+        chunk_size: int = 1000,
+        **kwargs,
+    ) -> Tuple[Optional[ContinuationTokenT], List[AtomT]]:
+        """
+        Executes one page of a custom query. Atoms are paged by handle, so the same continuation
+        token always returns the same page and no atom is returned twice.
+
+        Args:
+            index_id (str): The ID of the index to query against.
+            query (Query): The query to be executed.
+            continuation_token (Optional[ContinuationTokenT]): Token returned with the previous
+                page or None to get the first page. Defaults to None.
+            chunk_size (int): Maximum number of atoms in the page. Defaults to 1000.
+
+        Returns:
+            Tuple[Optional[ContinuationTokenT], List[AtomT]]: Token of the next page (None if
+                this is the last page) and the atoms in the page.
+        """
+        ...
+
     @abstractmethod
     def count_atoms(self, parameters: Optional[Dict[str, Any]] = None) -> Dict[str, int]:
         """
@@ -255,6 +355,65 @@ class QueryEngine(ABC):
         """
         ...
 
+    @abstractmethod
+    def fetch_page(
+        self,
+        query: Optional[Query],
+        cursor: Optional[HandleT] = None,
+        page_size: int = 1000,
+        handle_range: Optional[HandleRangeT] = None,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+    ) -> Tuple[Optional[HandleT], List[AtomT]]:
+        """
+        Fetches one page of the atoms that match the passed query (or all atoms if the query is
+        None). Atoms are sorted by handle and pages are consecutive ranges of atoms.
+
+        Args:
+            query (Optional[Query]): The query used to select atoms (see fetch()).
+            cursor (Optional[HandleT]): Handle of the last atom of the previous page or None to
+                get the first page. Defaults to None.
+            page_size (int): Maximum number of atoms in the page. Defaults to 1000.
+            handle_range (Optional[HandleRangeT]): Only atoms with handles in this range are
+                selected. Defaults to None (all atoms).
+            host (Optional[str]): The host of the remote backend to fetch from. If None, the
+                backend of the query engine is used. Defaults to None.
+            port (Optional[int]): The port of the remote backend to fetch from. Defaults to None.
+
+        Returns:
+            Tuple[Optional[HandleT], List[AtomT]]: Cursor to the next page (None if this is the
+                last page) and the atoms in the page.
+        """
+        ...
+
+    @abstractmethod
+    def fetch_delta(
+        self,
+        query: Optional[Query],
+        marks: DeltaMarksT,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+    ) -> Tuple[DeltaMarksT, List[AtomT]]:
+        """
+        Fetches the atoms that match the passed query (or all atoms if the query is None) and
+        were added or changed since the passed marks were computed.
+
+        Atoms are grouped in buckets by handle and the marks hold a digest of each bucket, so
+        all the atoms of a bucket with a new or changed atom are fetched.
+
+        Args:
+            query (Optional[Query]): The query used to select atoms (see fetch()).
+            marks (DeltaMarksT): Marks returned by the previous delta fetch of the same query or
+                an empty dict to fetch all atoms.
+            host (Optional[str]): The host of the remote backend to fetch from. If None, the
+                backend of the query engine is used. Defaults to None.
+            port (Optional[int]): The port of the remote backend to fetch from. Defaults to None.
+
+        Returns:
+            Tuple[DeltaMarksT, List[AtomT]]: The current marks and the added or changed atoms.
+        """
+        ...
+
     @abstractmethod
     def create_context(self, name: str, queries: list[Query] | None = None) -> Context:
         """
@@ -278,6 +437,20 @@ class QueryEngine(ABC):
         """
         ...
 
+    @abstractmethod
+    def regard_added_atom(self, atom: AtomT) -> None:
+        """
+        Notifies the query engine that an atom has been added to the local AtomSpace.
+
+        Query engines which need to propagate local changes somewhere else (e.g. a remote DAS)
+        use this to keep track of the atoms added since the last commit so only these atoms
+        are sent in the next commit.
+
+        Args:
+            atom (AtomT): The atom that has just been added.
+        """
+        ...
+
     @abstractmethod
     def commit(self, **kwargs) -> None:
         """
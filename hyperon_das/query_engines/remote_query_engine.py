@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Any, Dict, Iterator, List, Optional
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, Union
 
 from hyperon_das_atomdb.database import (
     AtomT,
@@ -11,18 +11,36 @@ from hyperon_das_atomdb.database import (
 )
 from hyperon_das_atomdb.exceptions import AtomDoesNotExist
 
+from hyperon_das.cache.adaptive_chunk_size import AdaptiveChunkSizes
 from hyperon_das.cache.cache_controller import CacheController
-from hyperon_das.cache.iterators import CustomQuery, ListIterator
+from hyperon_das.cache.iterators import DEFAULT_PREFETCH_PAGES, CustomQuery, ListIterator
+from hyperon_das.cache.page_fetch_executor import PageFetchExecutor
 from hyperon_das.client import FunctionsClient
 from hyperon_das.context import Context
-from hyperon_das.exceptions import InvalidDASParameters, QueryParametersException
+from hyperon_das.delta_fetch import DeltaMarksT
+from hyperon_das.exceptions import HTTPError, InvalidDASParameters, QueryParametersException
 from hyperon_das.link_filters import LinkFilter
+from hyperon_das.load_balanced_client import EndpointT, LoadBalancedClient
+from hyperon_das.logger import logger
+from hyperon_das.paged_fetch import ContinuationTokenT, HandleRangeT
 from hyperon_das.query_engines.local_query_engine import LocalQueryEngine
 from hyperon_das.query_engines.query_engine_protocol import QueryEngine
-from hyperon_das.type_alias import Query
+from hyperon_das.request_batcher import RequestBatcher
+from hyperon_das.request_policy import RETRYABLE_STATUS_CODES, RequestPolicy
+from hyperon_das.sharded_client import ShardedClient
+from hyperon_das.type_alias import BatchEntryT, BatchOperationT, Query
 from hyperon_das.utils import QueryAnswer, das_error
 
 
+def _item_handle(item: Any) -> HandleT:
+    # Items of paged scans are handles, documents or (link, targets documents) tuples
+    if isinstance(item, str):
+        return item
+    if isinstance(item, (tuple, list)):
+        item = item[0]
+    return item['handle'] if isinstance(item, dict) else item.handle
+
+
 class QueryScopes(Enum):
     REMOTE_ONLY = 'remote_only'
     SYNCHRONOUS_UPDATE = 'synchronous_update'
@@ -39,61 +57,266 @@ class RemoteQueryEngine(QueryEngine):
         **kwargs,
     ):
         self.system_parameters = system_parameters
-        self.local_query_engine = LocalQueryEngine(backend, cache_controller, kwargs)
+        self.local_query_engine = LocalQueryEngine(
+            backend,
+            cache_controller,
+            system_parameters,
+            page_fetch_executor=kwargs.get('page_fetch_executor'),
+        )
+        self.local_query_engine.track_changes = True
         self.cache_controller = cache_controller
         self.__mode = kwargs.get('mode', 'read-only')
-        self.host = kwargs.get('host')
-        self.port = kwargs.get('port')
+        self.endpoints: List[EndpointT] = list(kwargs.get('endpoints') or [])
+        self.shards: List[EndpointT] = list(kwargs.get('shards') or [])
+        if self.endpoints and self.shards:
+            das_error(
+                InvalidDASParameters(message="'endpoints' and 'shards' can't be used together")
+            )
+        if self.endpoints or self.shards:
+            self.host, self.port = (self.endpoints or self.shards)[0]
+        else:
+            self.host = kwargs.get('host')
+            self.port = kwargs.get('port')
         if not self.host or not self.port:
             das_error(InvalidDASParameters(message="'host' and 'port' are mandatory parameters"))
-        self.remote_das = FunctionsClient(self.host, self.port)
+        client_kwargs = {
+            'request_policy': RequestPolicy.from_system_parameters(system_parameters),
+            'handshake_cache_file': system_parameters.get('handshake_cache_file'),
+            'handshake_cache_ttl': system_parameters.get('handshake_cache_ttl', 3600.0),
+        }
+        self.remote_das: Union[FunctionsClient, LoadBalancedClient, ShardedClient]
+        if self.shards:
+            self.remote_das = ShardedClient(self.shards, **client_kwargs)
+        elif len(self.endpoints) > 1:
+            self.remote_das = LoadBalancedClient(
+                self.endpoints,
+                health_check_interval=system_parameters.get('replica_health_check_interval', 5.0),
+                **client_kwargs,
+            )
+        else:
+            self.remote_das = FunctionsClient(self.host, self.port, **client_kwargs)
+        self.request_batcher: Optional[RequestBatcher] = None
+        if system_parameters.get('request_batch_window'):
+            self.request_batcher = RequestBatcher(
+                self.remote_das,
+                window=system_parameters['request_batch_window'],
+                max_batch_size=system_parameters.get('request_batch_size', 100),
+            )
+        self.page_fetch_executor: Optional[PageFetchExecutor] = kwargs.get('page_fetch_executor')
+        self.chunk_sizes = AdaptiveChunkSizes(system_parameters)
+        # Page actions the remote DAS doesn't support (see _request_page())
+        self.unsupported_actions: Set[str] = set()
         self.query_scope_values = {*[q.value for q in QueryScopes]}
 
+    def close(self) -> None:
+        """
+        Stops the background threads of the clients of the remote DAS, after sending the
+        operations waiting to be batched.
+        """
+        if self.request_batcher:
+            self.request_batcher.close()
+        self.remote_das.close()
+
     @property
     def mode(self):
         return self.__mode
 
+    @property
+    def batched_remote_das(
+        self,
+    ) -> Union[FunctionsClient, LoadBalancedClient, ShardedClient, RequestBatcher]:
+        # Requests which may be coalesced with concurrent ones into batch requests
+        return self.request_batcher or self.remote_das
+
     def get_atom(self, handle: HandleT, **kwargs) -> AtomT:
         atom = self.cache_controller.get_atom(handle)
         if atom is None:
             try:
                 atom = self.local_query_engine.get_atom(handle, **kwargs)
             except AtomDoesNotExist:
+                if self.cache_controller.is_nonexistent_handle(handle):
+                    das_error(AtomDoesNotExist('Nonexistent atom'))
                 try:
-                    atom = self.remote_das.get_atom(handle, **kwargs)
+                    atom = self.batched_remote_das.get_atom(handle, **kwargs)
                 except AtomDoesNotExist as exception:
+                    self.cache_controller.add_nonexistent_handle(handle)
                     das_error(exception)
         return atom
 
     def get_atoms(self, handles: HandleListT, **kwargs) -> List[AtomT]:
-        return self.cache_controller.get_atoms(handles)
+        atoms = {}
+        missing_handles = []
+        for handle in handles:
+            atom = self.cache_controller.get_atom(handle)
+            if atom is None:
+                try:
+                    atom = self.local_query_engine.local_backend.get_atom(handle, **kwargs)
+                except AtomDoesNotExist:
+                    if self.cache_controller.is_nonexistent_handle(handle):
+                        das_error(AtomDoesNotExist('Nonexistent atom'))
+                    missing_handles.append(handle)
+                    continue
+            atoms[handle] = atom
+        # Atoms missing locally are fetched in batch requests instead of one request each
+        batch_size = self.system_parameters.get('request_batch_size', 100)
+        for i in range(0, len(missing_handles), batch_size):
+            chunk = missing_handles[i : i + batch_size]
+            operations = [self.remote_das.get_atom_operation(handle, **kwargs) for handle in chunk]
+            entries = self.remote_das.batch(operations)
+            for handle, operation, entry in zip(chunk, operations, entries):
+                try:
+                    atoms[handle] = self.remote_das.batch_result(operation, entry)
+                except AtomDoesNotExist as exception:
+                    self.cache_controller.add_nonexistent_handle(handle)
+                    das_error(exception)
+        return [atoms[handle] for handle in handles]
 
     def get_links(self, link_filter: LinkFilter) -> List[LinkT]:
         links = self.local_query_engine.get_links(link_filter)
-        remote_links = self.remote_das.get_links(link_filter)
+        remote_links = self.batched_remote_das.get_links(link_filter)
         links.extend(remote_links)
         return links
 
     def get_link_handles(self, link_filter: LinkFilter) -> HandleSetT:
-        # TODO Implement get_link_handles() in faas client
-        return {link['handle'] for link in self.get_links(link_filter)}
+        # Only handles are sent by the remote DAS, not the links documents
+        handles = set(self.local_query_engine.get_link_handles(link_filter))
+        handles.update(self.remote_das.get_link_handles(link_filter))
+        return handles
 
     def get_incoming_links(self, atom_handle: HandleT, **kwargs) -> IncomingLinksT:
         links = self.local_query_engine.get_incoming_links(atom_handle, **kwargs)
-        remote_links = self.remote_das.get_incoming_links(atom_handle, **kwargs)
+        remote_links = self.batched_remote_das.get_incoming_links(atom_handle, **kwargs)
         links.extend(remote_links)
         return links
 
+    def batch(self, operations: List[BatchOperationT]) -> List[BatchEntryT]:
+        return self.remote_das.batch(operations)
+
+    def expand(
+        self,
+        handle: HandleT,
+        depth: int = 1,
+        link_type: Optional[str] = None,
+        target_type: Optional[str] = None,
+        max_nodes: Optional[int] = None,
+        strategy: str = 'bfs',
+    ) -> Iterator[AtomT]:
+        if self.shards:
+            das_error(
+                NotImplementedError("expand() isn't supported by sharded remote query engines")
+            )
+        # The whole traversal is made by the remote DAS in a single request
+        atoms = self.remote_das.expand(handle, depth, link_type, target_type, max_nodes, strategy)
+        return iter(atoms)
+
+    def get_incoming_links_page(
+        self,
+        atom_handle: HandleT,
+        continuation_token: Optional[ContinuationTokenT] = None,
+        chunk_size: int = 500,
+        **kwargs,
+    ) -> Tuple[Optional[ContinuationTokenT], IncomingLinksT]:
+        return self._request_page(
+            'get_incoming_links_page',
+            lambda: self.remote_das.get_incoming_links_page(
+                atom_handle, continuation_token, chunk_size, **kwargs
+            ),
+            ['get_incoming_links', atom_handle, kwargs],
+            continuation_token,
+            chunk_size,
+            lambda: self.remote_das.get_incoming_links(atom_handle, **kwargs),
+        )
+
     def custom_query(self, index_id: str, query: Query, **kwargs) -> Iterator:
         kwargs.pop('no_iterator', None)
-        if kwargs.get('cursor') is None:
-            kwargs['cursor'] = 0
-        answer = self.remote_das.custom_query(index_id, query=query, **kwargs)
-        kwargs['backend'] = self.remote_das
+        cursor = kwargs.pop('cursor', None)
+        if cursor not in (0, None):
+            # Scans are resumed with continuation tokens, such as the cursor of a CustomQuery
+            # iterator, instead of the index cursors of a local DAS
+            if not isinstance(cursor, str) or kwargs.get('continuation_token') is not None:
+                das_error(
+                    ValueError(
+                        "A remote custom query is resumed by passing the cursor of a previous "
+                        "iterator as 'continuation_token'"
+                    )
+                )
+            kwargs['continuation_token'] = cursor
+        prefetch_pages = kwargs.pop('prefetch_pages', DEFAULT_PREFETCH_PAGES)
+        chunk_sizer = self.chunk_sizes.get(index_id, kwargs.get('chunk_size'))
+        if chunk_sizer is not None:
+            kwargs['chunk_size'] = chunk_sizer.chunk_size
+        # Pages are requested with continuation tokens, so a scan can be resumed (e.g. after a
+        # failed request) by passing the iterator's cursor as `continuation_token`
+        token, answer = self.custom_query_page(
+            index_id, query, kwargs.pop('continuation_token', None), **kwargs
+        )
+        kwargs['cursor'] = token
+        kwargs['query'] = query
+        kwargs['backend'] = self
         kwargs['index_id'] = index_id
         kwargs['is_remote'] = True
+        kwargs['prefetch_pages'] = prefetch_pages
+        kwargs['executor'] = self.page_fetch_executor
+        kwargs['chunk_sizer'] = chunk_sizer
         return CustomQuery(ListIterator(answer), **kwargs)
 
+    def custom_query_page(
+        self,
+        index_id: str,
+        query: Query,
+        continuation_token: Optional[ContinuationTokenT] = None,
+        chunk_size: int = 1000,
+        **kwargs,
+    ) -> Tuple[Optional[ContinuationTokenT], List[AtomT]]:
+        return self._request_page(
+            'custom_query_page',
+            lambda: self.remote_das.custom_query_page(
+                index_id, query, continuation_token, chunk_size, **kwargs
+            ),
+            ['custom_query', index_id, query, kwargs],
+            continuation_token,
+            chunk_size,
+            lambda: self.remote_das.custom_query(index_id, query, **kwargs),
+        )
+
+    def _request_page(
+        self,
+        action: str,
+        request_page: Callable[[], Tuple[Optional[ContinuationTokenT], List[Any]]],
+        scan: List[Any],
+        continuation_token: Optional[ContinuationTokenT],
+        chunk_size: int,
+        request_all: Callable[[], List[Any]],
+    ) -> Tuple[Optional[ContinuationTokenT], List[Any]]:
+        # Remote DAS which predate the page actions reject them. The whole answer is then
+        # requested with the former (unpaged) action and paged here, in the same way (and with
+        # the same kind of tokens) as the remote DAS would, from a snapshot taken with the
+        # first page. The page action isn't sent to that remote DAS anymore.
+        answer = None
+        if action not in self.unsupported_actions:
+            try:
+                return request_page()
+            except (HTTPError, ValueError) as error:
+                if continuation_token is not None or (
+                    isinstance(error, HTTPError) and error.status_code in RETRYABLE_STATUS_CODES
+                ):
+                    raise
+                try:
+                    answer = list(request_all())
+                except Exception:
+                    raise error
+                logger().debug(f"Remote DAS doesn't support '{action}', paging its answers locally")
+                self.unsupported_actions.add(action)
+        cursor = LocalQueryEngine._decode_continuation_token(continuation_token, scan)
+        next_cursor, page = self.local_query_engine.scan_snapshots.page(
+            scan,
+            cursor,
+            chunk_size,
+            lambda: request_all() if answer is None else answer,
+            _item_handle,
+        )
+        return LocalQueryEngine._continuation_token(next_cursor, scan), page
+
     def query(
         self,
         query: Query,
@@ -123,8 +346,17 @@ class RemoteQueryEngine(QueryEngine):
         if query_scope in {QueryScopes.REMOTE_ONLY, QueryScopes.SYNCHRONOUS_UPDATE}:
             if query_scope == QueryScopes.SYNCHRONOUS_UPDATE:
                 self.commit()
+                self.cache_controller.invalidate_query_answers()
+                self.cache_controller.invalidate_nonexistent_handles()
             parameters['no_iterator'] = True
-            return self.remote_das.query(query, parameters)
+            answer = self.cache_controller.get_query_answer(query, parameters)
+            if answer is None:
+                # Answers streamed by sharded remote query engines are collected, so a list is
+                # returned in all cases
+                answer = list(self.remote_das.query(query, parameters))
+                if self.cache_controller.query_cache_enabled():
+                    self.cache_controller.add_query_answer(query, parameters, answer)
+            return answer
 
         return self.local_query_engine.query(query, parameters)
 
@@ -141,11 +373,17 @@ class RemoteQueryEngine(QueryEngine):
             for k in ['node_count', 'link_count', 'atom_count']
         }
 
-    #
+    def regard_added_atom(self, atom: AtomT) -> None:
+        self.local_query_engine.regard_added_atom(atom)
+
     def commit(self, **kwargs) -> None:
         if self.__mode == 'read-write':
             if self.local_query_engine.has_buffer():
-                self.remote_das.commit_changes(buffer=self.local_query_engine.buffer)
+                chunk_size = self.system_parameters.get('commit_chunk_size', 1000)
+                for handles, chunk in self.local_query_engine.get_buffer_chunks(chunk_size):
+                    if chunk:
+                        self.remote_das.commit_changes(buffer=chunk)
+                    self.local_query_engine.discard_from_buffer(handles)
             self.remote_das.commit_changes()
         elif self.__mode == 'read-only':
             das_error(PermissionError("Commit can't be executed in read mode"))
@@ -175,10 +413,35 @@ class RemoteQueryEngine(QueryEngine):
         **kwargs,
     ) -> Any:
         if host is not None and port is not None:
-            server = FunctionsClient(host, port)
-        else:
-            server = self.remote_das
-        return server.fetch(query=query, **kwargs)
+            # Built with the same request policy and handshake cache as the other clients
+            return self.local_query_engine.fetch(query, host=host, port=port, **kwargs)
+        return self.remote_das.fetch(query=query, **kwargs)
+
+    def fetch_page(
+        self,
+        query: Optional[Query],
+        cursor: Optional[HandleT] = None,
+        page_size: int = 1000,
+        handle_range: Optional[HandleRangeT] = None,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+    ) -> Tuple[Optional[HandleT], List[AtomT]]:
+        if host is not None and port is not None:
+            return self.local_query_engine.fetch_page(
+                query, cursor, page_size, handle_range, host=host, port=port
+            )
+        return self.remote_das.fetch_page(query, cursor, page_size, handle_range)
+
+    def fetch_delta(
+        self,
+        query: Optional[Query],
+        marks: DeltaMarksT,
+        host: Optional[str] = None,
+        port: Optional[int] = None,
+    ) -> Tuple[DeltaMarksT, List[AtomT]]:
+        if host is not None and port is not None:
+            return self.local_query_engine.fetch_delta(query, marks, host=host, port=port)
+        return self.remote_das.fetch_delta(query, marks)
 
     def create_context(
         self,
@@ -0,0 +1,126 @@
+import time
+from concurrent.futures import Future
+from threading import Condition, Thread
+from typing import Any, List, Optional, Tuple
+
+from hyperon_das.client import FunctionsClient
+from hyperon_das.link_filters import LinkFilter
+from hyperon_das.logger import logger
+from hyperon_das.type_alias import BatchOperationT
+
+
+class RequestBatcher:
+    """
+    RequestBatcher coalesces the operations sent to a remote DAS by concurrent callers (e.g.
+    paginated iterators fetching pages in the background) into batch requests. An operation waits
+    at most `window` seconds for others to be sent along with it, unless `max_batch_size`
+    operations are waiting, in which case the batch is sent right away.
+
+    Results and errors are reported per operation, so callers get exactly what they would get
+    from the equivalent FunctionsClient call.
+    """
+
+    def __init__(
+        self, client: FunctionsClient, window: float = 0.005, max_batch_size: int = 100
+    ) -> None:
+        """
+        Args:
+            client (FunctionsClient): Client used to send the batch requests.
+            window (float, optional): Maximum time, in seconds, an operation waits for others
+                before it's sent. Defaults to 0.005.
+            max_batch_size (int, optional): Maximum number of operations per batch request.
+                Defaults to 100.
+        """
+        self.client = client
+        self.window = window
+        self.max_batch_size = max(1, max_batch_size)
+        self.pending: List[Tuple[BatchOperationT, Future]] = []
+        self.oldest_pending_time: Optional[float] = None
+        self.closed = False
+        self.condition = Condition()
+        self.thread: Optional[Thread] = None
+
+    def submit(self, operation: BatchOperationT) -> Future:
+        """
+        Schedules an operation to be sent in the next batch request.
+
+        Args:
+            operation (BatchOperationT): The operation, built by one of the `*_operation()`
+                methods of FunctionsClient.
+
+        Returns:
+            Future: Future of the operation's result.
+
+        Raises:
+            RuntimeError: If the batcher was closed.
+        """
+        future = Future()
+        with self.condition:
+            if self.closed:
+                raise RuntimeError('RequestBatcher was closed')
+            if not self.pending:
+                self.oldest_pending_time = time.monotonic()
+            self.pending.append((operation, future))
+            if self.thread is None:
+                self.thread = Thread(target=self._run, name='das-request-batcher', daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+        return future
+
+    def get_atom(self, handle: str, **kwargs) -> Any:
+        return self.submit(self.client.get_atom_operation(handle, **kwargs)).result()
+
+    def get_links(self, link_filter: LinkFilter) -> Any:
+        return self.submit(self.client.get_links_operation(link_filter)).result()
+
+    def get_incoming_links(self, atom_handle: str, **kwargs) -> Any:
+        operation = self.client.get_incoming_links_operation(atom_handle, **kwargs)
+        return self.submit(operation).result()
+
+    def close(self) -> None:
+        """
+        Stops the background thread after sending the pending operations.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+            thread = self.thread
+        if thread is not None:
+            thread.join()
+
+    def _time_to_send(self) -> Optional[float]:
+        if not self.pending:
+            return None
+        if self.closed or len(self.pending) >= self.max_batch_size:
+            return 0.0
+        return max(0.0, self.oldest_pending_time + self.window - time.monotonic())
+
+    def _run(self) -> None:
+        while True:
+            with self.condition:
+                while True:
+                    time_to_send = self._time_to_send()
+                    if time_to_send == 0.0 or (time_to_send is None and self.closed):
+                        break
+                    self.condition.wait(timeout=time_to_send)
+                if not self.pending:
+                    return
+                batch = self.pending[: self.max_batch_size]
+                self.pending = self.pending[self.max_batch_size :]
+                self.oldest_pending_time = time.monotonic() if self.pending else None
+            self._send(batch)
+
+    def _send(self, batch: List[Tuple[BatchOperationT, Future]]) -> None:
+        operations = [operation for operation, _ in batch]
+        try:
+            entries = self.client.batch(operations)
+        except Exception as exception:
+            logger().debug(f'Batch request with {len(batch)} operations failed: {str(exception)}')
+            for _, future in batch:
+                future.set_exception(exception)
+            return
+        for (operation, future), entry in zip(batch, entries):
+            try:
+                future.set_result(self.client.batch_result(operation, entry))
+            except Exception as exception:
+                future.set_exception(exception)
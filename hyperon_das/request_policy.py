@@ -0,0 +1,215 @@
+import random
+import time
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+
+IDEMPOTENT_ACTIONS = frozenset(
+    {
+        'batch',
+        'count_atoms',
+        'custom_query',
+        'custom_query_page',
+        'expand',
+        'fetch',
+        'fetch_delta',
+        'fetch_page',
+        'get_atom',
+        'get_atoms_by_field',
+        'get_atoms_by_text_field',
+        'get_incoming_links',
+        'get_incoming_links_page',
+        'get_link_handles',
+        'get_links',
+        'get_node_by_name_starting_with',
+        'query',
+    }
+)
+"""Actions which don't change the remote DAS, so they can be retried and hedged."""
+
+LONG_RUNNING_ACTIONS = frozenset(
+    {'commit_changes', 'create_context', 'create_field_index', 'fetch', 'query'}
+)
+"""Actions which may take much longer than the others, so they have their own timeout."""
+
+RETRYABLE_STATUS_CODES = frozenset({429, 502, 503, 504})
+"""HTTP status codes of transient failures, after which idempotent actions are retried."""
+
+
+class CircuitBreaker:
+    """
+    CircuitBreaker stops sending requests to a remote DAS which keeps failing, so callers fail
+    fast instead of waiting for timeouts. After `failure_threshold` consecutive failures the
+    circuit opens and requests are refused for `reset_timeout` seconds. Then a single trial
+    request is let through (half-open state): the circuit closes if it succeeds and opens again
+    otherwise.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0) -> None:
+        """
+        Args:
+            failure_threshold (int, optional): Number of consecutive failures which opens the
+                circuit. 0 disables the circuit breaker. Defaults to 5.
+            reset_timeout (float, optional): Time, in seconds, requests are refused after the
+                circuit opens. Defaults to 30.0.
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+        self.lock = Lock()
+
+    @property
+    def state(self) -> str:
+        with self.lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow_request(self) -> Tuple[bool, bool]:
+        """
+        Returns:
+            Tuple[bool, bool]: Whether a request may be sent now and whether it's the trial
+                request of a half-open circuit. Only the trial request should pass `trial=True`
+                to record_success() or record_failure(), or call end_trial().
+        """
+        with self.lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True, False
+            if state == self.HALF_OPEN and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True, True
+            return False, False
+
+    def record_success(self, trial: bool = False) -> None:
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            if trial:
+                self.trial_in_flight = False
+
+    def record_failure(self, trial: bool = False) -> None:
+        with self.lock:
+            self.failures += 1
+            if trial or (self.failure_threshold and self.failures >= self.failure_threshold):
+                self.opened_at = time.monotonic()
+            if trial:
+                self.trial_in_flight = False
+
+    def end_trial(self) -> None:
+        """
+        Ends the trial request of a half-open circuit without changing the state of the circuit,
+        so another trial request may be sent.
+        """
+        with self.lock:
+            self.trial_in_flight = False
+
+
+class RequestPolicy:
+    """
+    RequestPolicy sets how FunctionsClient sends requests: their timeouts, how idempotent actions
+    are retried after transient failures (exponential backoff with full jitter), whether read
+    actions are hedged (i.e. sent again if the first request is slow, using the first response)
+    and when the circuit breaker of each remote DAS opens.
+    """
+
+    def __init__(
+        self,
+        timeout: Optional[float] = None,
+        long_timeout: Optional[float] = None,
+        max_retries: int = 2,
+        retry_backoff: float = 0.1,
+        retry_max_backoff: float = 5.0,
+        hedge_delay: Optional[float] = None,
+        circuit_breaker_threshold: int = 5,
+        circuit_breaker_reset: float = 30.0,
+    ) -> None:
+        """
+        Args:
+            timeout (Optional[float], optional): Timeout of each request, in seconds. None
+                means no timeout. Defaults to None.
+            long_timeout (Optional[float], optional): Timeout of the requests of long running
+                actions (see LONG_RUNNING_ACTIONS). Defaults to None.
+            max_retries (int, optional): Maximum number of retries of idempotent actions.
+                Defaults to 2.
+            retry_backoff (float, optional): Maximum delay before the first retry, in seconds.
+                It doubles at each retry. Defaults to 0.1.
+            retry_max_backoff (float, optional): Maximum delay before any retry, in seconds.
+                Defaults to 5.0.
+            hedge_delay (Optional[float], optional): A second request is sent when the response
+                of an idempotent action takes longer than this, in seconds. None disables
+                hedging. Defaults to None.
+            circuit_breaker_threshold (int, optional): Consecutive failures which open the
+                circuit breaker. 0 disables it. Defaults to 5.
+            circuit_breaker_reset (float, optional): Time, in seconds, requests are refused
+                after the circuit breaker opens. Defaults to 30.0.
+        """
+        self.timeout = timeout
+        self.long_timeout = long_timeout
+        self.max_retries = max(0, max_retries)
+        self.retry_backoff = retry_backoff
+        self.retry_max_backoff = retry_max_backoff
+        self.hedge_delay = hedge_delay
+        self.circuit_breaker_threshold = circuit_breaker_threshold
+        self.circuit_breaker_reset = circuit_breaker_reset
+
+    @classmethod
+    def from_system_parameters(cls, system_parameters: Dict[str, Any]) -> 'RequestPolicy':
+        """
+        Builds a policy from the system parameters 'request_timeout', 'long_request_timeout',
+        'request_max_retries', 'request_retry_backoff', 'request_retry_max_backoff',
+        'request_hedge_delay', 'circuit_breaker_threshold' and 'circuit_breaker_reset'. Missing
+        parameters take the default values.
+        """
+        names = {
+            'timeout': 'request_timeout',
+            'long_timeout': 'long_request_timeout',
+            'max_retries': 'request_max_retries',
+            'retry_backoff': 'request_retry_backoff',
+            'retry_max_backoff': 'request_retry_max_backoff',
+            'hedge_delay': 'request_hedge_delay',
+            'circuit_breaker_threshold': 'circuit_breaker_threshold',
+            'circuit_breaker_reset': 'circuit_breaker_reset',
+        }
+        kwargs = {
+            arg: system_parameters[name] for arg, name in names.items() if name in system_parameters
+        }
+        return cls(**kwargs)
+
+    def timeout_for(self, action: str) -> Optional[float]:
+        return self.long_timeout if action in LONG_RUNNING_ACTIONS else self.timeout
+
+    def should_retry(self, action: str, attempt: int) -> bool:
+        """
+        Args:
+            action (str): Action of the failed request.
+            attempt (int): Number of retries already made (0 after the first failure).
+
+        Returns:
+            bool: Whether the request should be retried.
+        """
+        return action in IDEMPOTENT_ACTIONS and attempt < self.max_retries
+
+    def backoff_delay(self, attempt: int) -> float:
+        # Full jitter: spreads the retries of concurrent clients instead of synchronizing them
+        return random.uniform(0, min(self.retry_max_backoff, self.retry_backoff * 2**attempt))
+
+    def should_hedge(self, action: str) -> bool:
+        return (
+            self.hedge_delay is not None
+            and action in IDEMPOTENT_ACTIONS
+            and action not in LONG_RUNNING_ACTIONS
+        )
+
+    def circuit_breaker(self) -> CircuitBreaker:
+        return CircuitBreaker(self.circuit_breaker_threshold, self.circuit_breaker_reset)
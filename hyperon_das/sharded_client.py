@@ -0,0 +1,413 @@
+import base64
+import json
+import math
+from bisect import bisect_right
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from hyperon_das_atomdb.database import AtomT, HandleT, IncomingLinksT
+
+from hyperon_das.client import FunctionsClient
+from hyperon_das.delta_fetch import DeltaMarksT
+from hyperon_das.exceptions import InvalidDASParameters
+from hyperon_das.link_filters import LinkFilter
+from hyperon_das.load_balanced_client import EndpointT
+from hyperon_das.paged_fetch import ContinuationTokenT, HandleRangeT, split_handle_range
+from hyperon_das.type_alias import BatchEntryT, BatchOperationT, Query
+from hyperon_das.utils import das_error
+
+
+class ShardedClient:
+    """
+    ShardedClient sends the requests of a DAS to several remote DAS (shards) which together hold
+    an AtomSpace too large for a single server. It has the same methods as FunctionsClient,
+    except expand(), whose traversals would go from shard to shard.
+
+    Atoms are partitioned by handle: the space of handles is split in consecutive ranges of
+    similar size (see split_handle_range()) and each shard holds the atoms with handles in one
+    of them, in the same order as the shards are passed. Requests for a given atom go to the
+    shard which holds it, while the others are sent to all shards at once (scatter-gather) and
+    their results are merged as each shard answers. Paged scans are resumed with continuation
+    tokens which hold the token of each shard.
+
+    Queries are run by each shard on its own atoms, so an answer is only found when the links
+    it matches are held by the same shard.
+    """
+
+    def __init__(
+        self,
+        shards: List[EndpointT],
+        client_factory: Callable[..., FunctionsClient] = FunctionsClient,
+        **client_kwargs,
+    ) -> None:
+        """
+        Args:
+            shards (List[EndpointT]): Host and port of each shard, in the order of their
+                handle ranges.
+            client_factory (Callable[..., FunctionsClient], optional): Builds the client of each
+                shard. Defaults to FunctionsClient.
+            **client_kwargs: Other FunctionsClient arguments.
+
+        Raises:
+            FunctionsConnectionError: If a shard can't be connected to.
+        """
+        if not shards:
+            das_error(InvalidDASParameters(message='At least one shard is required'))
+        self.shards = list(shards)
+        self.handle_ranges: List[HandleRangeT] = split_handle_range(len(self.shards))
+        # Lower bounds of all but the first range, used to find the shard of a handle
+        self.bounds = [first for first, _ in self.handle_ranges[1:]]
+        self.executor = ThreadPoolExecutor(
+            max_workers=len(self.shards), thread_name_prefix='das-shard'
+        )
+        # Handshakes with the shards are made concurrently
+        self.clients: List[FunctionsClient] = list(
+            self.executor.map(
+                lambda shard: client_factory(shard[0], shard[1], **client_kwargs), self.shards
+            )
+        )
+
+    def close(self) -> None:
+        """
+        Stops the threads which send requests to the shards, cancelling the requests which
+        haven't started yet, and closes the client of each shard. Calling close() more than once
+        has no effect.
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        for client in self.clients:
+            client.close()
+
+    def shard_index(self, handle: HandleT) -> int:
+        """
+        Returns:
+            int: Index of the shard which holds the atom with the passed handle.
+        """
+        return bisect_right(self.bounds, handle)
+
+    def client_for(self, handle: HandleT) -> FunctionsClient:
+        return self.clients[self.shard_index(handle)]
+
+    def _scatter(self, action: str, *args, **kwargs) -> Iterator[Any]:
+        # Sends the request to all shards at once and returns their results as they arrive. A
+        # shard failing makes the whole request fail, since its results would be missing
+        futures = [
+            self.executor.submit(getattr(client, action), *args, **kwargs)
+            for client in self.clients
+        ]
+        return _as_completed_results(futures)
+
+    def stream(self, action: str, *args, **kwargs) -> Iterator[Any]:
+        """
+        Sends a request to all shards and yields the elements of their answers (lists) as each
+        shard answers, e.g. stream('get_links', link_filter). The request is sent right away,
+        even if the elements are never iterated.
+
+        Args:
+            action (str): FunctionsClient method, named after its action.
+            *args: Arguments of the method.
+            **kwargs: Keyword arguments of the method.
+
+        Returns:
+            Iterator[Any]: Elements of the answers of all shards.
+        """
+        answers = self._scatter(action, *args, **kwargs)
+        return (element for answer in answers for element in answer or [])
+
+    def get_atom(self, handle: HandleT, **kwargs) -> AtomT:
+        return self.client_for(handle).get_atom(handle, **kwargs)
+
+    def get_links(self, link_filter: LinkFilter) -> Iterator[Any]:
+        return self.stream('get_links', link_filter)
+
+    def get_link_handles(self, link_filter: LinkFilter) -> List[HandleT]:
+        return list(set(self.stream('get_link_handles', link_filter)))
+
+    def get_incoming_links(self, atom_handle: HandleT, **kwargs) -> Iterator[Any]:
+        # Links pointing to the atom may be held by any shard
+        return self.stream('get_incoming_links', atom_handle, **kwargs)
+
+    def get_incoming_links_page(
+        self,
+        atom_handle: HandleT,
+        continuation_token: Optional[ContinuationTokenT] = None,
+        chunk_size: int = 500,
+        **kwargs,
+    ) -> Tuple[Optional[ContinuationTokenT], IncomingLinksT]:
+        return self._page(
+            'get_incoming_links_page', (atom_handle,), continuation_token, chunk_size, kwargs
+        )
+
+    def query(self, query: Query, parameters: Optional[Dict[str, Any]] = None) -> Iterator[Any]:
+        return self.stream('query', query, parameters)
+
+    def count_atoms(self, parameters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        total: Dict[str, Any] = {}
+        for counts in self._scatter('count_atoms', parameters):
+            _add_counts(total, counts)
+        return total
+
+    def batch(self, operations: List[BatchOperationT]) -> List[BatchEntryT]:
+        """
+        Sends the operations to the shards in a batch request per shard. get_atom operations
+        go to the shard which holds the atom and the others go to all shards.
+
+        Args:
+            operations (List[BatchOperationT]): The operations.
+
+        Returns:
+            List[BatchEntryT]: The outcome of each operation, in the same order as the
+                operations.
+        """
+        shard_operations: List[List[Tuple[int, BatchOperationT]]] = [[] for _ in self.clients]
+        for index, operation in enumerate(operations):
+            if operation['action'] == 'get_atom':
+                shard = self.shard_index(operation['input']['handle'])
+                shard_operations[shard].append((index, operation))
+            else:
+                for pending in shard_operations:
+                    pending.append((index, dict(operation)))
+        futures = {
+            shard: self.executor.submit(
+                self.clients[shard].batch, [operation for _, operation in pending]
+            )
+            for shard, pending in enumerate(shard_operations)
+            if pending
+        }
+        shard_entries: List[List[BatchEntryT]] = [[] for _ in operations]
+        for shard, future in futures.items():
+            for (index, _), entry in zip(shard_operations[shard], future.result()):
+                shard_entries[index].append(entry)
+        return [
+            _merge_entries(operation, entries)
+            for operation, entries in zip(operations, shard_entries)
+        ]
+
+    def commit_changes(self, **kwargs) -> Optional[Tuple[int, ...]]:
+        if buffer := kwargs.pop('buffer', None):
+            # Each atom of the buffer is committed to the shard which holds it
+            buffers: List[List[AtomT]] = [[] for _ in self.clients]
+            for atom in buffer:
+                buffers[self.shard_index(atom.handle)].append(atom)
+            futures = [
+                self.executor.submit(client.commit_changes, buffer=atoms, **kwargs)
+                for client, atoms in zip(self.clients, buffers)
+                if atoms
+            ]
+            results = [future.result() for future in futures]
+        else:
+            results = list(self._scatter('commit_changes', **kwargs))
+        if results and all(isinstance(result, (list, tuple)) for result in results):
+            # Shards report counts of committed atoms, which are added up
+            return tuple(sum(values) for values in zip(*results))
+        return None
+
+    def create_field_index(self, *args, **kwargs) -> str:
+        # Shards build the same index, so they return the same index id
+        return list(self._scatter('create_field_index', *args, **kwargs))[0]
+
+    def create_context(self, name: str, queries: Optional[List[Query]]) -> Any:
+        return list(self._scatter('create_context', name, queries))[0]
+
+    def fetch(self, *args, **kwargs) -> List[Any]:
+        return list(self.stream('fetch', *args, **kwargs))
+
+    def fetch_page(
+        self,
+        query: Optional[Query],
+        cursor: Optional[HandleT] = None,
+        page_size: int = 1000,
+        handle_range: Optional[HandleRangeT] = None,
+    ) -> Tuple[Optional[HandleT], List[AtomT]]:
+        """
+        Fetches a page of the atoms (sorted by handle) in `handle_range` which follow `cursor`.
+        Since shards hold consecutive ranges of handles, the shards are scanned one after the
+        other, each one in its part of `handle_range`, starting at the shard which holds
+        `cursor`. A page is completed with the first atoms of the following shards.
+
+        Args:
+            query (Optional[Query]): A pattern used to select atoms or None to fetch all atoms.
+            cursor (Optional[HandleT], optional): Handle of the last atom of the previous page
+                or None to get the first page. Defaults to None.
+            page_size (int, optional): Maximum number of atoms in the page. Defaults to 1000.
+            handle_range (Optional[HandleRangeT], optional): Range of handles of the fetched
+                atoms. Defaults to None (all handles).
+
+        Returns:
+            Tuple[Optional[HandleT], List[AtomT]]: Cursor to the next page (None if this is the
+                last page) and the atoms in the page.
+        """
+        first, last = handle_range or (None, None)
+        shard = self.shard_index(cursor if cursor is not None else first or '')
+        atoms: List[AtomT] = []
+        while shard < len(self.clients):
+            shard_range = _intersect(handle_range, self.handle_ranges[shard])
+            if shard_range is None:
+                break
+            next_cursor, page = self.clients[shard].fetch_page(
+                query, cursor, page_size - len(atoms), shard_range
+            )
+            atoms.extend(page)
+            if next_cursor is not None or len(atoms) == page_size:
+                # The next page resumes the scan of this shard after the last atom
+                return (atoms[-1].handle if atoms else next_cursor), atoms
+            shard, cursor = shard + 1, None
+        return None, atoms
+
+    def fetch_delta(
+        self, query: Optional[Query], marks: DeltaMarksT
+    ) -> Tuple[DeltaMarksT, List[AtomT]]:
+        """
+        Fetches from each shard the atoms which were added or changed since the passed marks
+        were computed. The marks of the shards are kept apart, with the index of the shard as
+        prefix of their buckets.
+
+        Args:
+            query (Optional[Query]): A pattern used to select atoms or None to fetch all atoms.
+            marks (DeltaMarksT): Marks returned by the previous delta fetch of the same query.
+
+        Returns:
+            Tuple[DeltaMarksT, List[AtomT]]: The current marks and the added or changed atoms.
+        """
+        shard_marks: List[DeltaMarksT] = [{} for _ in self.clients]
+        for key, mark in marks.items():
+            shard, _, bucket = key.partition('/')
+            if shard.isdigit() and int(shard) < len(self.clients):
+                shard_marks[int(shard)][bucket] = mark
+        futures = [
+            self.executor.submit(client.fetch_delta, query, client_marks)
+            for client, client_marks in zip(self.clients, shard_marks)
+        ]
+        current_marks: DeltaMarksT = {}
+        atoms: List[AtomT] = []
+        for shard, future in enumerate(futures):
+            client_marks, changed_atoms = future.result()
+            current_marks.update({f'{shard}/{key}': mark for key, mark in client_marks.items()})
+            atoms.extend(changed_atoms)
+        return current_marks, atoms
+
+    def custom_query(self, index_id: str, query: Query, **kwargs) -> List[AtomT]:
+        return list(self.stream('custom_query', index_id, query, **kwargs))
+
+    def custom_query_page(
+        self,
+        index_id: str,
+        query: Query,
+        continuation_token: Optional[ContinuationTokenT] = None,
+        chunk_size: int = 1000,
+        **kwargs,
+    ) -> Tuple[Optional[ContinuationTokenT], List[AtomT]]:
+        return self._page(
+            'custom_query_page', (index_id, query), continuation_token, chunk_size, kwargs
+        )
+
+    def _page(
+        self,
+        action: str,
+        args: Tuple[Any, ...],
+        continuation_token: Optional[ContinuationTokenT],
+        chunk_size: int,
+        kwargs: Dict[str, Any],
+    ) -> Tuple[Optional[ContinuationTokenT], List[Any]]:
+        # Each page is requested from all shards whose scans aren't over, splitting the chunk
+        # size among them. The continuation token holds the token of each shard (None once its
+        # scan is over)
+        if continuation_token is None:
+            tokens: List[Optional[ContinuationTokenT]] = [None] * len(self.clients)
+            pending = list(range(len(self.clients)))
+        else:
+            tokens = self._decode_shard_tokens(continuation_token)
+            pending = [shard for shard, token in enumerate(tokens) if token is not None]
+        shard_chunk_size = math.ceil(chunk_size / max(len(pending), 1))
+        futures = {
+            shard: self.executor.submit(
+                getattr(self.clients[shard], action),
+                *args,
+                continuation_token=tokens[shard],
+                chunk_size=shard_chunk_size,
+                **kwargs,
+            )
+            for shard in pending
+        }
+        items: List[Any] = []
+        for shard, future in futures.items():
+            tokens[shard], page = future.result()
+            items.extend(page or [])
+        if all(token is None for token in tokens):
+            return None, items
+        return self._encode_shard_tokens(tokens), items
+
+    @staticmethod
+    def _encode_shard_tokens(tokens: List[Optional[ContinuationTokenT]]) -> ContinuationTokenT:
+        data = json.dumps({'shards': tokens}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def _decode_shard_tokens(
+        self, continuation_token: ContinuationTokenT
+    ) -> List[Optional[ContinuationTokenT]]:
+        try:
+            tokens = json.loads(base64.urlsafe_b64decode(continuation_token.encode()))['shards']
+        except (ValueError, KeyError, TypeError, AttributeError):
+            tokens = None
+        if not isinstance(tokens, list) or len(tokens) != len(self.clients):
+            das_error(ValueError(f'Invalid continuation token: {continuation_token}'))
+        return tokens
+
+    def get_atoms_by_field(self, query: Query) -> List[HandleT]:
+        return list(self.stream('get_atoms_by_field', query))
+
+    def get_atoms_by_text_field(self, *args, **kwargs) -> List[HandleT]:
+        return list(self.stream('get_atoms_by_text_field', *args, **kwargs))
+
+    def get_node_by_name_starting_with(self, node_type: str, startswith: str) -> List[HandleT]:
+        return list(self.stream('get_node_by_name_starting_with', node_type, startswith))
+
+    # Operations of batch requests are built and interpreted in the same way for all shards
+    get_atom_operation = staticmethod(FunctionsClient.get_atom_operation)
+    get_links_operation = staticmethod(FunctionsClient.get_links_operation)
+    get_incoming_links_operation = staticmethod(FunctionsClient.get_incoming_links_operation)
+    batch_result = staticmethod(FunctionsClient.batch_result)
+
+
+def _as_completed_results(futures: List[Future]) -> Iterator[Any]:
+    try:
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+def _intersect(first: Optional[HandleRangeT], second: HandleRangeT) -> Optional[HandleRangeT]:
+    # Intersection of two handle ranges or None if they don't overlap
+    first_start, first_end = first or (None, None)
+    second_start, second_end = second
+    starts = [start for start in (first_start, second_start) if start is not None]
+    ends = [end for end in (first_end, second_end) if end is not None]
+    start, end = max(starts, default=None), min(ends, default=None)
+    if start is not None and end is not None and start >= end:
+        return None
+    return start, end
+
+
+def _add_counts(total: Dict[str, Any], counts: Dict[str, Any]) -> None:
+    for key, value in counts.items():
+        if isinstance(value, dict):
+            _add_counts(total.setdefault(key, {}), value)
+        else:
+            total[key] = total.get(key, 0) + value
+
+
+def _merge_entries(operation: BatchOperationT, entries: List[BatchEntryT]) -> BatchEntryT:
+    # Entries of an operation sent to several shards are merged into the entry a single remote
+    # DAS would have returned. Errors of get_incoming_links are read as no links, as they are by
+    # FunctionsClient.batch_result()
+    if len(entries) == 1:
+        return entries[0]
+    results = []
+    for entry in entries:
+        if 'error' in entry:
+            if operation['action'] != 'get_incoming_links':
+                return entry
+            continue
+        results.extend(entry.get('result') or [])
+    return {'result': results}
@@ -3,7 +3,6 @@ from typing import Any, Callable, Type, TypeAlias
 from hyperon_das.tokenizers.elements import (
     TOKENS_DELIMITER,
     AndOperator,
-    ElementBuilder,
     Link,
     Node,
     NotOperator,
@@ -181,12 +180,63 @@ class DictQueryTokenizer:
         Raises:
             ValueError: If the tokens cannot be untokenized into a valid query.
         """
-        cursor = 0
         tokens = query_tokens.split()
-        if len(tokens) > 0 and tokens[0] in ("AND", "OR", "NOT", "LINK_TEMPLATE"):
-            cursor, element = ElementBuilder.from_tokens(tokens, cursor)
-            if cursor != len(tokens):
-                raise ValueError("Wrong elements count")
-            if to_query_callback := DictQueryTokenizer.to_query_mapping.get(type(element)):
-                return to_query_callback(element)
-        raise ValueError(f"Unsupported sequence of tokens: {tokens[cursor:]}")
+        if len(tokens) == 0 or tokens[0] not in ("AND", "OR", "NOT", "LINK_TEMPLATE"):
+            raise ValueError(f"Unsupported sequence of tokens: {tokens}")
+        # Single pass over the tokens building the query dicts directly. Each open link or
+        # operator is kept in the stack as (tag, query, children, expected children count) and is
+        # popped, and added to its parent, once all its children are parsed.
+        stack: list[tuple[str, DictQueryTokenizer.Query | None, list, int]] = []
+        cursor = 0
+        while True:
+            tag = tokens[cursor]
+            if tag == "NODE":
+                node_type, node_name = tokens[cursor + 1], tokens[cursor + 2]
+                query = {"atom_type": "node", "type": node_type, "name": node_name}
+                cursor += 3
+            elif tag == "VARIABLE":
+                query = {"atom_type": "variable", "name": tokens[cursor + 1]}
+                cursor += 2
+            elif tag in ("LINK", "LINK_TEMPLATE"):
+                link_type = tokens[cursor + 1]
+                target_count = int(tokens[cursor + 2])
+                if target_count < 2:
+                    raise ValueError("Link requires at least two targets")
+                targets: list[DictQueryTokenizer.Query] = []
+                link = {"atom_type": "link", "type": link_type, "targets": targets}
+                stack.append((tag, link, targets, target_count))
+                cursor += 3
+                continue
+            elif tag in ("AND", "OR"):
+                operand_count = int(tokens[cursor + 1])
+                if operand_count < 2:
+                    raise ValueError(f"{tag} operator requires at least two operands")
+                operands: list[DictQueryTokenizer.Query] = []
+                stack.append((tag, {tag.lower(): operands}, operands, operand_count))
+                cursor += 2
+                continue
+            elif tag == "NOT":
+                stack.append((tag, None, [], 1))
+                cursor += 1
+                continue
+            else:
+                raise ValueError(f"Unsupported sequence of tokens: {tokens[cursor:]}")
+            while stack:
+                tag, parent, children, children_count = stack[-1]
+                children.append(query)
+                if len(children) < children_count:
+                    break
+                stack.pop()
+                if tag == "NOT":
+                    parent = {"not": children[0]}
+                elif tag != "AND" and tag != "OR":
+                    is_template = any(c.get("atom_type") == "variable" for c in children)
+                    if tag == "LINK_TEMPLATE" and not is_template:
+                        raise ValueError("Template link without variables")
+                    elif tag == "LINK" and is_template:
+                        raise ValueError("Non-template link with variables")
+                query = parent
+            else:
+                if cursor != len(tokens):
+                    raise ValueError("Wrong elements count")
+                return query
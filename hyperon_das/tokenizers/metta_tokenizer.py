@@ -0,0 +1,181 @@
+import io
+import re
+from typing import Iterator, TextIO, TypeAlias
+
+from hyperon_das.tokenizers.elements import TOKENS_DELIMITER
+
+try:
+    from hyperon_das.tokenizers._metta_tokenizer import scan_tokens as _native_scan_tokens
+    from hyperon_das.tokenizers._metta_tokenizer import tokenize as _native_tokenize
+except ImportError:
+    _native_scan_tokens = None
+    _native_tokenize = None
+
+NATIVE_TOKENIZER_AVAILABLE = _native_tokenize is not None
+"""Whether the compiled tokenizer (extra/cpp/tokenizers, `make build-python-bindings`) is built."""
+
+MettaExpression: TypeAlias = str | list["MettaExpression"]
+"""A MeTTa expression: either a symbol or a (possibly nested) list of expressions."""
+
+TOKEN_REGEX = re.compile(r'"(?:[^"\\]|\\.)*"|[()]|;[^\n]*|[^\s()";]+|"', re.ASCII)
+"""Matches, in order: string literals, parentheses, comments, symbols and unterminated strings.
+Only ASCII whitespace separates tokens, as in the compiled tokenizer."""
+
+
+def iter_tokens(stream: TextIO, read_size: int = 1 << 16) -> Iterator[str]:
+    """
+    Split the contents of a MeTTa text stream into tokens, reading it incrementally.
+
+    Tokens are parentheses, string literals (quotes included) and symbols. Comments are skipped.
+    The compiled tokenizer is used when it's built, otherwise TOKEN_REGEX is.
+
+    Args:
+        stream (TextIO): The text stream to be tokenized.
+        read_size (int, optional): Number of characters read from the stream at once. Defaults
+            to 65536.
+
+    Returns:
+        Iterator[str]: An iterator over the tokens.
+
+    Raises:
+        ValueError: If the stream ends in the middle of a string literal.
+    """
+    carry = ""
+    while True:
+        data = stream.read(read_size)
+        eof = not data
+        text, carry = carry + data, ""
+        if _native_scan_tokens is not None:
+            try:
+                tokens, carry = _native_scan_tokens(text, eof)
+            except RuntimeError as exception:
+                raise ValueError(str(exception)) from exception
+            yield from tokens
+            if eof:
+                return
+            continue
+        for match in TOKEN_REGEX.finditer(text):
+            token = match.group()
+            if token == '"' or (not eof and match.end() == len(text)):
+                if eof:
+                    raise ValueError("Unterminated string literal")
+                # The token may continue in the next read
+                carry = text[match.start() :]
+                break
+            if token[0] != ";":
+                yield token
+        if eof:
+            return
+
+
+def iter_expressions(stream: TextIO, read_size: int = 1 << 16) -> Iterator[MettaExpression]:
+    """
+    Parse the top-level expressions of a MeTTa text stream, reading it incrementally.
+
+    Expressions prefixed by `!` (i.e. expressions to be evaluated rather than atoms) are skipped.
+
+    Example:
+        >>> list(iter_expressions(io.StringIO('(: "human" Concept) (Similarity "human" "monkey")')))
+        [[':', '"human"', 'Concept'], ['Similarity', '"human"', '"monkey"']]
+
+    Args:
+        stream (TextIO): The text stream to be parsed.
+        read_size (int, optional): Number of characters read from the stream at once. Defaults
+            to 65536.
+
+    Returns:
+        Iterator[MettaExpression]: An iterator over the top-level expressions.
+
+    Raises:
+        ValueError: If the parentheses in the stream are unbalanced.
+    """
+    stack: list[list[MettaExpression]] = []
+    skip_next = False
+    for token in iter_tokens(stream, read_size):
+        if token == "(":
+            stack.append([])
+            continue
+        if token == ")":
+            if not stack:
+                raise ValueError("Unbalanced parentheses: unexpected ')'")
+            expression = stack.pop()
+            if stack:
+                stack[-1].append(expression)
+                continue
+        elif stack:
+            stack[-1].append(token)
+            continue
+        else:
+            expression = token
+        if expression == "!":
+            skip_next = True
+        elif skip_next:
+            skip_next = False
+        else:
+            yield expression
+    if stack:
+        raise ValueError("Unbalanced parentheses: missing ')'")
+
+
+def _python_tokenize(expression: str) -> str:
+    # Each frame holds, for an open expression, the tokens of its targets, its target count and
+    # whether it's a template (i.e. whether it has variables as direct targets).
+    stack: list[list] = []
+    tokenized = None
+    for token in iter_tokens(io.StringIO(expression)):
+        if tokenized is not None:
+            raise ValueError("Invalid expression: unexpected tokens after the expression")
+        if token == "(":
+            stack.append([[], 0, False])
+            continue
+        if not stack:
+            raise ValueError(f"Invalid expression: unexpected token {token!r}")
+        if token == ")":
+            targets, target_count, is_template = stack.pop()
+            header = "LINK_TEMPLATE" if is_template else "LINK"
+            tokens = [header, "Expression", str(target_count), *targets]
+            if not stack:
+                tokenized = TOKENS_DELIMITER.join(tokens)
+                continue
+        elif token[0] == "$":
+            tokens = ["VARIABLE", token[1:]]
+            stack[-1][2] = True
+        else:
+            tokens = ["NODE", "Symbol", token]
+        stack[-1][0].extend(tokens)
+        stack[-1][1] += 1
+    if tokenized is None:
+        raise ValueError("Invalid expression")
+    return tokenized
+
+
+def tokenize(expression: str) -> str:
+    """
+    Convert a MeTTa expression into a tokenized string.
+
+    Expressions are mapped to `Expression` links and symbols to `Symbol` nodes, except for the
+    ones starting with `$`, which are variables. The output is the same token stream produced by
+    `DictQueryTokenizer.tokenize()` for the equivalent query, so it can be untokenized with
+    `DictQueryTokenizer.untokenize()`.
+
+    The compiled tokenizer is used when it's built, otherwise a pure Python one is used.
+
+    Example:
+        >>> tokenize('(Similarity (Concept "human") $v1)')
+        'LINK_TEMPLATE Expression 3 NODE Symbol Similarity LINK Expression 2 NODE Symbol Concept NODE Symbol "human" VARIABLE v1'
+
+    Args:
+        expression (str): The MeTTa expression to tokenize.
+
+    Returns:
+        str: A tokenized string representation of the expression.
+
+    Raises:
+        ValueError: If the expression is invalid.
+    """
+    if _native_tokenize is None:
+        return _python_tokenize(expression)
+    try:
+        return _native_tokenize(expression)
+    except RuntimeError as exception:
+        raise ValueError(str(exception)) from exception
@@ -1,17 +1,50 @@
-from typing import TYPE_CHECKING, Any, Dict
+from typing import TYPE_CHECKING, Any, Dict, Iterator
 
 from hyperon_das_atomdb import AtomDoesNotExist
 
-from hyperon_das.cache import LocalIncomingLinks, RemoteIncomingLinks
+from hyperon_das.cache import ListIterator, LocalIncomingLinks, RemoteIncomingLinks
 from hyperon_das.cache.iterators import TraverseLinksIterator, TraverseNeighborsIterator
+from hyperon_das.cache.traverse_prefetcher import TraversePrefetcher
 
 if TYPE_CHECKING:  # pragma no cover
     from hyperon_das.das import DistributedAtomSpace
 
 
+def get_incoming_links(
+    das: 'DistributedAtomSpace', handle: str, chunk_size: int = 500, **filters
+) -> LocalIncomingLinks | RemoteIncomingLinks:
+    """Returns an iterator over the incoming links of an atom, with their targets documents.
+
+    Args:
+        das (DistributedAtomSpace): The DAS queried for the links.
+        handle (str): Atom's handle.
+        chunk_size (int, optional): Chunk size. Defaults to 500.
+
+    Keyword Args:
+        link_type (str, optional): Only links of this type are returned.
+        cursor_position (int, optional): Only links with the atom at this position are returned.
+        target_type (str, optional): Only links with a target of this type are returned.
+
+    Returns:
+        LocalIncomingLinks | RemoteIncomingLinks: The iterator.
+    """
+    cursor, incoming_links = das.get_incoming_links(
+        atom_handle=handle,
+        no_iterator=False,
+        targets_document=True,
+        cursor=0,
+        chunk_size=chunk_size,
+        **{key: value for key, value in filters.items() if value is not None},
+    )
+    # Following pages, if any (i.e. `cursor` isn't 0), are fetched by the iterator itself
+    assert isinstance(incoming_links, (LocalIncomingLinks, RemoteIncomingLinks))
+    return incoming_links
+
+
 class TraverseEngine:
     def __init__(self, handle: str, **kwargs) -> None:
         self.das: DistributedAtomSpace = kwargs['das']
+        self._prefetcher: TraversePrefetcher | None = kwargs.get('prefetcher')
 
         try:
             atom = self.das.get_atom(handle)
@@ -19,6 +52,15 @@ class TraverseEngine:
             raise e
 
         self._cursor = atom
+        self._prefetch()
+
+    def _cursor_handle(self) -> str:
+        # Atoms of local backends are dataclasses while the ones of remote DAS are dicts
+        return self._cursor['handle'] if isinstance(self._cursor, dict) else self._cursor.handle
+
+    def _prefetch(self) -> None:
+        if self._prefetcher is not None:
+            self._prefetcher.prefetch(self._cursor_handle())
 
     def get(self) -> Dict[str, Any]:
         """Returns the current cursor.
@@ -54,16 +96,24 @@ class TraverseEngine:
                 )
             >>> next(links)
         """
-        cursor, incoming_links = self.das.get_incoming_links(
-            atom_handle=self._cursor['handle'],
-            no_iterator=False,
-            targets_document=True,
-            cursor=0,
-            chunk_size=kwargs.get('chunk_size', 500),
-        )
-        assert cursor == 0
-        assert isinstance(incoming_links, (LocalIncomingLinks, RemoteIncomingLinks))
-        return TraverseLinksIterator(source=incoming_links, cursor=self._cursor['handle'], **kwargs)
+        handle = self._cursor_handle()
+        prefetched_links = None
+        if self._prefetcher is not None:
+            prefetched_links = self._prefetcher.get_incoming_links(handle)
+        if prefetched_links is not None:
+            incoming_links = ListIterator(prefetched_links)
+        else:
+            # Structural filters are applied by the backend (or remote server) as well, so only
+            # the documents of the targets of matching links are fetched
+            incoming_links = get_incoming_links(
+                self.das,
+                handle,
+                chunk_size=kwargs.get('chunk_size', 500),
+                link_type=kwargs.get('link_type'),
+                cursor_position=kwargs.get('cursor_position'),
+                target_type=kwargs.get('target_type'),
+            )
+        return TraverseLinksIterator(source=incoming_links, cursor=handle, **kwargs)
 
     def get_neighbors(self, **kwargs) -> TraverseNeighborsIterator:
         """Get all of "neighbors" that pointing to current cursor.
@@ -84,6 +134,11 @@ class TraverseEngine:
             filters (tuple[Callable[[dict], bool] | None, Callable[[dict], bool] | None], optional): Tuple containing
                 filter function for links at pos 0 and filter function for targets at pos 1.
                 Used to filter the results after applying all other filters.
+            visited_capacity (int, optional): When passed, returned neighbors are tracked with a
+                fixed size probabilistic set (a Bloom filter) sized for this number of neighbors,
+                instead of a regular set. Useful for atoms with a huge number of neighbors.
+            visited_error_rate (float, optional): Probability of a neighbor being wrongly skipped
+                as already returned, when `visited_capacity` is passed. Defaults to 0.001.
 
         Returns:
             Iterator: An iterator that contains the neighbors that match the criteria.
@@ -109,8 +164,15 @@ class TraverseEngine:
         if filter_link is not None:
             kwargs['filter'] = filter_link
 
+        visited_capacity = kwargs.pop('visited_capacity', None)
+        visited_error_rate = kwargs.pop('visited_error_rate', 0.001)
         filtered_links = self.get_links(targets_only=True, **kwargs)
-        return TraverseNeighborsIterator(source=filtered_links, filter=filter_target)
+        return TraverseNeighborsIterator(
+            source=filtered_links,
+            filter=filter_target,
+            visited_capacity=visited_capacity,
+            visited_error_rate=visited_error_rate,
+        )
 
     def follow_link(self, **kwargs) -> Dict[str, Any]:
         """Update the current cursor by following the first of the neighbors that points to the current cursor.
@@ -137,8 +199,42 @@ class TraverseEngine:
         filtered_neighbors = self.get_neighbors(**kwargs)
         if not filtered_neighbors.is_empty():
             self._cursor = filtered_neighbors.get()
+            self._prefetch()
         return self._cursor
 
+    def expand(self, depth: int = 1, **kwargs) -> Iterator[Any]:
+        """Visits the atoms up to `depth` hops away from the current cursor, in breadth-first or
+        depth-first order, without moving the cursor. The traversal is made by the query engine
+        (in a remote DAS, by the server in a single request) instead of one request per hop.
+
+        Args:
+            depth (int, optional): Maximum distance (number of hops) from the cursor. Defaults
+                to 1.
+
+        Keyword Args:
+            link_type (str, optional): Only links of this type are followed.
+            target_type (str, optional): Only atoms of this type are visited.
+            max_nodes (int, optional): Maximum number of visited atoms.
+            strategy (str, optional): Either 'bfs' or 'dfs'. Defaults to 'bfs'.
+
+        Returns:
+            Iterator: An iterator over the visited atoms (the cursor isn't included).
+
+        Examples:
+            >>> for atom in traverse_engine.expand(depth=2, link_type='Similarity', max_nodes=10):
+                    print(atom)
+        """
+        return iter(
+            self.das.expand(
+                self._cursor_handle(),
+                depth,
+                link_type=kwargs.get('link_type'),
+                target_type=kwargs.get('target_type'),
+                max_nodes=kwargs.get('max_nodes'),
+                strategy=kwargs.get('strategy', 'bfs'),
+            )
+        )
+
     def goto(self, handle: str) -> Dict[str, Any]:
         """Reset current cursor to the passed handle.
 
@@ -165,4 +261,5 @@ class TraverseEngine:
             self._cursor = self.das.get_atom(handle)
         except AtomDoesNotExist as e:
             raise e
+        self._prefetch()
         return self._cursor
@@ -1,3 +1,12 @@
 from typing import Any, Dict, List, TypeAlias, Union
 
 Query: TypeAlias = Union[List[Dict[str, Any]], Dict[str, Any]]
+
+BatchOperationT: TypeAlias = Dict[str, Any]
+"""An operation sent in a batch request, i.e. the payload of the equivalent single request."""
+
+BatchEntryT: TypeAlias = Dict[str, Any]
+"""
+The outcome of an operation of a batch request: {'result': <result>} or
+{'error': <message>, 'status_code': <HTTP status code of the equivalent single request>}.
+"""
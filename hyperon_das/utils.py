@@ -1,8 +1,15 @@
+import json
+import os
 import pickle
 import re
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
+from functools import lru_cache
 from http import HTTPStatus  # noqa: F401
 from importlib import import_module
+from threading import Lock
 from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple, Union
 
 from requests import sessions
@@ -145,6 +152,7 @@ class QueryAnswer:
         return handle_count
 
 
+@lru_cache(maxsize=None)
 def get_package_version(package_name: str) -> str:
     package_module = import_module(package_name)
     return getattr(package_module, "__version__", None)
@@ -158,20 +166,102 @@ def deserialize(payload: bytes) -> Any:
     return pickle.loads(payload)
 
 
+_handshake_cache: Dict[str, str] = {}
+_handshake_cache_lock = Lock()
+
+
+def clear_handshake_cache() -> None:
+    """Forget the servers connected to by this process, so the next connections make handshakes"""
+    with _handshake_cache_lock:
+        _handshake_cache.clear()
+
+
+def _local_versions() -> Dict[str, str]:
+    return {
+        'das': get_package_version('hyperon_das'),
+        'atom_db': get_package_version('hyperon_das_atomdb'),
+    }
+
+
+def _read_handshake_cache_file(cache_file: str, server: str, cache_ttl: float) -> Optional[str]:
+    try:
+        with open(cache_file, 'r') as file:
+            entry = json.load(file).get(server)
+    except (OSError, ValueError, AttributeError):
+        return None
+    if (
+        not isinstance(entry, dict)
+        or time.time() - entry.get('timestamp', 0) > cache_ttl
+        or entry.get('versions') != _local_versions()
+    ):
+        return None
+    return entry.get('url')
+
+
+def _write_handshake_cache_file(cache_file: str, server: str, url: str) -> None:
+    try:
+        try:
+            with open(cache_file, 'r') as file:
+                entries = json.load(file)
+        except (OSError, ValueError):
+            entries = {}
+        if not isinstance(entries, dict):
+            entries = {}
+        entries[server] = {'url': url, 'timestamp': time.time(), 'versions': _local_versions()}
+        # Written to a temporary file and renamed, so concurrent readers never see partial data
+        directory = os.path.dirname(os.path.abspath(cache_file))
+        with tempfile.NamedTemporaryFile('w', dir=directory, delete=False) as file:
+            json.dump(entries, file)
+        os.replace(file.name, cache_file)
+    except OSError as e:
+        logger().debug(f"Couldn't write handshake cache file {cache_file}: {str(e)}")
+
+
 @retry(attempts=5, timeout_seconds=120)
-def connect_to_server(host: str, port: int) -> Tuple[int, str]:
-    """Connect to the server and return the status connection and the url server"""
+def connect_to_server(
+    host: str, port: int, cache_file: Optional[str] = None, cache_ttl: float = 3600.0
+) -> Tuple[int, str]:
+    """
+    Connect to the server and return the status connection and the url server.
+
+    Successful handshakes are cached for the lifetime of the process and, if `cache_file` is
+    passed, in that file for `cache_ttl` seconds (entries are also discarded when the local
+    package versions change). The candidate URLs are probed concurrently.
+    """
     port = port or "8081"
+    server = f'{host}:{port}'
+    with _handshake_cache_lock:
+        url = _handshake_cache.get(server)
+    if url is None and cache_file is not None:
+        url = _read_handshake_cache_file(cache_file, server, cache_ttl)
+    if url is not None:
+        logger().debug(f"Using cached handshake with remote DAS {url}")
+        with _handshake_cache_lock:
+            _handshake_cache[server] = url
+        return HTTPStatus.OK, url
+
     openfaas_uri = f"http://{host}:{port}/function/query-engine"
     aws_lambda_uri = f"http://{host}/prod/query-engine"
+    uris = [openfaas_uri, aws_lambda_uri]
 
-    for uri in [openfaas_uri, aws_lambda_uri]:
-        status_code, message = check_server_connection(uri)
-        if status_code == HTTPStatus.OK:
-            break
-        elif status_code == HTTPStatus.INTERNAL_SERVER_ERROR:
-            raise Exception(message)
-
+    # Candidates are still checked in order, but the slower ones don't wait for the first ones
+    executor = ThreadPoolExecutor(max_workers=len(uris))
+    try:
+        probes = [executor.submit(check_server_connection, uri) for uri in uris]
+        for uri, probe in zip(uris, probes):
+            status_code, message = probe.result()
+            if status_code == HTTPStatus.OK:
+                break
+            elif status_code == HTTPStatus.INTERNAL_SERVER_ERROR:
+                raise Exception(message)
+    finally:
+        executor.shutdown(wait=False)
+
+    if status_code == HTTPStatus.OK:
+        with _handshake_cache_lock:
+            _handshake_cache[server] = uri
+        if cache_file is not None:
+            _write_handshake_cache_file(cache_file, server, uri)
     return status_code, uri
 
 
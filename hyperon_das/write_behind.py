@@ -0,0 +1,166 @@
+import atexit
+import time
+from threading import Condition, Lock, Thread
+from typing import Callable, Optional
+
+from hyperon_das.exceptions import WriteBehindBufferFull
+from hyperon_das.logger import logger
+from hyperon_das.utils import das_error
+
+
+class WriteBehindBuffer:
+    """
+    WriteBehindBuffer keeps track of the atoms added to a DAS which were not committed yet and
+    flushes them in a background thread, by calling the passed flush function, whenever too many
+    atoms are pending or the oldest pending atom is too old.
+
+    Writers are blocked (backpressure) while the number of atoms waiting to be flushed, including
+    the ones being flushed at the moment, is above `max_pending`. If they're blocked for more than
+    `max_wait_seconds` (e.g. because flushes keep failing) WriteBehindBufferFull is raised. close()
+    stops the background thread after flushing the pending atoms. It's also called when the Python
+    interpreter exits, if it wasn't called before.
+    """
+
+    def __init__(
+        self,
+        flush_function: Callable[[], None],
+        max_atoms: int = 10000,
+        max_age_seconds: float = 5.0,
+        max_pending: int = 100000,
+        max_wait_seconds: Optional[float] = 60.0,
+    ):
+        """
+        Args:
+            flush_function (Callable[[], None]): Function used to actually flush pending atoms.
+            max_atoms (int, optional): A flush is triggered when this number of atoms is pending.
+                Defaults to 10000.
+            max_age_seconds (float, optional): A flush is triggered when the oldest pending atom
+                is older than this. Defaults to 5.0.
+            max_pending (int, optional): Writers block when this number of atoms is waiting to be
+                flushed. Defaults to 100000.
+            max_wait_seconds (Optional[float], optional): Maximum time writers are blocked.
+                Defaults to 60.0 (None means no limit).
+        """
+        self.flush_function = flush_function
+        self.max_atoms = max_atoms
+        self.max_age_seconds = max_age_seconds
+        self.max_pending = max(max_pending, max_atoms)
+        self.max_wait_seconds = max_wait_seconds
+        self.pending = 0
+        self.in_flight = 0
+        self.oldest_pending_time: Optional[float] = None
+        self.last_flush_error: Optional[Exception] = None
+        self.closed = False
+        self.condition = Condition()
+        self.flush_lock = Lock()
+        self.thread = Thread(target=self._run, name='das-write-behind', daemon=True)
+        self.thread.start()
+        atexit.register(self._close_on_exit)
+
+    def _should_flush(self) -> bool:
+        if self.pending == 0:
+            return False
+        if self.pending >= self.max_atoms:
+            return True
+        return time.monotonic() - self.oldest_pending_time >= self.max_age_seconds
+
+    def _time_to_flush(self) -> Optional[float]:
+        if self.pending == 0:
+            return None
+        return max(0.0, self.oldest_pending_time + self.max_age_seconds - time.monotonic())
+
+    def _run(self) -> None:
+        while True:
+            with self.condition:
+                while not self.closed and not self._should_flush():
+                    self.condition.wait(timeout=self._time_to_flush())
+                if self.closed:
+                    return
+            try:
+                self.flush()
+            except Exception as exception:
+                logger().error(f'Background flush of pending atoms failed: {str(exception)}')
+                with self.condition:
+                    self.condition.wait(timeout=self.max_age_seconds)
+
+    def regard_added_atoms(self, count: int = 1) -> None:
+        """
+        Registers atoms added to the DAS. Blocks the caller while there are too many atoms waiting
+        to be flushed.
+
+        Args:
+            count (int, optional): Number of added atoms. Defaults to 1.
+
+        Raises:
+            WriteBehindBufferFull: If the caller was blocked for more than `max_wait_seconds`.
+                The added atoms are still pending.
+        """
+        with self.condition:
+            if self.pending == 0:
+                self.oldest_pending_time = time.monotonic()
+                self.condition.notify_all()
+            self.pending += count
+            if self.pending >= self.max_atoms:
+                self.condition.notify_all()
+            deadline = None
+            if self.max_wait_seconds is not None:
+                deadline = time.monotonic() + self.max_wait_seconds
+            while not self.closed and self.pending + self.in_flight >= self.max_pending:
+                if deadline is not None and time.monotonic() >= deadline:
+                    das_error(
+                        WriteBehindBufferFull(
+                            message=(
+                                f'Write-behind buffer is full: {self.pending + self.in_flight} '
+                                'atoms are waiting to be committed'
+                            ),
+                            details=f'Last flush error: {self.last_flush_error}',
+                        )
+                    )
+                self.condition.wait(
+                    timeout=None if deadline is None else deadline - time.monotonic()
+                )
+
+    def flush(self) -> None:
+        """
+        Flushes all pending atoms in the caller's thread.
+        """
+        with self.flush_lock:
+            with self.condition:
+                flushed, self.pending = self.pending, 0
+                self.in_flight = flushed
+                self.oldest_pending_time = None
+            try:
+                self.flush_function()
+                self.last_flush_error = None
+            except Exception as exception:
+                with self.condition:
+                    self.last_flush_error = exception
+                    if self.pending == 0:
+                        self.oldest_pending_time = time.monotonic()
+                    self.pending += flushed
+                raise
+            finally:
+                with self.condition:
+                    self.in_flight = 0
+                    self.condition.notify_all()
+
+    def close(self) -> None:
+        """
+        Stops the background thread and flushes any pending atoms. The buffer (and the flush
+        function) is only released after it's closed.
+        """
+        with self.condition:
+            if self.closed:
+                return
+            self.closed = True
+            self.condition.notify_all()
+        atexit.unregister(self._close_on_exit)
+        self.thread.join()
+        if self.pending:
+            self.flush()
+
+    def _close_on_exit(self) -> None:
+        try:
+            self.close()
+        except Exception as exception:
+            logger().error(f'Failed to flush pending atoms on exit: {str(exception)}')
@@ -0,0 +1,47 @@
+"""Benchmark DictQueryTokenizer.untokenize() against the Element based untokenizer."""
+
+import random
+import timeit
+
+import pytest
+from conftest import PERFORMANCE_REPORT
+
+from hyperon_das.tokenizers.dict_query_tokenizer import DictQueryTokenizer
+from hyperon_das.tokenizers.elements import ElementBuilder
+
+
+def _untokenize_with_elements(query_tokens: str) -> DictQueryTokenizer.Query:
+    _, element = ElementBuilder.from_tokens(query_tokens.split())
+    return DictQueryTokenizer.to_query_mapping[type(element)](element)
+
+
+def _random_link(depth: int, arity: int) -> dict:
+    targets = [{"atom_type": "node", "type": "Symbol", "name": f"N{random.randint(0, 1000)}"}]
+    for _ in range(arity - 1):
+        if depth > 0 and random.random() < 0.5:
+            targets.append(_random_link(depth - 1, arity))
+        elif random.random() < 0.3:
+            targets.append({"atom_type": "variable", "name": f"V{random.randint(0, 10)}"})
+        else:
+            targets.append({"atom_type": "node", "type": "Symbol", "name": "Similarity"})
+    return {"atom_type": "link", "type": "Expression", "targets": targets}
+
+
+@pytest.mark.parametrize('operands,depth,arity', [(2, 1, 3), (10, 3, 3), (100, 5, 4)])
+def test_untokenize_benchmark(operands, depth, arity):
+    random.seed(operands)
+    query = {"or": [_random_link(depth, arity) for _ in range(operands)]}
+    tokens = DictQueryTokenizer.tokenize(query)
+    assert DictQueryTokenizer.untokenize(tokens) == _untokenize_with_elements(tokens) == query
+
+    number = max(1, 20000 // len(tokens.split()))
+    elements_time = min(timeit.repeat(lambda: _untokenize_with_elements(tokens), number=number))
+    iterative_time = min(
+        timeit.repeat(lambda: DictQueryTokenizer.untokenize(tokens), number=number)
+    )
+    PERFORMANCE_REPORT.append(
+        f'untokenize ({len(tokens.split())} tokens): '
+        f'elements {elements_time / number * 1e6:.1f}us, '
+        f'iterative {iterative_time / number * 1e6:.1f}us '
+        f'({elements_time / iterative_time:.1f}x)'
+    )
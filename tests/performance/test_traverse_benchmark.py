@@ -0,0 +1,71 @@
+"""Benchmark TraverseNeighborsIterator on a high-degree node against list based visited tracking."""
+
+import time
+
+import pytest
+from conftest import PERFORMANCE_REPORT
+
+from hyperon_das.cache.iterators import (
+    ListIterator,
+    TraverseLinksIterator,
+    TraverseNeighborsIterator,
+)
+
+HUB = 'hub'
+
+
+class _ListVisitedNeighborsIterator(TraverseNeighborsIterator):
+    # The previous implementation: visited neighbors kept in a list (linear lookups)
+    def _process_targets(self, targets: list) -> tuple:
+        if not hasattr(self, 'visited_list'):
+            self.visited_list = []
+        answer = []
+        for target in targets:
+            if self._filter(target):
+                self.visited_list.append(target['handle'])
+                answer.append(target)
+        return (answer, bool(answer))
+
+    def _filter(self, target: dict) -> bool:
+        return target['handle'] != self.cursor and target['handle'] not in self.visited_list
+
+
+def _hub_links(degree: int) -> list:
+    # Each neighbor is reachable through two links
+    return [
+        (
+            {'handle': f'link{i}', 'named_type': 'Similarity', 'targets': [HUB, f'node{i // 2}']},
+            [
+                {'handle': HUB, 'named_type': 'Concept'},
+                {'handle': f'node{i // 2}', 'named_type': 'Concept'},
+            ],
+        )
+        for i in range(2 * degree)
+    ]
+
+
+def _count_neighbors(iterator_class, links: list, **kwargs) -> tuple[int, float]:
+    start = time.perf_counter()
+    source = TraverseLinksIterator(ListIterator(links), targets_only=True, cursor=HUB)
+    count = sum(1 for _ in iterator_class(source=source, **kwargs))
+    return count, time.perf_counter() - start
+
+
+@pytest.mark.parametrize('degree', [1000, 5000, 20000])
+def test_neighbors_of_high_degree_node(degree):
+    links = _hub_links(degree)
+    count, set_time = _count_neighbors(TraverseNeighborsIterator, links)
+    assert count == degree
+    count, bloom_time = _count_neighbors(
+        TraverseNeighborsIterator, links, visited_capacity=degree, visited_error_rate=0.001
+    )
+    assert count >= degree * 0.99
+    report = (
+        f'get_neighbors (degree {degree}): set {set_time * 1e3:.1f}ms, '
+        f'bloom filter {bloom_time * 1e3:.1f}ms'
+    )
+    if degree <= 5000:
+        count, list_time = _count_neighbors(_ListVisitedNeighborsIterator, links)
+        assert count == degree
+        report += f', list {list_time * 1e3:.1f}ms ({list_time / set_time:.1f}x)'
+    PERFORMANCE_REPORT.append(report)
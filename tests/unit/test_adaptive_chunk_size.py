@@ -0,0 +1,48 @@
+from hyperon_das.cache.adaptive_chunk_size import AdaptiveChunkSize, AdaptiveChunkSizes
+
+
+class TestAdaptiveChunkSize:
+    def test_bounds(self):
+        assert AdaptiveChunkSize(10, min_chunk_size=100).chunk_size == 100
+        assert AdaptiveChunkSize(50000, max_chunk_size=10000).chunk_size == 10000
+        assert AdaptiveChunkSize(500).chunk_size == 500
+
+    def test_grows_while_consumer_keeps_up(self):
+        chunk_size = AdaptiveChunkSize(100, max_chunk_size=1000)
+        for expected in [200, 400, 800, 1000, 1000]:
+            chunk_size.record_fetch(0.01, consumer_waiting=True, consumer_behind=False)
+            assert chunk_size.chunk_size == expected
+
+    def test_shrinks_on_slow_fetches(self):
+        chunk_size = AdaptiveChunkSize(1000, min_chunk_size=300, target_latency=0.5)
+        chunk_size.record_fetch(1.0, consumer_waiting=True, consumer_behind=False)
+        assert chunk_size.chunk_size == 500
+        chunk_size.record_fetch(1.0, consumer_waiting=True, consumer_behind=False)
+        assert chunk_size.chunk_size == 300
+
+    def test_shrinks_when_consumer_is_behind(self):
+        chunk_size = AdaptiveChunkSize(1000)
+        chunk_size.record_fetch(0.01, consumer_waiting=False, consumer_behind=False)
+        assert chunk_size.chunk_size == 1000
+        chunk_size.record_fetch(0.01, consumer_waiting=False, consumer_behind=True)
+        assert chunk_size.chunk_size == 500
+
+    def test_shrinks_on_early_stop(self):
+        chunk_size = AdaptiveChunkSize(1000)
+        chunk_size.record_early_stop()
+        assert chunk_size.chunk_size == 500
+
+
+class TestAdaptiveChunkSizes:
+    def test_disabled(self):
+        assert AdaptiveChunkSizes({'adaptive_chunk_size': False}).get('index') is None
+
+    def test_get(self):
+        chunk_sizes = AdaptiveChunkSizes(
+            {'adaptive_chunk_size': True, 'min_chunk_size': 10, 'max_chunk_size': 50}
+        )
+        chunk_size = chunk_sizes.get('index')
+        assert chunk_size.chunk_size == 10
+        assert chunk_size.max_chunk_size == 50
+        assert chunk_sizes.get('index', 40) is chunk_size
+        assert chunk_sizes.get('other', 40).chunk_size == 40
@@ -1,17 +1,25 @@
-from collections import deque
+import gc
+import weakref
+from threading import Thread
 from unittest import mock
 
 import pytest
 
+from hyperon_das.cache.adaptive_chunk_size import AdaptiveChunkSize
+from hyperon_das.cache.bloom_filter import BloomFilter
 from hyperon_das.cache.iterators import (
+    DEFAULT_PREFETCH_PAGES,
     BaseLinksIterator,
+    CustomQuery,
     ListIterator,
     LocalIncomingLinks,
+    PagePipeline,
     ProductIterator,
     RemoteIncomingLinks,
     TraverseLinksIterator,
     TraverseNeighborsIterator,
 )
+from hyperon_das.cache.page_fetch_executor import PageFetchExecutor
 from hyperon_das.utils import Assignment
 
 
@@ -160,7 +168,89 @@ class ConcreteBaseLinksIterator(BaseLinksIterator):
         return 'next_value'
 
 
+class PagedLinksIterator(BaseLinksIterator):
+    def __init__(self, pages, source, **kwargs):
+        self.pages = pages
+        self.fetched = []
+        super().__init__(source, **kwargs)
+
+    def get_current_value(self):
+        try:
+            return self.source.get()
+        except StopIteration:
+            return None
+
+    def get_fetch_data(self, cursor):
+        self.fetched.append(cursor)
+        return self.pages[cursor]
+
+    def get_fetch_data_kwargs(self):
+        return {'cursor': self.cursor}
+
+    def get_next_value(self):
+        return next(self.iterator)
+
+
+class TestPagePipeline:
+    def test_get(self):
+        pipeline = PagePipeline(max_pages=3)
+        pipeline.put([1], last=False)
+        pipeline.put([2], last=True)
+        assert pipeline.get() == [1]
+        assert pipeline.get() == [2]
+        assert pipeline.get() is None
+
+    def test_reserve(self):
+        pipeline = PagePipeline(max_pages=2)
+        assert pipeline.reserve()
+        assert not pipeline.reserve()
+        pipeline.put([1], last=False)
+        assert pipeline.reserve()
+        pipeline.put([2], last=False)
+        assert not pipeline.reserve()
+        assert pipeline.get() == [1]
+        assert pipeline.reserve()
+        pipeline.put([3], last=True)
+        assert pipeline.get() == [2]
+        assert not pipeline.reserve()
+
+    def test_get_blocks(self):
+        pipeline = PagePipeline()
+        pages = []
+        thread = Thread(target=lambda: pages.append(pipeline.get()))
+        thread.start()
+        thread.join(0.1)
+        assert thread.is_alive()
+        pipeline.put([1], last=False)
+        thread.join(1)
+        assert not thread.is_alive()
+        assert pages == [[1]]
+
+    def test_fail(self):
+        pipeline = PagePipeline()
+        pipeline.put([1], last=False)
+        pipeline.fail(ValueError('error'))
+        assert pipeline.get() == [1]
+        with pytest.raises(ValueError):
+            pipeline.get()
+
+    def test_close(self):
+        pipeline = PagePipeline()
+        pipeline.put([1], last=False)
+        pipeline.close()
+        assert not pipeline.reserve()
+        assert pipeline.get() is None
+        pipeline.put([2], last=False)
+        assert pipeline.get() is None
+
+
 class TestBaseLinksIterator:
+    @pytest.fixture
+    def executor(self):
+        executor = PageFetchExecutor(max_in_flight=2)
+        yield executor
+        executor.shutdown()
+
     def test_init(self):
         source = ListIterator([1, 2, 3])
         backend = mock.MagicMock()
@@ -175,7 +265,8 @@ class TestBaseLinksIterator:
         assert iterator.cursor == cursor
         assert iterator.iterator == source
         assert iterator.current_value == iterator.get_current_value()
-        assert iterator.semaphore._value == 1
+        assert iterator.pipeline.max_pages == DEFAULT_PREFETCH_PAGES
+        iterator.close()
 
     def test_next(self):
         source = ListIterator([1, 2, 3])
@@ -189,25 +280,123 @@ class TestBaseLinksIterator:
 
     def test_fetch_data(self):
         source = ListIterator([1, 2, 3])
-        iterator = ConcreteBaseLinksIterator(source, cursor=1)
+        iterator = ConcreteBaseLinksIterator(source)
+        iterator.cursor = 1
         iterator.get_fetch_data_kwargs = mock.MagicMock(return_value={})
-        iterator.get_fetch_data = mock.MagicMock(return_value=(0, []))
-        iterator._fetch_data()
+        iterator.get_fetch_data = mock.MagicMock(return_value=(0, [4]))
+        iterator.pipeline = PagePipeline()
+        iterator.executor = mock.MagicMock()
+        assert iterator.pipeline.reserve()
+        BaseLinksIterator._fetch_page(weakref.ref(iterator), iterator.pipeline)
         iterator.get_fetch_data_kwargs.assert_called_once()
         iterator.get_fetch_data.assert_called_once()
+        iterator.executor.submit.assert_not_called()
         assert iterator.cursor == 0
+        assert iterator.pipeline.get() == [4]
+        assert iterator.pipeline.get() is None
 
     def test_refresh_iterator(self):
         source = ListIterator([1, 2, 3])
-        iterator = ConcreteBaseLinksIterator(source, cursor=1)
+        iterator = ConcreteBaseLinksIterator(source)
         iterator.get_current_value = mock.MagicMock(return_value='current_value')
-        iterator._refresh_iterator()
+        iterator._refresh_iterator([4, 5])
 
         iterator.get_current_value.assert_called_once()
-        assert iterator.source.source == ListIterator(list(iterator.buffer_queue)).source
+        assert iterator.source.source == [4, 5]
         assert iterator.iterator == iterator.source
         assert iterator.current_value == 'current_value'
-        assert iterator.buffer_queue == deque()
+
+    def test_pages(self, executor):
+        pages = {1: (2, [3, 4]), 2: (3, []), 3: (None, [5])}
+        iterator = PagedLinksIterator(
+            pages, ListIterator([1, 2]), cursor=1, prefetch_pages=1, executor=executor
+        )
+        assert list(iterator) == [1, 2, 3, 4, 5]
+        assert iterator.cursor is None
+        assert executor.join(1)
+
+    def test_pages_fetched_ahead(self, executor):
+        pages = {cursor: (cursor + 1, [cursor]) for cursor in range(1, 100)}
+        iterator = PagedLinksIterator(
+            pages, ListIterator([0]), cursor=1, prefetch_pages=3, executor=executor
+        )
+        assert next(iterator) == 0
+        assert executor.join(1)
+        assert iterator.fetched == [1, 2, 3]
+        assert len(iterator.pipeline.pages) == 3
+        assert next(iterator) == 1
+        assert executor.join(1)
+        assert iterator.fetched == [1, 2, 3, 4]
+        iterator.close()
+
+    def test_fetch_error(self, executor):
+        pages = {1: (2, [3])}
+        iterator = PagedLinksIterator(pages, ListIterator([1, 2]), cursor=1, executor=executor)
+        assert [next(iterator), next(iterator), next(iterator)] == [1, 2, 3]
+        with pytest.raises(KeyError):
+            next(iterator)
+
+    def test_close(self, executor):
+        pages = {cursor: (cursor + 1, [cursor]) for cursor in range(1, 100)}
+        iterator = PagedLinksIterator(
+            pages, ListIterator([0]), cursor=1, prefetch_pages=2, executor=executor
+        )
+        assert next(iterator) == 0
+        iterator.close()
+        assert executor.join(1)
+        assert len(iterator.fetched) <= 3
+        with pytest.raises(StopIteration):
+            next(iterator)
+
+    def test_abandoned_iterator(self, executor):
+        pages = {cursor: (cursor + 1, [cursor]) for cursor in range(1, 100)}
+        fetched = []
+        iterator = PagedLinksIterator(pages, ListIterator([0]), cursor=1, executor=executor)
+        iterator.fetched = fetched
+        del iterator
+        gc.collect()
+        assert executor.join(1)
+        assert len(fetched) <= DEFAULT_PREFETCH_PAGES
+
+    def test_shared_executor(self, executor):
+        pages = {cursor: (cursor + 1, [cursor]) for cursor in range(1, 20)}
+        pages[20] = (None, [20])
+        iterators = [
+            PagedLinksIterator(pages, ListIterator([0]), cursor=1, executor=executor)
+            for _ in range(10)
+        ]
+        for iterator in iterators:
+            assert list(iterator) == list(range(21))
+        assert len(executor.workers) <= 2
+
+    def test_adaptive_chunk_size(self, executor):
+        pages = {cursor: (cursor + 1, [cursor]) for cursor in range(1, 10)}
+        pages[10] = (None, [10])
+        chunk_sizer = AdaptiveChunkSize(100, max_chunk_size=1000)
+        iterator = PagedLinksIterator(
+            pages,
+            ListIterator([0]),
+            cursor=1,
+            prefetch_pages=1,
+            executor=executor,
+            chunk_sizer=chunk_sizer,
+        )
+        assert list(iterator) == list(range(11))
+        # Every page was fetched after the consumer was done with the previous ones
+        assert chunk_sizer.chunk_size == 1000
+
+    def test_adaptive_chunk_size_early_stop(self, executor):
+        pages = {cursor: (cursor + 1, [cursor]) for cursor in range(1, 100)}
+        chunk_sizer = AdaptiveChunkSize(400, target_latency=10)
+        iterator = PagedLinksIterator(
+            pages, ListIterator([0]), cursor=1, executor=executor, chunk_sizer=chunk_sizer
+        )
+        assert next(iterator) == 0
+        assert executor.join(1)
+        # The first page found the consumer waiting and the second one filled up the pipeline
+        assert chunk_sizer.chunk_size == 400
+        iterator.close()
+        assert chunk_sizer.chunk_size == 200
 
     def test_is_empty(self):
         iterator = ConcreteBaseLinksIterator(ListIterator([1, 2, 3]))
@@ -263,6 +452,18 @@ class TestLocalIncomingLinks:
             'chunk_size': iterator.chunk_size,
         }
 
+    def test_get_fetch_data_kwargs_with_filters(self, backend):
+        iterator = LocalIncomingLinks(
+            ListIterator([1, 2, 3]), backend=backend, link_type='Similarity', cursor_position=0
+        )
+        assert iterator.get_fetch_data_kwargs() == {
+            'handles_only': True,
+            'cursor': iterator.cursor,
+            'chunk_size': iterator.chunk_size,
+            'link_type': 'Similarity',
+            'cursor_position': 0,
+        }
+
     def test_get_fetch_data(self, backend):
         iterator = LocalIncomingLinks(ListIterator([1, 2, 3]), backend=backend)
         kwargs = {'param1': 'value1', 'param2': 'value2'}
@@ -276,13 +477,12 @@ class TestRemoteIncomingLinks:
             [{'handle': 'link1'}, {'handle': 'link2'}, {'handle': 'link3'}, {'handle': 'link4'}]
         )
         iterator = RemoteIncomingLinks(source)
-        iterator.returned_handles = set(['link2', 'link3'])
 
         iterator.get_next_value()
         assert iterator.current_value == {'handle': 'link1'}
 
         iterator.get_next_value()
-        assert iterator.current_value == {'handle': 'link4'}
+        assert iterator.current_value == {'handle': 'link2'}
 
     def test_get_current_value(self):
         source = ListIterator(
@@ -312,20 +512,91 @@ class TestRemoteIncomingLinks:
         iterator = RemoteIncomingLinks(source, atom_handle='atom1', targets_document=True)
         kwargs = iterator.get_fetch_data_kwargs()
         assert kwargs == {
-            'cursor': iterator.cursor,
+            'continuation_token': iterator.cursor,
             'chunk_size': iterator.chunk_size,
             'targets_document': iterator.targets_document,
         }
 
+    def test_get_fetch_data_kwargs_with_filters(self):
+        source = ListIterator([{'handle': 'link1'}])
+        iterator = RemoteIncomingLinks(source, atom_handle='atom1', target_type='Concept')
+        assert iterator.get_fetch_data_kwargs() == {
+            'continuation_token': iterator.cursor,
+            'chunk_size': iterator.chunk_size,
+            'targets_document': False,
+            'target_type': 'Concept',
+        }
+
     def test_get_fetch_data(self):
         backend = mock.MagicMock()
-        backend.get_incoming_links.return_value = (123, [{'handle': 'link1'}, {'handle': 'link2'}])
+        backend.get_incoming_links_page.return_value = (
+            'token2',
+            [{'handle': 'link1'}, {'handle': 'link2'}],
+        )
         source = ListIterator([])
         iterator = RemoteIncomingLinks(source, atom_handle='atom1')
         iterator.backend = backend
-        result = iterator.get_fetch_data(cursor=0, chunk_size=100)
-        assert result == (123, [{'handle': 'link1'}, {'handle': 'link2'}])
-        backend.get_incoming_links.assert_called_once_with('atom1', cursor=0, chunk_size=100)
+        result = iterator.get_fetch_data(continuation_token='token1', chunk_size=100)
+        assert result == ('token2', [{'handle': 'link1'}, {'handle': 'link2'}])
+        backend.get_incoming_links_page.assert_called_once_with(
+            'atom1', continuation_token='token1', chunk_size=100
+        )
+
+    def test_pages(self):
+        pages = {
+            'token1': ('token2', [{'handle': 'link3'}]),
+            'token2': (None, [{'handle': 'link4'}]),
+        }
+        backend = mock.MagicMock()
+        backend.get_incoming_links_page.side_effect = lambda handle, **kwargs: pages[
+            kwargs['continuation_token']
+        ]
+        iterator = RemoteIncomingLinks(
+            ListIterator([{'handle': 'link1'}, {'handle': 'link2'}]),
+            atom_handle='atom1',
+            backend=backend,
+            cursor='token1',
+        )
+        assert [link['handle'] for link in iterator] == ['link1', 'link2', 'link3', 'link4']
+        assert iterator.cursor is None
+
+
+class TestCustomQuery:
+    def test_remote_pages(self):
+        pages = {'token1': (None, [{'handle': 'h3'}])}
+        backend = mock.MagicMock()
+        backend.custom_query_page.side_effect = lambda index_id, query, token, **kwargs: pages[
+            token
+        ]
+        query = [{'field': 'tag', 'value': 'DAS'}]
+        iterator = CustomQuery(
+            ListIterator([{'handle': 'h1'}, {'handle': 'h2'}]),
+            index_id='index1',
+            query=query,
+            backend=backend,
+            is_remote=True,
+            cursor='token1',
+            chunk_size=2,
+        )
+        assert [atom['handle'] for atom in iterator] == ['h1', 'h2', 'h3']
+        backend.custom_query_page.assert_called_once_with('index1', query, 'token1', chunk_size=2)
+
+    def test_local_pages(self):
+        backend = mock.MagicMock()
+        backend.get_atoms_by_index.return_value = (0, [{'handle': 'h2'}])
+        query = [{'field': 'tag', 'value': 'DAS'}]
+        iterator = CustomQuery(
+            ListIterator([{'handle': 'h1'}]),
+            index_id='index1',
+            query=query,
+            backend=backend,
+            cursor=10,
+            chunk_size=1,
+        )
+        assert [atom['handle'] for atom in iterator] == ['h1', 'h2']
+        backend.get_atoms_by_index.assert_called_once_with(
+            'index1', query=query, cursor=10, chunk_size=1
+        )
 
 
 class TestTraverseLinksIterator:
@@ -479,7 +750,7 @@ class TestTraverseNeighborsIterator:
         assert iterator.buffered_answer is not None
         assert iterator.cursor == traverse_links_iterator.cursor
         assert iterator.target_type == traverse_links_iterator.target_type
-        assert iterator.visited_neighbors == ['node12']
+        assert iterator.visited_neighbors == {'node12'}
         assert iterator.iterator == traverse_links_iterator
         assert iterator.current_value == {'handle': 'node12', 'named_type': 'Type2'}
 
@@ -517,6 +788,26 @@ class TestTraverseNeighborsIterator:
         target = {'handle': 'node22', 'named_type': 'Type3'}
         assert iterator._filter(target) is True
 
+    def test_repeated_neighbors(self):
+        links = [
+            ({'handle': f'link{i}'}, [{'handle': 'hub'}, {'handle': f'node{i % 3}'}])
+            for i in range(10)
+        ]
+        source = TraverseLinksIterator(ListIterator(links), targets_only=True, cursor='hub')
+        iterator = TraverseNeighborsIterator(source=source)
+        assert [neighbor['handle'] for neighbor in iterator] == ['node0', 'node1', 'node2']
+
+    def test_visited_capacity(self, traverse_links_iterator):
+        iterator = TraverseNeighborsIterator(source=traverse_links_iterator, visited_capacity=100)
+        assert isinstance(iterator.visited_neighbors, BloomFilter)
+        assert iterator.current_value == {'handle': 'node12', 'named_type': 'Type2'}
+        assert next(iterator) == {'handle': 'node12', 'named_type': 'Type2'}
+        assert next(iterator) == {'handle': 'node22', 'named_type': 'Type3'}
+        assert next(iterator) == {'handle': 'node32', 'named_type': 'Type4'}
+        with pytest.raises(StopIteration):
+            next(iterator)
+        assert 'node22' in iterator.visited_neighbors
+
     def test_is_empty(self):
         iterator = TraverseNeighborsIterator(
             source=TraverseLinksIterator(LocalIncomingLinks(ListIterator([])))
@@ -526,3 +817,25 @@ class TestTraverseNeighborsIterator:
 
         iterator.current_value = {'handle': 1}
         assert iterator.is_empty() is False
+
+
+class TestBloomFilter:
+    def test_add_and_contains(self):
+        bloom_filter = BloomFilter(1000)
+        handles = [f'handle{i}' for i in range(1000)]
+        for handle in handles:
+            bloom_filter.add(handle)
+        assert all(handle in bloom_filter for handle in handles)
+        assert len(bloom_filter) <= 1000
+
+    def test_error_rate(self):
+        bloom_filter = BloomFilter(1000, error_rate=0.01)
+        for i in range(1000):
+            bloom_filter.add(f'handle{i}')
+        false_positives = sum(f'other{i}' in bloom_filter for i in range(10000))
+        assert false_positives < 300
+
+    @pytest.mark.parametrize('capacity,error_rate', [(0, 0.01), (10, 0), (10, 1)])
+    def test_invalid_parameters(self, capacity, error_rate):
+        with pytest.raises(ValueError):
+            BloomFilter(capacity, error_rate)
@@ -1,4 +1,6 @@
+import time
 from typing import Set
+from unittest import mock
 
 import pytest
 from hyperon_das_atomdb.database import NodeT
@@ -131,3 +133,153 @@ class TestCacheController:
         assert broker.handle_count['h7'] == 1
         assert broker.handle_count['h8'] == 1
         assert broker.handle_count['h9'] == 1
+
+
+class TestQueryAnswerCache:
+    query = {
+        'atom_type': 'link',
+        'type': 'Expression',
+        'targets': [
+            {'atom_type': 'node', 'type': 'Symbol', 'name': 'Inheritance'},
+            {'atom_type': 'variable', 'name': 'v1'},
+            {'atom_type': 'node', 'type': 'Symbol', 'name': '"mammal"'},
+        ],
+    }
+
+    def _build_controller(self, **kwargs):
+        params = {'query_cache_enabled': True, 'query_cache_ttl': 60, 'query_cache_max_size': 2}
+        params.update(kwargs)
+        return CacheController(params)
+
+    def test_disabled(self):
+        controller = CacheController({})
+        controller.add_query_answer(self.query, {}, [QueryAnswer({'handle': 'h1'}, None)])
+        assert controller.get_query_answer(self.query, {}) is None
+
+    def test_hit_and_miss(self):
+        controller = self._build_controller()
+        answer = [QueryAnswer({'handle': 'h1'}, None)]
+        assert controller.get_query_answer(self.query, {}) is None
+        controller.add_query_answer(self.query, {'no_iterator': True}, answer)
+        assert controller.get_query_answer(self.query, {}) == answer
+        assert controller.get_query_answer(self.query, {'toplevel_only': True}) is None
+
+    def test_answers_are_copied(self):
+        controller = self._build_controller()
+        answer = [QueryAnswer({'handle': 'h1'}, None)]
+        controller.add_query_answer(self.query, {}, answer)
+        answer[0].subgraph['handle'] = 'h2'
+        controller.get_query_answer(self.query, {})[0].subgraph['handle'] = 'h3'
+        assert controller.get_query_answer(self.query, {}) == [QueryAnswer({'handle': 'h1'}, None)]
+
+    def test_ttl(self):
+        controller = self._build_controller(query_cache_ttl=60)
+        controller.add_query_answer(self.query, {}, [QueryAnswer({'handle': 'h1'}, None)])
+        with mock.patch('time.monotonic', return_value=time.monotonic() + 61):
+            assert controller.get_query_answer(self.query, {}) is None
+
+    def test_max_size(self):
+        controller = self._build_controller()
+        for n in range(3):
+            controller.add_query_answer(self.query, {'n': n}, [])
+        assert controller.get_query_answer(self.query, {'n': 0}) is None
+        assert controller.get_query_answer(self.query, {'n': 1}) == []
+        assert controller.get_query_answer(self.query, {'n': 2}) == []
+
+    def test_invalidate(self):
+        controller = self._build_controller()
+        controller.add_query_answer(self.query, {}, [])
+        controller.invalidate_query_answers()
+        assert controller.get_query_answer(self.query, {}) is None
+
+    def test_unsupported_query(self):
+        controller = self._build_controller()
+        query = {'atom_type': 'node', 'type': 'Symbol', 'name': 'A'}
+        controller.add_query_answer(query, {}, [])
+        assert controller.get_query_answer(query, {}) is None
+
+
+class TestNonexistentHandlesCache:
+    def _build_controller(self, **kwargs):
+        params = {
+            'negative_cache_enabled': True,
+            'negative_cache_ttl': 60,
+            'negative_cache_max_size': 2,
+        }
+        params.update(kwargs)
+        return CacheController(params)
+
+    def test_disabled(self):
+        controller = CacheController({})
+        controller.add_nonexistent_handle('h1')
+        assert not controller.is_nonexistent_handle('h1')
+
+    def test_add_and_check(self):
+        controller = self._build_controller()
+        assert not controller.is_nonexistent_handle('h1')
+        controller.add_nonexistent_handle('h1')
+        assert controller.is_nonexistent_handle('h1')
+
+    def test_ttl(self):
+        controller = self._build_controller()
+        controller.add_nonexistent_handle('h1')
+        with mock.patch('time.monotonic', return_value=time.monotonic() + 61):
+            assert not controller.is_nonexistent_handle('h1')
+
+    def test_max_size(self):
+        controller = self._build_controller()
+        for handle in ['h1', 'h2', 'h3']:
+            controller.add_nonexistent_handle(handle)
+        assert not controller.is_nonexistent_handle('h1')
+        assert controller.is_nonexistent_handle('h2')
+        assert controller.is_nonexistent_handle('h3')
+
+    def test_invalidate(self):
+        controller = self._build_controller()
+        controller.add_nonexistent_handle('h1')
+        controller.invalidate_nonexistent_handles()
+        assert not controller.is_nonexistent_handle('h1')
+
+
+class TestIncomingLinksCache:
+    def _build_controller(self, **kwargs):
+        params = {'traverse_prefetch': True, 'traverse_cache_ttl': 60, 'traverse_cache_max_size': 2}
+        params.update(kwargs)
+        return CacheController(params)
+
+    def test_disabled(self):
+        controller = CacheController({})
+        controller.add_incoming_links('h1', [])
+        assert controller.get_incoming_links('h1') is None
+
+    def test_hit_and_miss(self):
+        controller = self._build_controller()
+        links = [{'handle': 'l1', 'targets_document': [{'handle': 'h1'}, {'handle': 'h2'}]}]
+        assert controller.get_incoming_links('h1') is None
+        controller.add_incoming_links('h1', links)
+        assert controller.get_incoming_links('h1') == links
+        controller.get_incoming_links('h1')[0].pop('targets_document')
+        assert controller.get_incoming_links('h1') == links
+
+    def test_ttl(self):
+        controller = self._build_controller()
+        controller.add_incoming_links('h1', [])
+        with mock.patch('time.monotonic', return_value=time.monotonic() + 61):
+            assert controller.get_incoming_links('h1') is None
+
+    def test_max_size(self):
+        controller = self._build_controller()
+        for handle in ['h1', 'h2', 'h3']:
+            controller.add_incoming_links(handle, [])
+        assert controller.get_incoming_links('h1') is None
+        assert controller.get_incoming_links('h2') == []
+        assert controller.get_incoming_links('h3') == []
+
+    def test_invalidate(self):
+        controller = self._build_controller()
+        version = controller.incoming_links_version
+        controller.add_incoming_links('h1', [])
+        controller.invalidate_incoming_links()
+        assert controller.get_incoming_links('h1') is None
+        controller.add_incoming_links('h1', [], version)
+        assert controller.get_incoming_links('h1') is None
@@ -1,12 +1,21 @@
 import json  # noqa: F401
+from threading import Event
 from unittest.mock import MagicMock, patch
 
 import pytest
+from hyperon_das_atomdb import AtomDoesNotExist
 from requests import exceptions
 
 import hyperon_das.link_filters as link_filter
 from hyperon_das.client import FunctionsClient
-from hyperon_das.exceptions import FunctionsConnectionError, FunctionsTimeoutError, RequestError
+from hyperon_das.exceptions import (
+    CircuitOpenError,
+    FunctionsConnectionError,
+    FunctionsTimeoutError,
+    HTTPError,
+    RequestError,
+)
+from hyperon_das.request_policy import RequestPolicy
 from hyperon_das.utils import serialize
 
 
@@ -40,6 +49,7 @@ class TestFunctionsClient:
             url='http://0.0.0.0:1000/function/query-engine',
             data=serialize(expected_request_data),
             headers={'Content-Type': 'application/octet-stream'},
+            timeout=None,
         )
 
         assert result == expected_response
@@ -64,6 +74,7 @@ class TestFunctionsClient:
             url='http://0.0.0.0:1000/function/query-engine',
             data=serialize(expected_request_data),
             headers={'Content-Type': 'application/octet-stream'},
+            timeout=None,
         )
 
         assert result == expected_response
@@ -108,6 +119,37 @@ class TestFunctionsClient:
             url='http://0.0.0.0:1000/function/query-engine',
             data=serialize(expected_request_data),
             headers={'Content-Type': 'application/octet-stream'},
+            timeout=None,
+        )
+
+        assert result == expected_response
+
+    def test_get_link_handles_success(self, mock_request, client):
+        expected_request_data = {
+            "action": "get_link_handles",
+            "input": {
+                "link_filter": {
+                    "filter_type": link_filter.LinkFilterType.NAMED_TYPE,
+                    "toplevel_only": True,
+                    "link_type": "Inheritance",
+                    "target_types": [],
+                    "targets": [],
+                }
+            },
+        }
+        expected_response = ["ee1c03e6d1f104ccd811cfbba018451a"]
+
+        mock_request.return_value.status_code = 200
+        mock_request.return_value.content = serialize(expected_response)
+
+        result = client.get_link_handles(link_filter.NamedType('Inheritance', toplevel_only=True))
+
+        mock_request.assert_called_with(
+            method='POST',
+            url='http://0.0.0.0:1000/function/query-engine',
+            data=serialize(expected_request_data),
+            headers={'Content-Type': 'application/octet-stream'},
+            timeout=None,
         )
 
         assert result == expected_response
@@ -166,6 +208,7 @@ class TestFunctionsClient:
             url='http://0.0.0.0:1000/function/query-engine',
             data=serialize(expected_request_data),
             headers={'Content-Type': 'application/octet-stream'},
+            timeout=None,
         )
 
         assert result == expected_response
@@ -234,6 +277,7 @@ class TestFunctionsClient:
             url='http://0.0.0.0:1000/function/query-engine',
             data=serialize(expected_request_data),
             headers={'Content-Type': 'application/octet-stream'},
+            timeout=None,
         )
 
     def test_count_atoms_success(self, mock_request, client):
@@ -249,6 +293,7 @@ class TestFunctionsClient:
             url='http://0.0.0.0:1000/function/query-engine',
             data=serialize(expected_request_data),
             headers={'Content-Type': 'application/octet-stream'},
+            timeout=None,
         )
 
         assert result == expected_response
@@ -267,6 +312,7 @@ class TestFunctionsClient:
             url='http://0.0.0.0:1000/function/query-engine',
             data=serialize(expected_request_data),
             headers={'Content-Type': 'application/octet-stream'},
+            timeout=None,
         )
 
         assert result == expected_response
@@ -287,6 +333,7 @@ class TestFunctionsClient:
             url='http://0.0.0.0:1000/function/query-engine',
             data=serialize(expected_request_data),
             headers={'Content-Type': 'application/octet-stream'},
+            timeout=None,
         )
 
         assert result == expected_response
@@ -304,6 +351,7 @@ class TestFunctionsClient:
             url='http://0.0.0.0:1000/function/query-engine',
             data=serialize(expected_request_data),
             headers={'Content-Type': 'application/octet-stream'},
+            timeout=None,
         )
 
         assert result == expected_response
@@ -327,10 +375,140 @@ class TestFunctionsClient:
             url='http://0.0.0.0:1000/function/query-engine',
             data=serialize(expected_request_data),
             headers={'Content-Type': 'application/octet-stream'},
+            timeout=None,
+        )
+
+        assert result == expected_response
+
+    def test_expand(self, mock_request, client):
+        expected_request_data = {
+            "action": "expand",
+            "input": {
+                'handle': 'h1',
+                'depth': 2,
+                'link_type': 'Similarity',
+                'max_nodes': 10,
+                'strategy': 'bfs',
+            },
+        }
+        expected_response = [{'handle': 'h2'}, {'handle': 'h3'}]
+        mock_request.return_value.status_code = 200
+        mock_request.return_value.content = serialize(expected_response)
+        result = client.expand('h1', depth=2, link_type='Similarity', max_nodes=10)
+
+        mock_request.assert_called_once_with(
+            method='POST',
+            url='http://0.0.0.0:1000/function/query-engine',
+            data=serialize(expected_request_data),
+            headers={'Content-Type': 'application/octet-stream'},
+            timeout=None,
+        )
+
+        assert result == expected_response
+
+    def test_get_incoming_links_page(self, mock_request, client):
+        expected_request_data = {
+            "action": "get_incoming_links_page",
+            "input": {
+                'atom_handle': 'h1',
+                'continuation_token': 'token1',
+                'chunk_size': 2,
+                'kwargs': {'link_type': 'Similarity'},
+            },
+        }
+        expected_response = ('token2', [{'handle': 'l1'}, {'handle': 'l2'}])
+        mock_request.return_value.status_code = 200
+        mock_request.return_value.content = serialize(expected_response)
+        result = client.get_incoming_links_page('h1', 'token1', 2, link_type='Similarity')
+
+        mock_request.assert_called_once_with(
+            method='POST',
+            url='http://0.0.0.0:1000/function/query-engine',
+            data=serialize(expected_request_data),
+            headers={'Content-Type': 'application/octet-stream'},
+            timeout=None,
+        )
+
+        assert result == expected_response
+
+    def test_custom_query_page(self, mock_request, client):
+        expected_request_data = {
+            "action": "custom_query_page",
+            "input": {
+                'index_id': 'index1',
+                'query': {'tag': 'DAS'},
+                'chunk_size': 10,
+                'kwargs': {},
+            },
+        }
+        expected_response = (None, [{'handle': 'h1'}])
+        mock_request.return_value.status_code = 200
+        mock_request.return_value.content = serialize(expected_response)
+        result = client.custom_query_page('index1', [{'field': 'tag', 'value': 'DAS'}], None, 10)
+
+        mock_request.assert_called_once_with(
+            method='POST',
+            url='http://0.0.0.0:1000/function/query-engine',
+            data=serialize(expected_request_data),
+            headers={'Content-Type': 'application/octet-stream'},
+            timeout=None,
         )
 
         assert result == expected_response
 
+    def test_batch(self, mock_request, client):
+        expected_request_data = {
+            "action": "batch",
+            "input": {
+                "operations": [
+                    {"action": "get_atom", "input": {"handle": "h1"}},
+                    {
+                        "action": "get_incoming_links",
+                        "input": {"atom_handle": "h2", "kwargs": {"handles_only": True}},
+                    },
+                ]
+            },
+        }
+        expected_response = [
+            {'error': 'Nonexistent atom', 'status_code': 404},
+            {'result': ['l1', 'l2']},
+        ]
+        mock_request.return_value.status_code = 200
+        mock_request.return_value.content = serialize(expected_response)
+        operations = [
+            client.get_atom_operation('h1'),
+            client.get_incoming_links_operation('h2', handles_only=True),
+        ]
+        result = client.batch(operations)
+
+        mock_request.assert_called_once_with(
+            method='POST',
+            url='http://0.0.0.0:1000/function/query-engine',
+            data=serialize(expected_request_data),
+            headers={'Content-Type': 'application/octet-stream'},
+            timeout=None,
+        )
+
+        assert result == expected_response
+        with pytest.raises(AtomDoesNotExist):
+            client.batch_result(operations[0], result[0])
+        assert client.batch_result(operations[1], result[1]) == ['l1', 'l2']
+
+    def test_batch_result_errors(self, client):
+        links_operation = client.get_links_operation(link_filter.NamedType('Inheritance'))
+        with pytest.raises(ValueError):
+            client.batch_result(links_operation, {'error': 'Invalid filter', 'status_code': 400})
+        incoming_operation = client.get_incoming_links_operation('h1')
+        assert client.batch_result(incoming_operation, {'error': 'Error', 'status_code': 500}) == []
+        with pytest.raises(HTTPError):
+            client.batch_result(
+                client.get_atom_operation('h1'), {'error': 'Error', 'status_code': 500}
+            )
+
+    def test_batch_unsupported_action(self, client):
+        with pytest.raises(ValueError):
+            client.batch([{'action': 'query', 'input': {'query': {}}}])
+
     def test_send_request_success(self, mock_request, client):
         payload = {"action": "get_atom", "input": {"handle": "123"}}
         expected_response = {
@@ -350,6 +528,7 @@ class TestFunctionsClient:
             url='http://0.0.0.0:1000/function/query-engine',
             data=serialize(payload),
             headers={'Content-Type': 'application/octet-stream'},
+            timeout=None,
         )
 
         assert result == expected_response
@@ -378,6 +557,96 @@ class TestFunctionsClient:
         with pytest.raises(RequestError):
             client._send_request(payload)
 
+    def test_send_request_retries_idempotent_actions(self, mock_request, client):
+        response = MagicMock(status_code=200, content=serialize({'handle': '123'}))
+        mock_request.side_effect = [exceptions.ConnectionError(), exceptions.Timeout(), response]
+
+        result = client._send_request({"action": "get_atom", "input": {"handle": "123"}})
+
+        assert result == {'handle': '123'}
+        assert mock_request.call_count == 3
+
+    def test_send_request_retries_transient_status(self, mock_request, client):
+        unavailable = MagicMock(status_code=503)
+        response = MagicMock(status_code=200, content=serialize(10))
+        mock_request.side_effect = [unavailable, response]
+
+        assert client._send_request({"action": "count_atoms", "input": {}}) == 10
+        assert mock_request.call_count == 2
+
+    def test_send_request_does_not_retry_updates(self, mock_request, client):
+        mock_request.side_effect = exceptions.ConnectionError()
+
+        with pytest.raises(FunctionsConnectionError):
+            client._send_request({"action": "commit_changes", "input": {}})
+        assert mock_request.call_count == 1
+
+    def test_send_request_circuit_breaker(self, mock_request):
+        with patch('hyperon_das.utils.check_server_connection', return_value=(200, 'OK')):
+            client = FunctionsClient(
+                host='0.0.0.0',
+                port=1000,
+                request_policy=RequestPolicy(max_retries=0, circuit_breaker_threshold=2),
+            )
+        mock_request.side_effect = exceptions.ConnectionError()
+        payload = {"action": "get_atom", "input": {"handle": "123"}}
+        for _ in range(2):
+            with pytest.raises(FunctionsConnectionError):
+                client._send_request(payload)
+
+        with pytest.raises(CircuitOpenError):
+            client._send_request(payload)
+        assert mock_request.call_count == 2
+
+    def test_send_request_circuit_breaker_trial_error(self, mock_request):
+        with patch('hyperon_das.utils.check_server_connection', return_value=(200, 'OK')):
+            client = FunctionsClient(
+                host='0.0.0.0',
+                port=1000,
+                request_policy=RequestPolicy(max_retries=0, circuit_breaker_threshold=1),
+            )
+        payload = {"action": "get_atom", "input": {"handle": "123"}}
+        with patch('hyperon_das.request_policy.time.monotonic', return_value=100):
+            mock_request.side_effect = exceptions.ConnectionError()
+            with pytest.raises(FunctionsConnectionError):
+                client._send_request(payload)
+        with patch('hyperon_das.request_policy.time.monotonic', return_value=200):
+            # The trial request fails with an error which doesn't count as a failure
+            mock_request.side_effect = exceptions.InvalidURL()
+            with pytest.raises(RequestError):
+                client._send_request(payload)
+            assert not client.circuit_breaker.trial_in_flight
+            mock_request.side_effect = None
+            mock_request.return_value = MagicMock(status_code=200, content=serialize('atom'))
+            assert client._send_request(payload) == 'atom'
+
+    def test_send_request_hedging(self, mock_request):
+        with patch('hyperon_das.utils.check_server_connection', return_value=(200, 'OK')):
+            client = FunctionsClient(
+                host='0.0.0.0', port=1000, request_policy=RequestPolicy(hedge_delay=0.05)
+            )
+        release = Event()
+        slow_response = MagicMock(status_code=200, content=serialize('slow'))
+        fast_response = MagicMock(status_code=200, content=serialize('fast'))
+
+        def request(**kwargs):
+            if mock_request.call_count == 1:
+                release.wait(5)
+                return slow_response
+            return fast_response
+
+        mock_request.side_effect = request
+
+        assert client._send_request({"action": "get_atom", "input": {"handle": "123"}}) == 'fast'
+        assert mock_request.call_count == 2
+        release.set()
+
+        executor = client._hedge_executor
+        client.close()
+        assert client._hedge_executor is None
+        assert executor._shutdown
+        client.close()
+
     @pytest.mark.parametrize(
         "host, port, should_raise, expected_message",
         [
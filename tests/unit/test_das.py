@@ -1,13 +1,17 @@
+import io
 from unittest import mock
 
 import pytest
+from hyperon_das_atomdb import AtomDoesNotExist
 from hyperon_das_atomdb.adapters import InMemoryDB
 from hyperon_das_atomdb.database import LinkT, NodeT
 from hyperon_das_atomdb.exceptions import InvalidAtomDB
 from hyperon_das_atomdb.utils.expression_hasher import ExpressionHasher
 
+import hyperon_das.link_filters as link_filters
+from hyperon_das.client import FunctionsClient
 from hyperon_das.das import DistributedAtomSpace, LocalQueryEngine, RemoteQueryEngine
-from hyperon_das.exceptions import GetTraversalCursorException, InvalidQueryEngine
+from hyperon_das.exceptions import GetTraversalCursorException, HTTPError, InvalidQueryEngine
 from hyperon_das.traverse_engines import TraverseEngine
 from tests.unit.fixtures import das_local_redis_mongo_engine, das_remote_ram_engine  # noqa: F401
 from tests.utils import load_animals_base
@@ -84,6 +88,201 @@ class TestDistributedAtomSpace:
             "['Inheritance', '<Concept: ent>', '<Concept: snet>']",
         }
 
+    def test_get_incoming_links_with_filters(self):
+        das = DistributedAtomSpace()
+        load_animals_base(das)
+        human = das.compute_node_handle('Concept', 'human')
+
+        def link_names(links):
+            return {
+                (link.named_type, *[das.get_atom(target).name for target in link.targets])
+                for link in links
+            }
+
+        assert link_names(das.get_incoming_links(human, link_type='Inheritance')) == {
+            ('Inheritance', 'human', 'mammal')
+        }
+        assert link_names(
+            das.get_incoming_links(human, link_type='Similarity', cursor_position=1)
+        ) == {
+            ('Similarity', 'chimp', 'human'),
+            ('Similarity', 'monkey', 'human'),
+            ('Similarity', 'ent', 'human'),
+        }
+        assert das.get_incoming_links(human, cursor_position=2) == []
+        assert len(das.get_incoming_links(human, target_type='Concept', handles_only=True)) == 7
+        assert das.get_incoming_links(human, target_type='Fake') == []
+
+        with mock.patch.object(das.backend, 'get_atom', wraps=das.backend.get_atom) as get_atom:
+            das.get_incoming_links(human, link_type='Inheritance', targets_document=True)
+        with_targets = [c for c in get_atom.call_args_list if c.kwargs.get('targets_document')]
+        assert len(with_targets) == 1
+
+    def test_get_incoming_links_page(self):
+        das = DistributedAtomSpace()
+        load_animals_base(das)
+        human = das.compute_node_handle('Concept', 'human')
+        all_links = sorted(das.get_incoming_links(human, handles_only=True))
+
+        handles = []
+        tokens = []
+        token = None
+        engine = das.query_engine
+        with mock.patch.object(
+            engine, 'get_incoming_links', wraps=engine.get_incoming_links
+        ) as get_incoming_links:
+            while True:
+                token, links = das.get_incoming_links_page(human, token, chunk_size=3)
+                handles.extend(link.handle for link in links)
+                if token is None:
+                    break
+                tokens.append(token)
+        # Following pages come from a snapshot of the links taken with the first one
+        get_incoming_links.assert_called_once()
+        assert handles == all_links
+        assert len(tokens) == 2
+
+        # A page can be requested again (e.g. to retry a failed request)
+        for _ in range(2):
+            assert das.get_incoming_links_page(
+                human, tokens[0], chunk_size=3, handles_only=True
+            ) == (tokens[1], all_links[3:6])
+
+        with pytest.raises(ValueError):
+            das.get_incoming_links_page(human, 'invalid token')
+        with pytest.raises(ValueError):
+            das.get_incoming_links_page(human, tokens[0], link_type='Similarity')
+
+    def test_custom_query_page_scans_index_once(self):
+        das = DistributedAtomSpace()
+        engine = das.query_engine
+        documents = [{'handle': f'{i:02x}'} for i in range(7)]
+        index_pages = {0: (3, documents[3:][::-1]), 3: (0, documents[:3])}
+        with mock.patch.object(
+            engine.local_backend,
+            'get_atoms_by_index',
+            side_effect=lambda index_id, query, cursor, chunk_size: index_pages[cursor],
+            create=True,
+        ) as get_atoms_by_index:
+            token, atoms = engine.custom_query_page('index_id', [], chunk_size=3)
+            while token is not None:
+                token, page = engine.custom_query_page('index_id', [], token, chunk_size=3)
+                atoms.extend(page)
+        assert atoms == documents
+        # The index is scanned with the first page only
+        assert get_atoms_by_index.call_count == 2
+
+    def test_remote_custom_query_cursor(self, das_mock_remote):
+        query = {'tag': 'DAS'}
+        remote_das = das_mock_remote.query_engine.remote_das
+        with mock.patch.object(
+            remote_das, 'custom_query_page', return_value=(None, [])
+        ) as custom_query_page:
+            das_mock_remote.custom_query('index_id', query, cursor=0)
+            das_mock_remote.custom_query('index_id', query, cursor='token')
+            with pytest.raises(ValueError):
+                das_mock_remote.custom_query('index_id', query, cursor=10)
+            with pytest.raises(ValueError):
+                das_mock_remote.custom_query(
+                    'index_id', query, cursor='token', continuation_token='other'
+                )
+        assert [c.args[2] for c in custom_query_page.call_args_list] == [None, 'token']
+
+    def test_sharded_remote_das(self):
+        with mock.patch('hyperon_das.utils.check_server_connection', return_value=(200, 'OK')):
+            das = DistributedAtomSpace(query_engine='remote', shards=[('host1', 1), ('host2', 2)])
+        with mock.patch(
+            'hyperon_das.client.FunctionsClient.custom_query_page', return_value=(None, [])
+        ) as custom_query_page:
+            das.custom_query('index_id', {'tag': 'DAS'})
+        assert custom_query_page.call_count == 2
+        with pytest.raises(NotImplementedError):
+            das.expand('h1')
+        with mock.patch(
+            'hyperon_das.client.FunctionsClient.query', return_value=[{'handle': 'l1'}]
+        ):
+            # Answers of all shards are collected even though the query cache is disabled
+            assert das.query({'atom_type': 'link'}) == [{'handle': 'l1'}, {'handle': 'l1'}]
+
+    def test_remote_pages_without_page_actions(self, das_mock_remote):
+        engine = das_mock_remote.query_engine
+        documents = [{'handle': f'{i:02x}'} for i in range(5)]
+        with mock.patch.object(
+            engine.remote_das, 'get_incoming_links_page', side_effect=ValueError('Unknown action')
+        ) as get_incoming_links_page, mock.patch.object(
+            engine.remote_das, 'get_incoming_links', return_value=documents[::-1]
+        ) as get_incoming_links:
+            links = []
+            for _ in range(2):
+                token, links = das_mock_remote.get_incoming_links_page('h1', chunk_size=2)
+                while token is not None:
+                    token, page = das_mock_remote.get_incoming_links_page('h1', token, chunk_size=2)
+                    links.extend(page)
+                assert links == documents
+            with pytest.raises(ValueError):
+                das_mock_remote.get_incoming_links_page('h1', 'invalid token')
+        # The page action isn't sent again and the links are requested once per scan
+        get_incoming_links_page.assert_called_once()
+        assert get_incoming_links.call_count == 2
+
+        with mock.patch.object(
+            engine.remote_das, 'custom_query_page', side_effect=HTTPError('Error', status_code=503)
+        ), mock.patch.object(engine.remote_das, 'custom_query') as custom_query:
+            with pytest.raises(HTTPError):
+                das_mock_remote.custom_query('index_id', {'tag': 'DAS'})
+        # Transient errors aren't taken as a missing action
+        custom_query.assert_not_called()
+
+    def test_batch(self):
+        das = DistributedAtomSpace()
+        load_animals_base(das)
+        human = das.compute_node_handle('Concept', 'human')
+        entries = das.batch(
+            [
+                FunctionsClient.get_atom_operation(human),
+                FunctionsClient.get_atom_operation('nonexistent'),
+                FunctionsClient.get_links_operation(link_filters.NamedType('Inheritance')),
+                FunctionsClient.get_incoming_links_operation(human, handles_only=True),
+                {'action': 'query', 'input': {}},
+            ]
+        )
+        assert entries[0] == {'result': das.get_atom(human)}
+        assert entries[1]['status_code'] == 404
+        assert entries[2] == {'result': das.get_links(link_filters.NamedType('Inheritance'))}
+        assert sorted(entries[3]['result']) == sorted(
+            das.get_incoming_links(human, handles_only=True)
+        )
+        assert entries[4]['status_code'] == 400
+
+    def test_page_fetch_executor(self):
+        das = DistributedAtomSpace({'page_fetch_max_in_flight': 3})
+        assert das.page_fetch_executor.max_in_flight == 3
+        assert das.query_engine.page_fetch_executor is das.page_fetch_executor
+
+    def test_close_write_behind(self):
+        das = DistributedAtomSpace({'write_behind': True, 'write_behind_max_age': 60})
+        das.add_node(NodeT(type='Concept', name='human'))
+        with mock.patch.object(das, 'commit_changes') as commit_changes:
+            das.close()
+            commit_changes.assert_called_once_with()
+        assert not das._write_behind.thread.is_alive()
+        das.close()
+
+    def test_close_remote(self):
+        with mock.patch('hyperon_das.utils.check_server_connection', return_value=(200, 'OK')):
+            das = DistributedAtomSpace(
+                query_engine='remote',
+                endpoints=[('host1', 1), ('host2', 2)],
+                system_parameters={'request_batch_window': 0.01},
+            )
+        remote_das = das.query_engine.remote_das
+        with mock.patch.object(remote_das, 'close') as close, mock.patch.object(
+            das.query_engine.request_batcher, 'close'
+        ) as close_batcher:
+            das.close()
+        close.assert_called_once_with()
+        close_batcher.assert_called_once_with()
+
     def test_get_traversal_cursor(self):
         das = DistributedAtomSpace()
         das.add_node(NodeT(type='Concept', name='human'))
@@ -98,6 +297,62 @@ class TestDistributedAtomSpace:
 
         assert exc.value.message == 'Cannot start Traversal. Atom does not exist'
 
+    def test_get_traversal_cursor_with_prefetch(self):
+        das = DistributedAtomSpace({'traverse_prefetch': True})
+        load_animals_base(das)
+        human = das.compute_node_handle('Concept', 'human')
+
+        cursor = das.get_traversal_cursor(human)
+
+        prefetcher = das._traverse_prefetcher
+        assert cursor._prefetcher is prefetcher
+        assert prefetcher.join(timeout=5)
+        # The incoming links of the cursor and of its neighbors are cached
+        assert prefetcher.get_incoming_links(human)
+        for link in das.get_incoming_links(human):
+            for target in link.targets:
+                assert das.cache_controller.get_incoming_links(target) is not None
+
+        das.close()
+        assert prefetcher.closed
+        assert prefetcher.executor._shutdown
+        das.get_traversal_cursor(human)
+        assert prefetcher.in_flight == {}
+
+    def test_expand(self):
+        das = DistributedAtomSpace()
+        load_animals_base(das)
+        human = das.compute_node_handle('Concept', 'human')
+
+        def names(atoms):
+            return [atom.name for atom in atoms]
+
+        assert sorted(names(das.expand(human))) == ['chimp', 'ent', 'mammal', 'monkey']
+        assert sorted(names(das.expand(human, link_type='Similarity', depth=3))) == [
+            'chimp',
+            'ent',
+            'monkey',
+        ]
+        inheritance = names(das.expand(human, depth=2, link_type='Inheritance'))
+        assert inheritance[0] == 'mammal'
+        assert sorted(inheritance[1:]) == ['animal', 'chimp', 'monkey', 'rhino']
+        bfs = names(das.expand(human, depth=3, link_type='Inheritance'))
+        dfs = names(das.expand(human, depth=3, link_type='Inheritance', strategy='dfs'))
+        assert sorted(bfs) == sorted(dfs)
+        assert {'reptile', 'earthworm'} <= set(bfs)
+        assert len(list(das.expand(human, depth=3, max_nodes=2))) == 2
+        assert list(das.expand(human, depth=0)) == []
+        with pytest.raises(ValueError):
+            das.expand(human, strategy='random')
+
+    def test_expand_on_server(self):
+        das = DistributedAtomSpace(system_parameters={'running_on_server': True})
+        load_animals_base(das)
+        human = das.compute_node_handle('Concept', 'human')
+        atoms = das.expand(human, link_type='Similarity')
+        assert isinstance(atoms, list)
+        assert sorted(atom.name for atom in atoms) == ['chimp', 'ent', 'monkey']
+
     def test_get_atom(self):
         das = DistributedAtomSpace()
         das.add_link(
@@ -217,3 +472,259 @@ class TestDistributedAtomSpace:
             das = DistributedAtomSpace(query_engine='remote', host='localhost', port=123)
             atom_count = das.count_atoms({'context': 'both'})
             assert atom_count == {'link_count': 26, 'node_count': 24, 'atom_count': 40}
+
+    def test_query_answer_cache(self):
+        query = {
+            'atom_type': 'link',
+            'type': 'Expression',
+            'targets': [
+                {'atom_type': 'node', 'type': 'Symbol', 'name': 'Inheritance'},
+                {'atom_type': 'variable', 'name': 'v1'},
+                {'atom_type': 'node', 'type': 'Symbol', 'name': '"mammal"'},
+            ],
+        }
+        with mock.patch('hyperon_das.utils.check_server_connection', return_value=(200, 'OK')):
+            das = DistributedAtomSpace(
+                {'query_cache_enabled': True}, query_engine='remote', host='0.0.0.0', port=1234
+            )
+        with mock.patch(
+            'hyperon_das.client.FunctionsClient.query', return_value=['answer']
+        ) as remote_query:
+            assert das.query(query) == ['answer']
+            assert das.query(query) == ['answer']
+            assert remote_query.call_count == 1
+            das.add_node(NodeT(type='Symbol', name='A'))
+            assert das.query(query) == ['answer']
+            assert remote_query.call_count == 2
+
+    def test_remote_fetch_from_another_server(self):
+        with mock.patch('hyperon_das.utils.check_server_connection', return_value=(200, 'OK')):
+            das = DistributedAtomSpace(
+                {'request_timeout': 5, 'handshake_cache_ttl': 10},
+                query_engine='remote',
+                host='0.0.0.0',
+                port=1234,
+            )
+        with mock.patch(
+            'hyperon_das.query_engines.local_query_engine.FunctionsClient'
+        ) as functions_client:
+            functions_client.return_value.fetch.return_value = ['atom']
+            assert das.fetch({'atom_type': 'node'}, host='host', port=2) == ['atom']
+        args, kwargs = functions_client.call_args
+        assert args == ('host', 2)
+        assert kwargs['request_policy'].timeout == 5
+        assert kwargs['handshake_cache_ttl'] == 10
+
+    def test_nonexistent_handles_cache(self):
+        with mock.patch('hyperon_das.utils.check_server_connection', return_value=(200, 'OK')):
+            das = DistributedAtomSpace(
+                {'negative_cache_enabled': True},
+                query_engine='remote',
+                host='0.0.0.0',
+                port=1234,
+                mode='read-write',
+            )
+        with mock.patch(
+            'hyperon_das.client.FunctionsClient.get_atom',
+            side_effect=AtomDoesNotExist('Nonexistent atom'),
+        ) as remote_get_atom:
+            for _ in range(3):
+                with pytest.raises(AtomDoesNotExist):
+                    das.get_atom('snet')
+            assert remote_get_atom.call_count == 1
+            with mock.patch('hyperon_das.client.FunctionsClient.commit_changes'):
+                das.commit_changes()
+            with pytest.raises(AtomDoesNotExist):
+                das.get_atom('snet')
+            assert remote_get_atom.call_count == 2
+
+    def test_commit_changes_sends_only_added_atoms(self):
+        with mock.patch('hyperon_das.utils.check_server_connection', return_value=(200, 'OK')):
+            das = DistributedAtomSpace(
+                {'commit_chunk_size': 2},
+                query_engine='remote',
+                host='0.0.0.0',
+                port=1234,
+                mode='read-write',
+            )
+        das.add_link(
+            LinkT(
+                type='Similarity',
+                targets=[NodeT(type='Concept', name='human'), NodeT(type='Concept', name='monkey')],
+            )
+        )
+        with mock.patch('hyperon_das.client.FunctionsClient.commit_changes') as commit_changes:
+            das.commit_changes()
+            buffers = [c.kwargs['buffer'] for c in commit_changes.call_args_list if c.kwargs]
+            assert [len(buffer) for buffer in buffers] == [2, 1]
+            commit_changes.reset_mock()
+            das.commit_changes()
+            commit_changes.assert_called_once_with()
+
+    def test_add_nodes(self):
+        das = DistributedAtomSpace()
+        names = ['human', 'monkey', 'chimp', 'human']
+        count = das.add_nodes((NodeT(type='Concept', name=name) for name in names), batch_size=3)
+        assert count == 4
+        for name in set(names):
+            assert das.get_node('Concept', name).name == name
+        assert das.count_atoms({'precise': True})['node_count'] == 3
+
+    def test_add_links(self):
+        das = DistributedAtomSpace()
+        human = NodeT(type='Concept', name='human')
+        mammal = LinkT(type='Set', targets=[NodeT(type='Concept', name='mammal'), human])
+        links = [
+            LinkT(type='Similarity', targets=[human, NodeT(type='Concept', name=name)])
+            for name in ['monkey', 'chimp', 'monkey']
+        ]
+        links.append(LinkT(type='Inheritance', targets=[human, mammal]))
+        with mock.patch.object(das.backend, 'bulk_insert', wraps=das.backend.bulk_insert) as bulk:
+            assert das.add_links(links) == 3
+        bulk.assert_called_once()
+        assert len(bulk.call_args.args[0]) == 8
+        human_handle = das.compute_node_handle('Concept', 'human')
+        mammal_handle = das.compute_link_handle(
+            'Set', [das.compute_node_handle('Concept', 'mammal'), human_handle]
+        )
+        for name in ['monkey', 'chimp']:
+            targets = [human_handle, das.compute_node_handle('Concept', name)]
+            assert das.get_link('Similarity', targets).named_type == 'Similarity'
+        link = das.get_link('Inheritance', [human_handle, mammal_handle])
+        assert link.named_type == 'Inheritance'
+
+    def test_add_links_builds_documents_as_add_link(self):
+        def documents(das):
+            return {
+                handle: {
+                    field: getattr(das.get_atom(handle), field, None)
+                    for field in [
+                        'handle',
+                        'named_type',
+                        'composite_type',
+                        'composite_type_hash',
+                        'named_type_hash',
+                        'targets',
+                        'is_toplevel',
+                    ]
+                }
+                for handle in handles
+            }
+
+        def build_link():
+            human = NodeT(type='Concept', name='human')
+            mammal = LinkT(type='Set', targets=[NodeT(type='Concept', name='mammal'), human])
+            return LinkT(type='Inheritance', targets=[human, mammal])
+
+        das = DistributedAtomSpace()
+        link = das.add_link(build_link())
+        handles = [link.handle, *link.targets]
+        bulk_das = DistributedAtomSpace()
+        bulk_das.add_links([build_link()])
+        assert documents(bulk_das) == documents(das)
+
+    def test_load_metta(self, tmp_path):
+        das = DistributedAtomSpace()
+        path = tmp_path / 'animals.metta'
+        path.write_text(
+            '; animals\n(: "human" Concept)\n!(match &self $x $x)\n'
+            '(Similarity\n    "human"\n    (Concept "monkey"))\n'
+        )
+        assert das.load_metta(path)['expressions'] == 2
+        assert das.load_metta(io.StringIO('(Similarity "human" "chimp")'))['expressions'] == 1
+        symbol = lambda name: das.compute_node_handle('Symbol', name)  # noqa: E731
+        concept = das.compute_link_handle('Expression', [symbol('Concept'), symbol('"monkey"')])
+        for targets in [
+            [symbol(':'), symbol('"human"'), symbol('Concept')],
+            [symbol('Similarity'), symbol('"human"'), concept],
+            [symbol('Similarity'), symbol('"human"'), symbol('"chimp"')],
+        ]:
+            assert das.get_link('Expression', targets).named_type == 'Expression'
+        assert das.count_atoms()['link_count'] == 4
+
+    def test_paged_fetch(self):
+        server = DistributedAtomSpace(system_parameters={'running_on_server': True})
+        load_animals_base(server)
+        das = DistributedAtomSpace()
+
+        def fetch_page(query, cursor, page_size, handle_range, host, port):
+            return server.fetch_page(query, cursor, page_size, handle_range)
+
+        progress_callback = mock.Mock()
+        with mock.patch.object(das.query_engine, 'fetch_page', side_effect=fetch_page):
+            progress = das.fetch(
+                host='localhost',
+                port=8080,
+                page_size=5,
+                partitions=3,
+                progress_callback=progress_callback,
+            )
+        assert progress.done
+        assert progress.atoms == server.count_atoms()['atom_count']
+        assert progress_callback.call_count == progress.pages
+        assert das.count_atoms() == server.count_atoms()
+
+    def test_fetch_page_scans_atoms_once(self):
+        server = DistributedAtomSpace(system_parameters={'running_on_server': True})
+        load_animals_base(server)
+        engine = server.query_engine
+        with mock.patch.object(engine, '_fetch_atoms', wraps=engine._fetch_atoms) as fetch_atoms:
+            cursor, atoms = server.fetch_page(page_size=4)
+            while cursor is not None:
+                cursor, page = server.fetch_page(cursor=cursor, page_size=4)
+                atoms.extend(page)
+        fetch_atoms.assert_called_once()
+        handles = [atom.handle for atom in atoms]
+        assert handles == sorted(handles)
+        assert len(handles) == server.count_atoms()['atom_count']
+
+    def test_fetch_on_server_returns_unique_atoms(self):
+        server = DistributedAtomSpace(system_parameters={'running_on_server': True})
+        load_animals_base(server)
+        human = NodeT(type='Concept', name='human')
+        shared = LinkT(type='Similarity', targets=[human, NodeT(type='Concept', name='monkey')])
+        for name in ['chimp', 'ent']:
+            server.add_link(
+                LinkT(type='Evaluation', targets=[shared, NodeT(type='Concept', name=name)])
+            )
+        query = {
+            'atom_type': 'link',
+            'type': 'Evaluation',
+            'targets': [
+                {'atom_type': 'variable', 'name': 'v1'},
+                {'atom_type': 'variable', 'name': 'v2'},
+            ],
+        }
+        handles = [atom.handle for atom in server.fetch(query)]
+        node = server.compute_node_handle
+        shared_handle = server.compute_link_handle(
+            'Similarity', [node('Concept', 'human'), node('Concept', 'monkey')]
+        )
+        assert len(handles) == len(set(handles))
+        assert set(handles) == {
+            server.compute_link_handle('Evaluation', [shared_handle, node('Concept', 'chimp')]),
+            server.compute_link_handle('Evaluation', [shared_handle, node('Concept', 'ent')]),
+            shared_handle,
+            node('Concept', 'human'),
+            node('Concept', 'monkey'),
+            node('Concept', 'chimp'),
+            node('Concept', 'ent'),
+        }
+
+    def test_delta_fetch(self):
+        server = DistributedAtomSpace(system_parameters={'running_on_server': True})
+        load_animals_base(server)
+        das = DistributedAtomSpace()
+
+        def fetch_delta(query, marks, host, port):
+            return server.fetch_delta(query, marks)
+
+        with mock.patch.object(das.query_engine, 'fetch_delta', side_effect=fetch_delta):
+            documents = das.fetch(host='localhost', port=8080, delta=True)
+            assert len(documents) == server.count_atoms()['atom_count']
+            assert das.fetch(host='localhost', port=8080, delta=True) == []
+            server.add_node(NodeT(type='Concept', name='cat'))
+            documents = das.fetch(host='localhost', port=8080, delta=True)
+            assert das.compute_node_handle('Concept', 'cat') in [atom.handle for atom in documents]
+            assert len(documents) < server.count_atoms()['atom_count']
+        assert das.count_atoms() == server.count_atoms()
@@ -0,0 +1,27 @@
+from unittest import mock
+
+from hyperon_das.delta_fetch import delta_atoms
+
+
+def _atom(handle: str, **custom_attributes) -> mock.Mock:
+    return mock.Mock(handle=handle, custom_attributes=custom_attributes)
+
+
+class TestDeltaAtoms:
+    def test_delta_atoms(self):
+        atoms = [_atom('aaa1'), _atom('aaa2'), _atom('bbb1'), _atom('ccc1')]
+        marks, changed = delta_atoms(atoms, {})
+        assert changed == atoms
+        assert set(marks) == {'aaa', 'bbb', 'ccc'}
+
+        assert delta_atoms(reversed(atoms), marks) == (marks, [])
+
+        atoms.append(_atom('bbb2'))
+        new_marks, changed = delta_atoms(atoms, marks)
+        assert [atom.handle for atom in changed] == ['bbb1', 'bbb2']
+        assert new_marks['aaa'] == marks['aaa'] and new_marks['bbb'] != marks['bbb']
+
+    def test_delta_atoms_changed_custom_attributes(self):
+        marks, _ = delta_atoms([_atom('aaa1', weight=1), _atom('bbb1')], {})
+        _, changed = delta_atoms([_atom('aaa1', weight=2), _atom('bbb1')], marks)
+        assert [atom.handle for atom in changed] == ['aaa1']
@@ -3,6 +3,7 @@ import unittest
 import pytest
 
 from hyperon_das.tokenizers.dict_query_tokenizer import DictQueryTokenizer
+from hyperon_das.tokenizers.elements import TOKENS_DELIMITER
 
 
 class TestDictQueryTokenizer(unittest.TestCase):
@@ -244,6 +245,33 @@ class TestDictQueryTokenizer(unittest.TestCase):
         }
         assert DictQueryTokenizer.untokenize(tokens) == expected_query
 
+    def test_untokenize_invalid_link(self):
+        tokens = "AND 2 LINK Expression 2 NODE Symbol N1 VARIABLE V1 NOT NODE Symbol N2"
+        with pytest.raises(ValueError, match="Non-template link with variables"):
+            DictQueryTokenizer.untokenize(tokens)
+        tokens = "LINK_TEMPLATE Expression 2 NODE Symbol N1 NODE Symbol N2"
+        with pytest.raises(ValueError, match="Template link without variables"):
+            DictQueryTokenizer.untokenize(tokens)
+        tokens = "LINK_TEMPLATE Expression 1 VARIABLE V1"
+        with pytest.raises(ValueError, match="Link requires at least two targets"):
+            DictQueryTokenizer.untokenize(tokens)
+        tokens = "OR 1 LINK_TEMPLATE Expression 2 NODE Symbol N1 VARIABLE V1"
+        with pytest.raises(ValueError, match="OR operator requires at least two operands"):
+            DictQueryTokenizer.untokenize(tokens)
+
+    def test_untokenize_deeply_nested_query(self):
+        depth = 5000
+        tokens = TOKENS_DELIMITER.join(
+            ["NOT"]
+            + ["LINK Expression 2 NODE Symbol N"] * (depth - 1)
+            + ["LINK_TEMPLATE Expression 2 NODE Symbol N VARIABLE V"]
+        )
+        query = DictQueryTokenizer.untokenize(tokens)["not"]
+        for _ in range(depth - 1):
+            assert query["targets"][0] == {"atom_type": "node", "type": "Symbol", "name": "N"}
+            query = query["targets"][1]
+        assert query["targets"][1] == {"atom_type": "variable", "name": "V"}
+
 
 if __name__ == "__main__":
     unittest.main()
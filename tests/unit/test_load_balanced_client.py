@@ -0,0 +1,167 @@
+import time
+from unittest import mock
+
+import pytest
+
+from hyperon_das.exceptions import FunctionsConnectionError, HTTPError
+from hyperon_das.load_balanced_client import LoadBalancedClient
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class TestLoadBalancedClient:
+    @pytest.fixture
+    def clients(self):
+        return {
+            ('host1', 1): mock.Mock(url='http://host1:1/function/query-engine'),
+            ('host2', 2): mock.Mock(url='http://host2:2/function/query-engine'),
+        }
+
+    @pytest.fixture
+    def factory(self, clients):
+        def factory(host, port, **kwargs):
+            return clients[(host, port)]
+
+        return factory
+
+    def test_requests_are_balanced(self, clients, factory):
+        balancer = LoadBalancedClient(list(clients), client_factory=factory)
+        first, second = balancer.endpoints
+        first.outstanding = 3
+        for _ in range(10):
+            balancer.get_atom('h1')
+        clients[('host1', 1)].get_atom.assert_not_called()
+        assert clients[('host2', 2)].get_atom.call_count == 10
+        assert second.outstanding == 0
+
+    def test_failover_of_read_operations(self, clients, factory):
+        clients[('host1', 1)].get_atom.side_effect = FunctionsConnectionError('Connection error')
+        clients[('host2', 2)].get_atom.return_value = {'handle': 'h1'}
+        balancer = LoadBalancedClient(
+            list(clients), client_factory=factory, health_check_interval=60
+        )
+        balancer.endpoints[1].outstanding = 1  # so host1 is tried first
+
+        assert balancer.get_atom('h1') == {'handle': 'h1'}
+        assert not balancer.endpoints[0].healthy
+        # Unhealthy replicas aren't used
+        balancer.endpoints[1].outstanding = 0
+        balancer.get_atom('h1')
+        assert clients[('host1', 1)].get_atom.call_count == 1
+
+    def test_transient_http_errors_fail_over(self, clients, factory):
+        clients[('host1', 1)].query.side_effect = HTTPError('Unavailable', status_code=503)
+        clients[('host2', 2)].query.return_value = ['answer']
+        balancer = LoadBalancedClient(
+            list(clients), client_factory=factory, health_check_interval=60
+        )
+        balancer.endpoints[1].outstanding = 1
+        assert balancer.query({}) == ['answer']
+
+    def test_other_errors_are_raised(self, clients, factory):
+        clients[('host1', 1)].get_links.side_effect = ValueError('Invalid filter')
+        clients[('host2', 2)].get_links.side_effect = ValueError('Invalid filter')
+        balancer = LoadBalancedClient(list(clients), client_factory=factory)
+        with pytest.raises(ValueError):
+            balancer.get_links(mock.Mock())
+        assert all(endpoint.healthy for endpoint in balancer.endpoints)
+
+    def test_updates_are_not_failed_over(self, clients, factory):
+        for client in clients.values():
+            client.commit_changes.side_effect = FunctionsConnectionError('Connection error')
+        balancer = LoadBalancedClient(
+            list(clients), client_factory=factory, health_check_interval=60
+        )
+        with pytest.raises(FunctionsConnectionError):
+            balancer.commit_changes()
+        assert sum(client.commit_changes.call_count for client in clients.values()) == 1
+
+    def test_no_replica_available(self, clients, factory):
+        for client in clients.values():
+            client.get_atom.side_effect = FunctionsConnectionError('Connection error')
+        balancer = LoadBalancedClient(
+            list(clients), client_factory=factory, health_check_interval=60
+        )
+        with pytest.raises(FunctionsConnectionError):
+            balancer.get_atom('h1')
+        with pytest.raises(FunctionsConnectionError):
+            balancer.get_atom('h1')
+        assert sum(client.get_atom.call_count for client in clients.values()) == 2
+
+    def test_replica_unavailable_at_startup(self, clients):
+        available = {('host2', 2)}
+
+        def factory(host, port, **kwargs):
+            if (host, port) not in available:
+                raise FunctionsConnectionError('Connection error')
+            return clients[(host, port)]
+
+        balancer = LoadBalancedClient(
+            list(clients), client_factory=factory, health_check_interval=0.01
+        )
+        assert [endpoint.healthy for endpoint in balancer.endpoints] == [False, True]
+        available.add(('host1', 1))
+        assert _wait_for(lambda: balancer.endpoints[0].healthy)
+        assert balancer.endpoints[0].client is clients[('host1', 1)]
+
+    def test_health_checks(self, clients, factory):
+        clients[('host1', 1)].count_atoms.side_effect = FunctionsConnectionError('Error')
+        balancer = LoadBalancedClient(
+            list(clients), client_factory=factory, health_check_interval=0.01
+        )
+        balancer.endpoints[1].outstanding = 1
+        with mock.patch(
+            'hyperon_das.load_balanced_client.check_server_connection',
+            return_value=(400, 'Connection failed'),
+        ) as check:
+            balancer.count_atoms()
+            assert _wait_for(lambda: check.call_count >= 2)
+            assert not balancer.endpoints[0].healthy
+            check.return_value = (200, 'Successful connection')
+            assert _wait_for(lambda: balancer.endpoints[0].healthy)
+        check.assert_called_with('http://host1:1/function/query-engine')
+
+    def test_close(self, clients, factory):
+        clients[('host1', 1)].count_atoms.side_effect = FunctionsConnectionError('Error')
+        balancer = LoadBalancedClient(
+            list(clients), client_factory=factory, health_check_interval=60
+        )
+        balancer.endpoints[1].outstanding = 1
+        balancer.count_atoms()
+        health_checker = balancer.health_checker
+        assert health_checker.is_alive()
+        # The health checker doesn't wait for the next check to stop
+        balancer.close()
+        assert not health_checker.is_alive()
+        assert balancer.health_checker is None
+        for client in clients.values():
+            client.close.assert_called_once_with()
+        # Failures after the client is closed don't start the health checker again
+        balancer._mark_unhealthy(balancer.endpoints[1], FunctionsConnectionError('Error'))
+        assert balancer.health_checker is None
+        balancer.close()
+
+    def test_all_replicas_unavailable(self, clients):
+        def factory(host, port, **kwargs):
+            raise FunctionsConnectionError('Connection error')
+
+        with pytest.raises(FunctionsConnectionError):
+            LoadBalancedClient(list(clients), client_factory=factory)
+
+    def test_batch_operations(self, clients, factory):
+        balancer = LoadBalancedClient(list(clients), client_factory=factory)
+        operation = balancer.get_atom_operation('h1')
+        assert operation == {'action': 'get_atom', 'input': {'handle': 'h1'}}
+        assert balancer.batch_result(operation, {'result': 'atom'}) == 'atom'
+
+    def test_unknown_attribute(self, clients, factory):
+        balancer = LoadBalancedClient(list(clients), client_factory=factory)
+        with pytest.raises(AttributeError):
+            balancer.unknown_method()
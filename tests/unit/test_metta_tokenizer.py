@@ -0,0 +1,121 @@
+import io
+
+import pytest
+
+from hyperon_das.tokenizers import metta_tokenizer
+from hyperon_das.tokenizers.dict_query_tokenizer import DictQueryTokenizer
+from hyperon_das.tokenizers.metta_tokenizer import iter_expressions, iter_tokens, tokenize
+
+
+@pytest.fixture(params=['native', 'python'])
+def implementation(request, monkeypatch):
+    # Runs a test against both the compiled tokenizer and the pure Python one
+    if request.param == 'python':
+        monkeypatch.setattr(metta_tokenizer, '_native_scan_tokens', None)
+        monkeypatch.setattr(metta_tokenizer, '_native_tokenize', None)
+    elif not metta_tokenizer.NATIVE_TOKENIZER_AVAILABLE:
+        pytest.skip('Native tokenizer is not built')
+    return request.param
+
+
+@pytest.mark.usefixtures('implementation')
+class TestMettaTokenizer:
+    def test_iter_tokens(self):
+        stream = io.StringIO('(Similarity "human being" $v1) ; a comment\n(: a (b "c\\"d"))')
+        assert list(iter_tokens(stream)) == [
+            '(',
+            'Similarity',
+            '"human being"',
+            '$v1',
+            ')',
+            '(',
+            ':',
+            'a',
+            '(',
+            'b',
+            '"c\\"d"',
+            ')',
+            ')',
+        ]
+
+    @pytest.mark.parametrize('read_size', [1, 2, 3, 7, 1 << 16])
+    def test_iter_tokens_across_reads(self, read_size):
+        text = '(Similarity "human being" monkey) ; comment\n(Concept "mon\\"key")'
+        expected = list(iter_tokens(io.StringIO(text)))
+        assert list(iter_tokens(io.StringIO(text), read_size=read_size)) == expected
+        assert expected[-2] == '"mon\\"key"'
+
+    def test_iter_tokens_delimiters(self):
+        stream = io.StringIO('  a"b c"d;e\n\t\u00a0f')
+        assert list(iter_tokens(stream)) == ['a', '"b c"', 'd', '\u00a0f']
+
+    def test_iter_tokens_unterminated_string(self):
+        with pytest.raises(ValueError):
+            list(iter_tokens(io.StringIO('(Concept "human)')))
+
+    def test_iter_expressions(self):
+        stream = io.StringIO(
+            '(: "human" Concept)\n'
+            '!(match &self $x $x)\n'
+            '(Inheritance\n    (Concept "human")\n    (Concept "mammal"))\n'
+            'Symbol\n'
+        )
+        assert list(iter_expressions(stream, read_size=5)) == [
+            [':', '"human"', 'Concept'],
+            ['Inheritance', ['Concept', '"human"'], ['Concept', '"mammal"']],
+            'Symbol',
+        ]
+
+    @pytest.mark.parametrize('text', ['(a (b c)', '(a b))', ')'])
+    def test_iter_expressions_unbalanced(self, text):
+        with pytest.raises(ValueError):
+            list(iter_expressions(io.StringIO(text)))
+
+    @pytest.mark.parametrize(
+        'expression,expected_tokens',
+        [
+            (
+                '(Similarity (Concept "human") $v1)',
+                'LINK_TEMPLATE Expression 3 NODE Symbol Similarity LINK Expression 2 '
+                'NODE Symbol Concept NODE Symbol "human" VARIABLE v1',
+            ),
+            (
+                '(Similarity $v0 (Concept "human") $v1)',
+                'LINK_TEMPLATE Expression 4 NODE Symbol Similarity VARIABLE v0 LINK Expression 2 '
+                'NODE Symbol Concept NODE Symbol "human" VARIABLE v1',
+            ),
+            (
+                '(Similarity (Concept $v0) $v1)',
+                'LINK_TEMPLATE Expression 3 NODE Symbol Similarity LINK_TEMPLATE Expression 2 '
+                'NODE Symbol Concept VARIABLE v0 VARIABLE v1',
+            ),
+        ],
+    )
+    def test_tokenize(self, expression, expected_tokens):
+        assert tokenize(expression) == expected_tokens
+        query = DictQueryTokenizer.untokenize(expected_tokens)
+        assert DictQueryTokenizer.tokenize(query) == expected_tokens
+
+    @pytest.mark.parametrize(
+        'expression,expected_tokens',
+        [
+            (
+                '  (Concept "human (being)")',
+                'LINK Expression 2 NODE Symbol Concept NODE Symbol "human (being)"',
+            ),
+            (
+                '(Concept ; a comment (\n human) ; another one',
+                'LINK Expression 2 NODE Symbol Concept NODE Symbol human',
+            ),
+            ('\n(a\t$b)\n', 'LINK_TEMPLATE Expression 2 NODE Symbol a VARIABLE b'),
+        ],
+    )
+    def test_tokenize_whitespace_strings_and_comments(self, expression, expected_tokens):
+        assert tokenize(expression) == expected_tokens
+
+    @pytest.mark.parametrize(
+        'expression', ['', 'Similarity', '(Similarity a', '(a) (b)', '(a) b', ')', '(a "b)']
+    )
+    def test_tokenize_invalid_expression(self, expression):
+        with pytest.raises(ValueError):
+            tokenize(expression)
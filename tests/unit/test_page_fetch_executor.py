@@ -0,0 +1,84 @@
+from threading import Event, Lock
+
+import pytest
+
+from hyperon_das.cache.page_fetch_executor import PageFetchExecutor, default_page_fetch_executor
+
+
+class TestPageFetchExecutor:
+    @pytest.fixture
+    def executor(self):
+        executor = PageFetchExecutor(max_in_flight=1)
+        yield executor
+        executor.shutdown()
+
+    def test_submit(self, executor):
+        results = []
+        for i in range(5):
+            executor.submit('owner', lambda i=i: results.append(i))
+        assert executor.join(1)
+        assert results == [0, 1, 2, 3, 4]
+
+    def test_owners_take_turns(self, executor):
+        started = Event()
+        release = Event()
+        results = []
+        executor.submit('blocker', lambda: (started.set(), release.wait(1)))
+        assert started.wait(1)
+        for i in range(3):
+            executor.submit('a', lambda i=i: results.append(('a', i)))
+        executor.submit('b', lambda: results.append(('b', 0)))
+        executor.submit('c', lambda: results.append(('c', 0)))
+        release.set()
+        assert executor.join(1)
+        assert results == [('a', 0), ('b', 0), ('c', 0), ('a', 1), ('a', 2)]
+
+    def test_max_in_flight(self):
+        executor = PageFetchExecutor(max_in_flight=3)
+        lock = Lock()
+        running = []
+        max_running = []
+
+        def task():
+            with lock:
+                running.append(1)
+                max_running.append(len(running))
+            Event().wait(0.01)
+            with lock:
+                running.pop()
+
+        for i in range(30):
+            executor.submit(i % 10, task)
+        assert executor.join(5)
+        assert max(max_running) <= 3
+        assert len(executor.workers) <= 3
+        executor.shutdown()
+
+    def test_cancel(self, executor):
+        started = Event()
+        release = Event()
+        results = []
+        executor.submit('blocker', lambda: (started.set(), release.wait(1)))
+        assert started.wait(1)
+        executor.submit('a', lambda: results.append('a'))
+        executor.submit('b', lambda: results.append('b'))
+        executor.cancel('a')
+        executor.cancel('unknown')
+        release.set()
+        assert executor.join(1)
+        assert results == ['b']
+
+    def test_task_error(self, executor):
+        results = []
+        executor.submit('owner', lambda: 1 / 0)
+        executor.submit('owner', lambda: results.append(1))
+        assert executor.join(1)
+        assert results == [1]
+
+    def test_shutdown(self, executor):
+        executor.shutdown()
+        with pytest.raises(RuntimeError):
+            executor.submit('owner', lambda: None)
+
+    def test_default_executor(self):
+        assert default_page_fetch_executor() is default_page_fetch_executor()
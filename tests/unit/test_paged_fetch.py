@@ -0,0 +1,147 @@
+from threading import Lock
+from unittest import mock
+
+import pytest
+
+from hyperon_das.paged_fetch import (
+    FetchProgress,
+    PagedFetch,
+    ScanSnapshots,
+    decode_continuation_token,
+    encode_continuation_token,
+    in_handle_range,
+    split_handle_range,
+)
+
+
+def _atoms(count: int) -> list:
+    return [mock.Mock(handle=f'{i * 0xFFFFFFFF // count:08x}{i:024x}') for i in range(count)]
+
+
+class TestHandleRanges:
+    def test_split_handle_range(self):
+        assert split_handle_range(1) == [(None, None)]
+        assert split_handle_range(4) == [
+            (None, '40000000'),
+            ('40000000', '80000000'),
+            ('80000000', 'c0000000'),
+            ('c0000000', None),
+        ]
+
+
+class TestContinuationTokens:
+    def test_encode_decode(self):
+        scan = ['get_incoming_links', 'h1', {'link_type': 'Similarity'}]
+        token = encode_continuation_token('abc', scan)
+        assert isinstance(token, str)
+        assert 'abc' not in token
+        assert decode_continuation_token(token, scan) == 'abc'
+        assert decode_continuation_token(None, scan) is None
+
+    def test_decode_other_scan(self):
+        token = encode_continuation_token('abc', ['get_incoming_links', 'h1'])
+        with pytest.raises(ValueError):
+            decode_continuation_token(token, ['get_incoming_links', 'h2'])
+
+    @pytest.mark.parametrize('token', ['', 'not a token', 'e30=', '!!!'])
+    def test_decode_invalid_token(self, token):
+        with pytest.raises(ValueError):
+            decode_continuation_token(token, ['get_incoming_links', 'h1'])
+
+
+class TestScanSnapshots:
+    def test_pages_come_from_a_single_load(self):
+        handles = [f'{i:032x}' for i in range(10)]
+        load = mock.Mock(return_value=list(reversed(handles)))
+        snapshots = ScanSnapshots()
+        pages = []
+        cursor, page = snapshots.page(['scan'], None, 4, load, lambda handle: handle)
+        pages.append(page)
+        while cursor is not None:
+            cursor, page = snapshots.page(['scan'], cursor, 4, load, lambda handle: handle)
+            pages.append(page)
+        assert pages == [handles[:4], handles[4:8], handles[8:]]
+        load.assert_called_once()
+        # Finished scans are discarded
+        assert not snapshots.snapshots
+
+    def test_snapshots_are_per_scan(self):
+        snapshots = ScanSnapshots()
+        first = snapshots.page(['a'], None, 1, lambda: ['1', '2'], lambda handle: handle)
+        second = snapshots.page(['b'], None, 1, lambda: ['3', '4'], lambda handle: handle)
+        assert first == ('1', ['1'])
+        assert second == ('3', ['3'])
+        assert snapshots.page(['a'], '1', 1, list, lambda handle: handle) == (None, ['2'])
+
+    def test_missing_snapshot_is_taken_again(self):
+        handles = [f'{i:032x}' for i in range(10)]
+        snapshots = ScanSnapshots(max_snapshots=1)
+        cursor, _ = snapshots.page(['a'], None, 4, lambda: handles, lambda handle: handle)
+        snapshots.page(['b'], None, 4, lambda: handles, lambda handle: handle)
+        load = mock.Mock(return_value=handles)
+        assert snapshots.page(['a'], cursor, 4, load, lambda handle: handle)[1] == handles[4:8]
+        load.assert_called_once()
+
+    def test_expired_snapshots_are_discarded(self):
+        snapshots = ScanSnapshots(ttl=10)
+        with mock.patch('hyperon_das.paged_fetch.time.monotonic', return_value=100):
+            snapshots.page(['a'], None, 1, lambda: ['1', '2'], lambda handle: handle)
+        load = mock.Mock(return_value=['1', '2', '3'])
+        with mock.patch('hyperon_das.paged_fetch.time.monotonic', return_value=111):
+            assert snapshots.page(['a'], '1', 1, load, lambda handle: handle) == ('2', ['2'])
+        load.assert_called_once()
+
+
+class TestPagedFetch:
+    @pytest.fixture
+    def server(self):
+        atoms = _atoms(100)
+        snapshots = ScanSnapshots()
+
+        def fetch_page(cursor, page_size, handle_range):
+            def load():
+                return [atom for atom in atoms if in_handle_range(atom.handle, handle_range)]
+
+            return snapshots.page(handle_range, cursor, page_size, load, lambda atom: atom.handle)
+
+        return fetch_page
+
+    @pytest.mark.parametrize('partitions', [1, 4])
+    def test_run(self, server, partitions):
+        inserted = []
+        lock = Lock()
+
+        def insert(atoms):
+            with lock:
+                inserted.extend(atoms)
+
+        callback = mock.Mock()
+        progress = PagedFetch(
+            server, insert, page_size=7, partitions=partitions, progress_callback=callback
+        ).run()
+        assert sorted(atom.handle for atom in inserted) == [atom.handle for atom in _atoms(100)]
+        assert progress.done
+        assert progress.atoms == 100
+        assert callback.call_count == progress.pages
+        assert callback.call_args.args[0] == progress
+
+    def test_resume(self, server):
+        progress_history = []
+        inserted = []
+        failing_server = mock.Mock(side_effect=[server(None, 10, (None, None)), ConnectionError])
+        with pytest.raises(ConnectionError):
+            PagedFetch(
+                failing_server,
+                inserted.extend,
+                page_size=10,
+                progress_callback=progress_history.append,
+            ).run()
+        assert len(inserted) == 10
+        assert len(progress_history) == 1
+        progress = PagedFetch(
+            server, inserted.extend, page_size=10, progress=progress_history[-1]
+        ).run()
+        assert [atom.handle for atom in inserted] == [atom.handle for atom in _atoms(100)]
+        assert progress == FetchProgress(
+            cursors=[inserted[-1].handle], finished=[True], pages=10, atoms=100
+        )
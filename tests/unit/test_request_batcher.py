@@ -0,0 +1,111 @@
+from threading import Event
+from unittest import mock
+
+import pytest
+from hyperon_das_atomdb import AtomDoesNotExist
+
+from hyperon_das.request_batcher import RequestBatcher
+
+
+def _batch_result(operation, entry):
+    if 'error' in entry:
+        raise AtomDoesNotExist('Nonexistent atom')
+    return entry['result']
+
+
+class TestRequestBatcher:
+    @pytest.fixture
+    def client(self):
+        client = mock.Mock()
+        client.get_atom_operation.side_effect = lambda handle: {
+            'action': 'get_atom',
+            'input': {'handle': handle},
+        }
+        client.batch.side_effect = lambda operations: [
+            {'error': 'Nonexistent atom', 'status_code': 404}
+            if operation['input']['handle'] == 'missing'
+            else {'result': {'handle': operation['input']['handle']}}
+            for operation in operations
+        ]
+        client.batch_result.side_effect = _batch_result
+        return client
+
+    def test_operations_are_coalesced(self, client):
+        batcher = RequestBatcher(client, window=60, max_batch_size=3)
+        futures = [batcher.submit(client.get_atom_operation(f'h{i}')) for i in range(3)]
+        assert [future.result(timeout=5) for future in futures] == [
+            {'handle': 'h0'},
+            {'handle': 'h1'},
+            {'handle': 'h2'},
+        ]
+        client.batch.assert_called_once()
+        assert len(client.batch.call_args.args[0]) == 3
+        batcher.close()
+
+    def test_operations_are_sent_after_window(self, client):
+        batcher = RequestBatcher(client, window=0.05, max_batch_size=100)
+        assert batcher.get_atom('h1') == {'handle': 'h1'}
+        client.batch.assert_called_once()
+        batcher.close()
+
+    def test_max_batch_size(self, client):
+        batcher = RequestBatcher(client, window=0.05, max_batch_size=2)
+        futures = [batcher.submit(client.get_atom_operation(f'h{i}')) for i in range(5)]
+        assert [future.result(timeout=5)['handle'] for future in futures] == [
+            'h0',
+            'h1',
+            'h2',
+            'h3',
+            'h4',
+        ]
+        assert [len(c.args[0]) for c in client.batch.call_args_list] == [2, 2, 1]
+        batcher.close()
+
+    def test_errors_are_reported_per_operation(self, client):
+        batcher = RequestBatcher(client, window=0.05)
+        missing = batcher.submit(client.get_atom_operation('missing'))
+        existing = batcher.submit(client.get_atom_operation('h1'))
+        with pytest.raises(AtomDoesNotExist):
+            missing.result(timeout=5)
+        assert existing.result(timeout=5) == {'handle': 'h1'}
+        client.batch.assert_called_once()
+        batcher.close()
+
+    def test_failed_batch_request(self, client):
+        client.batch.side_effect = ConnectionError('connection refused')
+        batcher = RequestBatcher(client, window=0.05)
+        futures = [batcher.submit(client.get_atom_operation(f'h{i}')) for i in range(2)]
+        for future in futures:
+            with pytest.raises(ConnectionError):
+                future.result(timeout=5)
+        batcher.close()
+
+    def test_close_sends_pending_operations(self, client):
+        batcher = RequestBatcher(client, window=60)
+        future = batcher.submit(client.get_atom_operation('h1'))
+        batcher.close()
+        assert future.done()
+        assert future.result() == {'handle': 'h1'}
+        with pytest.raises(RuntimeError):
+            batcher.submit(client.get_atom_operation('h2'))
+
+    def test_concurrent_callers(self, client):
+        release = Event()
+        original_batch = client.batch.side_effect
+
+        def batch(operations):
+            release.wait(5)
+            return original_batch(operations)
+
+        client.batch.side_effect = batch
+        batcher = RequestBatcher(client, window=0.05)
+        first = batcher.submit(client.get_atom_operation('h0'))
+        # Operations submitted while a batch is in flight go in the next batch
+        while not client.batch.called:
+            Event().wait(0.01)
+        others = [batcher.submit(client.get_atom_operation(f'h{i}')) for i in range(1, 4)]
+        release.set()
+        assert first.result(timeout=5) == {'handle': 'h0'}
+        assert [future.result(timeout=5)['handle'] for future in others] == ['h1', 'h2', 'h3']
+        assert [len(c.args[0]) for c in client.batch.call_args_list] == [1, 3]
+        batcher.close()
@@ -0,0 +1,104 @@
+from unittest import mock
+
+from hyperon_das.request_policy import CircuitBreaker, RequestPolicy
+
+
+class TestCircuitBreaker:
+    def test_opens_after_consecutive_failures(self):
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+        breaker.record_failure()
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.allow_request() == (True, False)
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.allow_request() == (False, False)
+
+    def test_half_open(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+        with mock.patch('hyperon_das.request_policy.time.monotonic', return_value=100):
+            breaker.record_failure()
+            assert breaker.allow_request() == (False, False)
+        with mock.patch('hyperon_das.request_policy.time.monotonic', return_value=110):
+            assert breaker.state == CircuitBreaker.HALF_OPEN
+            # A single trial request is allowed
+            assert breaker.allow_request() == (True, True)
+            assert breaker.allow_request() == (False, False)
+            breaker.record_failure(trial=True)
+            assert breaker.state == CircuitBreaker.OPEN
+        with mock.patch('hyperon_das.request_policy.time.monotonic', return_value=120):
+            assert breaker.allow_request() == (True, True)
+            breaker.record_success(trial=True)
+            assert breaker.state == CircuitBreaker.CLOSED
+            assert breaker.allow_request() == (True, False)
+
+    def test_end_trial(self):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+        with mock.patch('hyperon_das.request_policy.time.monotonic', return_value=100):
+            breaker.record_failure()
+        with mock.patch('hyperon_das.request_policy.time.monotonic', return_value=110):
+            assert breaker.allow_request() == (True, True)
+            breaker.end_trial()
+            assert breaker.state == CircuitBreaker.HALF_OPEN
+            assert breaker.allow_request() == (True, True)
+
+    def test_other_requests_dont_end_the_trial(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+        with mock.patch('hyperon_das.request_policy.time.monotonic', return_value=100):
+            breaker.record_failure()
+            breaker.record_failure()
+        with mock.patch('hyperon_das.request_policy.time.monotonic', return_value=110):
+            assert breaker.allow_request() == (True, True)
+            # A request sent before the circuit opened fails while the trial is in flight
+            breaker.record_failure()
+            assert breaker.trial_in_flight
+        with mock.patch('hyperon_das.request_policy.time.monotonic', return_value=120):
+            assert breaker.state == CircuitBreaker.HALF_OPEN
+            assert breaker.allow_request() == (False, False)
+
+    def test_disabled(self):
+        breaker = CircuitBreaker(failure_threshold=0)
+        for _ in range(100):
+            breaker.record_failure()
+        assert breaker.allow_request() == (True, False)
+
+
+class TestRequestPolicy:
+    def test_timeout_for(self):
+        policy = RequestPolicy(timeout=5, long_timeout=500)
+        assert policy.timeout_for('get_atom') == 5
+        assert policy.timeout_for('commit_changes') == 500
+        assert policy.timeout_for('query') == 500
+        assert RequestPolicy().timeout_for('get_atom') is None
+
+    def test_should_retry(self):
+        policy = RequestPolicy(max_retries=2)
+        assert policy.should_retry('get_atom', 0)
+        assert policy.should_retry('get_atom', 1)
+        assert not policy.should_retry('get_atom', 2)
+        assert not policy.should_retry('commit_changes', 0)
+        assert not RequestPolicy(max_retries=0).should_retry('get_atom', 0)
+
+    def test_backoff_delay(self):
+        policy = RequestPolicy(retry_backoff=0.1, retry_max_backoff=1.0)
+        for attempt in range(10):
+            delay = policy.backoff_delay(attempt)
+            assert 0 <= delay <= min(1.0, 0.1 * 2**attempt)
+
+    def test_should_hedge(self):
+        assert not RequestPolicy().should_hedge('get_atom')
+        policy = RequestPolicy(hedge_delay=0.1)
+        assert policy.should_hedge('get_atom')
+        assert not policy.should_hedge('fetch')
+        assert not policy.should_hedge('commit_changes')
+
+    def test_from_system_parameters(self):
+        policy = RequestPolicy.from_system_parameters(
+            {'request_timeout': 3, 'request_hedge_delay': 0.2, 'circuit_breaker_threshold': 0}
+        )
+        assert policy.timeout == 3
+        assert policy.hedge_delay == 0.2
+        assert policy.circuit_breaker().failure_threshold == 0
+        assert policy.max_retries == 2
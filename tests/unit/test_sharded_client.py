@@ -0,0 +1,192 @@
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from hyperon_das.exceptions import FunctionsConnectionError
+from hyperon_das.sharded_client import ShardedClient
+
+
+class TestShardedClient:
+    @pytest.fixture
+    def clients(self):
+        return {
+            ('host1', 1): mock.Mock(),
+            ('host2', 2): mock.Mock(),
+        }
+
+    @pytest.fixture
+    def sharded(self, clients):
+        def factory(host, port, **kwargs):
+            return clients[(host, port)]
+
+        return ShardedClient(list(clients), client_factory=factory)
+
+    def test_shard_index(self, sharded):
+        assert sharded.shard_index('0' * 32) == 0
+        assert sharded.shard_index('7fffffff' + 'f' * 24) == 0
+        assert sharded.shard_index('80000000' + '0' * 24) == 1
+        assert sharded.shard_index('f' * 32) == 1
+
+    def test_get_atom_is_routed(self, clients, sharded):
+        clients[('host2', 2)].get_atom.return_value = {'handle': 'a1'}
+        assert sharded.get_atom('a1') == {'handle': 'a1'}
+        clients[('host2', 2)].get_atom.assert_called_once_with('a1')
+        clients[('host1', 1)].get_atom.assert_not_called()
+
+    def test_get_links_is_scattered(self, clients, sharded):
+        clients[('host1', 1)].get_links.return_value = ['l1']
+        clients[('host2', 2)].get_links.return_value = ['l2', 'l3']
+        assert sorted(sharded.get_links(mock.Mock())) == ['l1', 'l2', 'l3']
+
+    def test_query(self, clients, sharded):
+        clients[('host1', 1)].query.return_value = [{'handle': 'l1'}]
+        clients[('host2', 2)].query.return_value = []
+        answers = sharded.query({'atom_type': 'link'}, {'no_iterator': True})
+        # Requests are sent before the answers are iterated
+        for client in clients.values():
+            client.query.assert_called_once_with({'atom_type': 'link'}, {'no_iterator': True})
+        assert list(answers) == [{'handle': 'l1'}]
+
+    def test_failed_shard(self, clients, sharded):
+        clients[('host1', 1)].query.return_value = []
+        clients[('host2', 2)].query.side_effect = FunctionsConnectionError('Connection error')
+        with pytest.raises(FunctionsConnectionError):
+            list(sharded.query({}))
+
+    def test_close(self, clients, sharded):
+        sharded.close()
+        for client in clients.values():
+            client.close.assert_called_once_with()
+        with pytest.raises(RuntimeError):
+            sharded.get_links(mock.Mock())
+
+    def test_count_atoms(self, clients, sharded):
+        clients[('host1', 1)].count_atoms.return_value = {
+            'node_count': 2,
+            'link_count': 1,
+            'atom_count': 3,
+            'atom_types': {'Concept': 2},
+        }
+        clients[('host2', 2)].count_atoms.return_value = {
+            'node_count': 1,
+            'link_count': 4,
+            'atom_count': 5,
+            'atom_types': {'Concept': 1, 'Expression': 4},
+        }
+        assert sharded.count_atoms() == {
+            'node_count': 3,
+            'link_count': 5,
+            'atom_count': 8,
+            'atom_types': {'Concept': 3, 'Expression': 4},
+        }
+
+    def test_batch(self, clients, sharded):
+        clients[('host1', 1)].batch.return_value = [{'result': 'atom a'}, {'result': ['l1']}]
+        clients[('host2', 2)].batch.return_value = [{'result': ['l2']}, {'result': 'atom f'}]
+        operations = [
+            sharded.get_atom_operation('01'),
+            sharded.get_incoming_links_operation('b1'),
+            sharded.get_atom_operation('f1'),
+        ]
+        entries = sharded.batch(operations)
+        assert entries == [{'result': 'atom a'}, {'result': ['l1', 'l2']}, {'result': 'atom f'}]
+        clients[('host1', 1)].batch.assert_called_once_with(operations[:2])
+        clients[('host2', 2)].batch.assert_called_once_with(operations[1:])
+
+    def test_batch_errors(self, clients, sharded):
+        operations = [
+            sharded.get_incoming_links_operation('b1'),
+            sharded.get_links_operation(mock.Mock()),
+        ]
+        clients[('host1', 1)].batch.return_value = [
+            {'error': 'Failed', 'status_code': 500},
+            {'error': 'Invalid filter', 'status_code': 400},
+        ]
+        clients[('host2', 2)].batch.return_value = [{'result': ['l2']}, {'result': ['l3']}]
+        incoming_links, links = sharded.batch(operations)
+        assert incoming_links == {'result': ['l2']}
+        assert links == {'error': 'Invalid filter', 'status_code': 400}
+
+    def test_commit_buffer_is_partitioned(self, clients, sharded):
+        first, second = SimpleNamespace(handle='01'), SimpleNamespace(handle='f1')
+        clients[('host1', 1)].commit_changes.return_value = (1, 0)
+        clients[('host2', 2)].commit_changes.return_value = (0, 1)
+        assert sharded.commit_changes(buffer=[first, second]) == (1, 1)
+        clients[('host1', 1)].commit_changes.assert_called_once_with(buffer=[first])
+        clients[('host2', 2)].commit_changes.assert_called_once_with(buffer=[second])
+
+    def test_commit_buffer_skips_shards_without_changes(self, clients, sharded):
+        clients[('host1', 1)].commit_changes.return_value = (1, 0)
+        sharded.commit_changes(buffer=[SimpleNamespace(handle='01')])
+        clients[('host2', 2)].commit_changes.assert_not_called()
+
+    def test_custom_query_page(self, clients, sharded):
+        first, second = clients[('host1', 1)], clients[('host2', 2)]
+        first.custom_query_page.return_value = ('t1', ['a1', 'a2'])
+        second.custom_query_page.return_value = (None, ['a3'])
+        token, atoms = sharded.custom_query_page('index_id', [], chunk_size=4)
+        assert token is not None
+        assert sorted(atoms) == ['a1', 'a2', 'a3']
+        first.custom_query_page.assert_called_once_with(
+            'index_id', [], continuation_token=None, chunk_size=2
+        )
+
+        # Only the shards whose scans aren't over are asked for the following pages
+        first.custom_query_page.return_value = (None, ['a4'])
+        assert sharded.custom_query_page('index_id', [], token, chunk_size=4) == (None, ['a4'])
+        first.custom_query_page.assert_called_with(
+            'index_id', [], continuation_token='t1', chunk_size=4
+        )
+        assert second.custom_query_page.call_count == 1
+
+    def test_get_incoming_links_page(self, clients, sharded):
+        clients[('host1', 1)].get_incoming_links_page.return_value = (None, ['l1'])
+        clients[('host2', 2)].get_incoming_links_page.return_value = (None, [])
+        assert sharded.get_incoming_links_page('a1', handles_only=True) == (None, ['l1'])
+        clients[('host2', 2)].get_incoming_links_page.assert_called_once_with(
+            'a1', continuation_token=None, chunk_size=250, handles_only=True
+        )
+
+    def test_invalid_continuation_token(self, sharded):
+        with pytest.raises(ValueError):
+            sharded.custom_query_page('index_id', [], 'invalid')
+        with pytest.raises(ValueError):
+            sharded.custom_query_page('index_id', [], sharded._encode_shard_tokens(['t1']))
+
+    def test_fetch_page(self, clients, sharded):
+        atoms = [SimpleNamespace(handle=handle) for handle in ('01', '02', '03', 'f1', 'f2')]
+
+        def fetch_page(shard_atoms):
+            def fetch_page(query, cursor, page_size, handle_range):
+                following = [atom for atom in shard_atoms if cursor is None or atom.handle > cursor]
+                page = following[:page_size]
+                return (page[-1].handle if len(following) > page_size else None), page
+
+            return fetch_page
+
+        clients[('host1', 1)].fetch_page.side_effect = fetch_page(atoms[:3])
+        clients[('host2', 2)].fetch_page.side_effect = fetch_page(atoms[3:])
+        # Pages are completed with the atoms of the following shard
+        assert sharded.fetch_page(None, None, 2) == ('02', atoms[:2])
+        assert sharded.fetch_page(None, '02', 2) == ('f1', atoms[2:4])
+        assert sharded.fetch_page(None, 'f1', 2) == (None, atoms[4:])
+        clients[('host2', 2)].fetch_page.assert_called_with(None, 'f1', 2, ('80000000', None))
+
+        # Shards outside the handle range aren't asked
+        clients[('host2', 2)].fetch_page.reset_mock()
+        assert sharded.fetch_page(None, None, 5, (None, '02')) == (None, atoms[:3])
+        clients[('host1', 1)].fetch_page.assert_called_with(None, None, 5, (None, '02'))
+        clients[('host2', 2)].fetch_page.assert_not_called()
+
+    def test_fetch_delta(self, clients, sharded):
+        first, second = clients[('host1', 1)], clients[('host2', 2)]
+        first.fetch_delta.return_value = ({'010': 'm1'}, ['a1'])
+        second.fetch_delta.return_value = ({'f10': 'm2'}, ['a2'])
+        marks, atoms = sharded.fetch_delta(None, {})
+        assert marks == {'0/010': 'm1', '1/f10': 'm2'}
+        assert atoms == ['a1', 'a2']
+
+        sharded.fetch_delta(None, marks)
+        first.fetch_delta.assert_called_with(None, {'010': 'm1'})
+        second.fetch_delta.assert_called_with(None, {'f10': 'm2'})
@@ -22,6 +22,82 @@ def get_names(handles: str, das: DistributedAtomSpace) -> set:
     return answer
 
 
+class Document(dict):
+    """Atom document which can also be read as a dataclass (e.g. `link.named_type`)."""
+
+    __getattr__ = dict.__getitem__
+
+
+class PagedBackend:
+    """Backend returning the incoming links of an atom in pages of `chunk_size` links."""
+
+    def __init__(self) -> None:
+        nodes = [Document(handle=name, named_type='Concept', name=name) for name in 'abcd']
+        links = [
+            Document(handle='l1', named_type='Inheritance', targets=['a', 'b']),
+            Document(handle='l2', named_type='Similarity', targets=['a', 'c']),
+            Document(handle='l3', named_type='Similarity', targets=['d', 'a']),
+            Document(handle='l4', named_type='Similarity', targets=['b', 'c']),
+        ]
+        self.atoms = {atom['handle']: atom for atom in nodes + links}
+        self.documents_fetched = []
+
+    def get_atom(self, handle, **kwargs):
+        atom = Document(self.atoms[handle])
+        if kwargs.get('targets_document') and 'targets' in atom:
+            self.documents_fetched.append(handle)
+            atom['targets_document'] = [self.atoms[target] for target in atom['targets']]
+        return atom
+
+    def get_atom_type(self, handle):
+        return self.atoms[handle]['named_type']
+
+    def get_incoming_links_handles(self, atom_handle, **kwargs):
+        handles = sorted(
+            handle for handle, atom in self.atoms.items() if atom_handle in atom.get('targets', [])
+        )
+        cursor = kwargs.get('cursor')
+        if cursor is None:
+            return handles
+        end = cursor + kwargs['chunk_size']
+        return (end if end < len(handles) else 0), handles[cursor:end]
+
+
+class TestTraverseEngineIncomingLinks:
+    @pytest.fixture
+    def das(self):
+        das = DistributedAtomSpace()
+        das.query_engine.local_backend = PagedBackend()
+        return das
+
+    def test_get_links(self, das):
+        cursor = das.get_traversal_cursor('a')
+        links = cursor.get_links(chunk_size=1)
+        assert [link['handle'] for link in links] == ['l1', 'l2', 'l3']
+
+    def test_get_links_with_filters(self, das):
+        cursor = das.get_traversal_cursor('a')
+        # The first page (l1) has no matching link
+        links = cursor.get_links(link_type='Similarity', chunk_size=1)
+        assert [link['handle'] for link in links] == ['l2', 'l3']
+        links = cursor.get_links(link_type='Similarity', cursor_position=0, chunk_size=2)
+        assert [link['handle'] for link in links] == ['l2']
+        # Targets documents are only fetched for links which pass the filters
+        assert set(das.query_engine.local_backend.documents_fetched) == {'l2', 'l3'}
+
+    def test_get_incoming_links_pages(self, das):
+        assert das.get_incoming_links('a', cursor=0, chunk_size=2, handles_only=True) == (
+            2,
+            ['l1', 'l2'],
+        )
+        assert das.get_incoming_links(
+            'a', link_type='Similarity', cursor=0, chunk_size=2, handles_only=True
+        ) == (2, ['l2'])
+        assert das.get_incoming_links(
+            'a', link_type='Similarity', cursor=2, chunk_size=2, handles_only=True
+        ) == (0, ['l3'])
+
+
 @pytest.mark.skip(
     reason="Waiting for integration with cache sub-module https://github.com/singnet/das/issues/73"
 )
@@ -0,0 +1,139 @@
+from threading import Event
+from types import SimpleNamespace
+
+import pytest
+
+from hyperon_das.cache.cache_controller import CacheController
+from hyperon_das.cache.traverse_prefetcher import TraversePrefetcher, neighbor_handles
+
+# a - b - c - d, plus a - e
+EDGES = [('a', 'b'), ('b', 'c'), ('c', 'd'), ('a', 'e')]
+
+
+def incoming_links(handle):
+    return [
+        {
+            'handle': f'{source}{target}',
+            'named_type': 'Similarity',
+            'targets': [source, target],
+            'targets_document': [{'handle': source}, {'handle': target}],
+        }
+        for source, target in EDGES
+        if handle in (source, target)
+    ]
+
+
+class FetchMock:
+    def __init__(self, block=None):
+        self.calls = []
+        self.block = block
+
+    def __call__(self, handle):
+        if self.block is not None:
+            self.block.wait()
+        self.calls.append(handle)
+        return incoming_links(handle)
+
+
+@pytest.fixture
+def cache_controller():
+    return CacheController({'traverse_prefetch': True})
+
+
+class TestNeighborHandles:
+    def test_neighbor_handles(self):
+        assert neighbor_handles('a', incoming_links('a')) == ['b', 'e']
+        assert neighbor_handles('b', incoming_links('b')) == ['a', 'c']
+
+    def test_tuples(self):
+        links = [({'handle': 'ab'}, [{'handle': 'a'}, {'handle': 'b'}])]
+        assert neighbor_handles('b', links) == ['a']
+
+    def test_link_objects(self):
+        links = [SimpleNamespace(handle='ab', targets=['a', 'b'])]
+        assert neighbor_handles('b', links) == ['a']
+
+
+class TestTraversePrefetcher:
+    @pytest.mark.parametrize(
+        'depth,fetched',
+        [(0, {'a'}), (1, {'a', 'b', 'e'}), (2, {'a', 'b', 'c', 'e'}), (3, set('abcde'))],
+    )
+    def test_depth(self, cache_controller, depth, fetched):
+        fetch = FetchMock()
+        prefetcher = TraversePrefetcher(fetch, cache_controller, depth=depth)
+        prefetcher.prefetch('a')
+        assert prefetcher.join(timeout=5)
+        assert set(fetch.calls) == fetched
+        for handle in fetched:
+            assert cache_controller.get_incoming_links(handle) == incoming_links(handle)
+
+    def test_max_neighbors(self, cache_controller):
+        fetch = FetchMock()
+        prefetcher = TraversePrefetcher(fetch, cache_controller, max_neighbors=1)
+        prefetcher.prefetch('a')
+        assert prefetcher.join(timeout=5)
+        assert set(fetch.calls) == {'a', 'b'}
+
+    def test_cached_links_are_not_fetched_again(self, cache_controller):
+        fetch = FetchMock()
+        prefetcher = TraversePrefetcher(fetch, cache_controller, depth=2)
+        prefetcher.prefetch('a')
+        prefetcher.prefetch('b')
+        assert prefetcher.join(timeout=5)
+        assert sorted(fetch.calls) == ['a', 'b', 'c', 'd', 'e']
+
+    def test_get_incoming_links(self, cache_controller):
+        fetch = FetchMock()
+        prefetcher = TraversePrefetcher(fetch, cache_controller)
+        assert prefetcher.get_incoming_links('a') is None
+        prefetcher.prefetch('a')
+        assert prefetcher.get_incoming_links('a') == incoming_links('a')
+        assert prefetcher.join(timeout=5)
+        assert prefetcher.get_incoming_links('b') == incoming_links('b')
+
+    def test_get_incoming_links_waits_for_ongoing_fetch(self, cache_controller):
+        block = Event()
+        fetch = FetchMock(block)
+        prefetcher = TraversePrefetcher(fetch, cache_controller, depth=0)
+        prefetcher.prefetch('a')
+        prefetcher.prefetch('a')
+        block.set()
+        assert prefetcher.get_incoming_links('a') == incoming_links('a')
+        assert fetch.calls == ['a']
+        prefetcher.shutdown()
+
+    def test_fetch_error(self, cache_controller):
+        def fetch(handle):
+            raise ConnectionError()
+
+        prefetcher = TraversePrefetcher(fetch, cache_controller)
+        prefetcher.prefetch('a')
+        assert prefetcher.get_incoming_links('a') is None
+        assert prefetcher.join(timeout=5)
+        assert prefetcher.in_flight == {}
+
+    def test_invalidated_links_are_discarded(self, cache_controller):
+        block = Event()
+        prefetcher = TraversePrefetcher(FetchMock(block), cache_controller, depth=0)
+        prefetcher.prefetch('a')
+        cache_controller.invalidate_incoming_links()
+        block.set()
+        assert prefetcher.join(timeout=5)
+        assert cache_controller.get_incoming_links('a') is None
+
+    def test_shutdown(self, cache_controller):
+        block = Event()
+        fetch = FetchMock(block)
+        prefetcher = TraversePrefetcher(fetch, cache_controller)
+        prefetcher.prefetch('a')
+        prefetcher.shutdown()
+        block.set()
+        assert prefetcher.join(timeout=5)
+        # Neighbors of the links fetched before the shutdown aren't prefetched
+        assert fetch.calls == ['a']
+        prefetcher.prefetch('b')
+        assert prefetcher.join(timeout=5)
+        assert fetch.calls == ['a']
+        assert prefetcher.executor._shutdown
+        prefetcher.shutdown()
@@ -1,12 +1,17 @@
+import json
+from unittest import mock
+
 import pytest
 
-from hyperon_das.exceptions import InvalidAssignment
+from hyperon_das.exceptions import InvalidAssignment, RetryConnectionError
 from hyperon_das.utils import (
     Assignment,
     QueryAnswer,
+    clear_handshake_cache,
     compare_major_versions,
     compare_minor_versions,
     compare_patch_versions,
+    connect_to_server,
     get_version_components,
 )
 
@@ -268,3 +273,108 @@ def test_compare_patch_versions(version1, version2, expected):
 )
 def test_compare_major_versions(version1, version2, expected):
     assert compare_major_versions(version1, version2) == expected
+
+
+class TestConnectToServer:
+    @pytest.fixture(autouse=True)
+    def handshake_cache(self):
+        clear_handshake_cache()
+        yield
+        clear_handshake_cache()
+
+    @pytest.fixture
+    def versions(self):
+        with mock.patch('hyperon_das.utils.get_package_version', return_value='1.0.0'):
+            yield
+
+    def test_handshake_is_cached(self):
+        with mock.patch(
+            'hyperon_das.utils.check_server_connection', return_value=(200, 'OK')
+        ) as check:
+            assert connect_to_server('localhost', 1234) == (
+                200,
+                'http://localhost:1234/function/query-engine',
+            )
+            assert connect_to_server('localhost', 1234) == (
+                200,
+                'http://localhost:1234/function/query-engine',
+            )
+            openfaas_probe = mock.call('http://localhost:1234/function/query-engine')
+            assert check.call_args_list.count(openfaas_probe) == 1
+            connect_to_server('localhost', 4321)
+            assert mock.call('http://localhost:4321/function/query-engine') in check.call_args_list
+
+    def test_candidates_are_probed_concurrently(self):
+        def check_server_connection(url):
+            return (200, 'OK') if '/prod/' in url else (400, 'Connection failed')
+
+        with mock.patch(
+            'hyperon_das.utils.check_server_connection', side_effect=check_server_connection
+        ) as check:
+            assert connect_to_server('localhost', 1234) == (
+                200,
+                'http://localhost/prod/query-engine',
+            )
+            assert check.call_count == 2
+
+    def test_failed_handshake_is_not_cached(self):
+        with mock.patch(
+            'hyperon_das.utils.check_server_connection', return_value=(500, 'Version mismatch')
+        ):
+            with pytest.raises(RetryConnectionError):
+                connect_to_server('localhost', 1234)
+        with mock.patch(
+            'hyperon_das.utils.check_server_connection', return_value=(200, 'OK')
+        ) as check:
+            connect_to_server('localhost', 1234)
+            assert check.called
+
+    def test_handshake_cache_file(self, tmp_path, versions):
+        cache_file = str(tmp_path / 'handshakes.json')
+        with mock.patch(
+            'hyperon_das.utils.check_server_connection', return_value=(200, 'OK')
+        ) as check:
+            connect_to_server('localhost', 1234, cache_file=cache_file)
+            assert check.called
+        with open(cache_file) as file:
+            entry = json.load(file)['localhost:1234']
+        assert entry['url'] == 'http://localhost:1234/function/query-engine'
+
+        # A new process (i.e. an empty in-memory cache) uses the file
+        clear_handshake_cache()
+        with mock.patch('hyperon_das.utils.check_server_connection') as check:
+            assert connect_to_server('localhost', 1234, cache_file=cache_file) == (
+                200,
+                'http://localhost:1234/function/query-engine',
+            )
+            check.assert_not_called()
+
+        # Expired entries are ignored
+        clear_handshake_cache()
+        with mock.patch(
+            'hyperon_das.utils.check_server_connection', return_value=(200, 'OK')
+        ) as check:
+            connect_to_server('localhost', 1234, cache_file=cache_file, cache_ttl=0)
+            assert check.called
+
+    def test_handshake_cache_file_versions(self, tmp_path, versions):
+        cache_file = str(tmp_path / 'handshakes.json')
+        with mock.patch('hyperon_das.utils.check_server_connection', return_value=(200, 'OK')):
+            connect_to_server('localhost', 1234, cache_file=cache_file)
+        clear_handshake_cache()
+        with mock.patch('hyperon_das.utils.get_package_version', return_value='2.0.0'):
+            with mock.patch(
+                'hyperon_das.utils.check_server_connection', return_value=(200, 'OK')
+            ) as check:
+                connect_to_server('localhost', 1234, cache_file=cache_file)
+                assert check.called
+
+    def test_invalid_handshake_cache_file(self, tmp_path, versions):
+        cache_file = tmp_path / 'handshakes.json'
+        cache_file.write_text('invalid json')
+        with mock.patch(
+            'hyperon_das.utils.check_server_connection', return_value=(200, 'OK')
+        ) as check:
+            connect_to_server('localhost', 1234, cache_file=str(cache_file))
+            assert check.called
+        assert 'localhost:1234' in json.loads(cache_file.read_text())
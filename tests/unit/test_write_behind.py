@@ -0,0 +1,93 @@
+import time
+from threading import Event, Thread
+from unittest.mock import Mock, patch
+
+import pytest
+
+from hyperon_das.exceptions import WriteBehindBufferFull
+from hyperon_das.write_behind import WriteBehindBuffer
+
+
+class TestWriteBehindBuffer:
+    def test_flush_when_max_atoms_is_reached(self):
+        flushed = Event()
+        buffer = WriteBehindBuffer(flushed.set, max_atoms=3, max_age_seconds=60)
+        buffer.regard_added_atoms(2)
+        assert not flushed.wait(timeout=0.2)
+        buffer.regard_added_atoms()
+        assert flushed.wait(timeout=5)
+        buffer.close()
+
+    def test_flush_when_max_age_is_reached(self):
+        flushed = Event()
+        buffer = WriteBehindBuffer(flushed.set, max_atoms=1000, max_age_seconds=0.1)
+        buffer.regard_added_atoms()
+        assert flushed.wait(timeout=5)
+        assert buffer.pending == 0
+        buffer.close()
+
+    def test_explicit_flush(self):
+        flush_function = Mock()
+        buffer = WriteBehindBuffer(flush_function, max_atoms=1000, max_age_seconds=60)
+        buffer.regard_added_atoms(10)
+        buffer.flush()
+        flush_function.assert_called_once()
+        assert buffer.pending == 0
+        buffer.close()
+        flush_function.assert_called_once()
+
+    def test_close_flushes_pending_atoms(self):
+        flush_function = Mock()
+        buffer = WriteBehindBuffer(flush_function, max_atoms=1000, max_age_seconds=60)
+        buffer.regard_added_atoms()
+        buffer.close()
+        flush_function.assert_called_once()
+
+    def test_failed_flush_keeps_pending_atoms(self):
+        buffer = WriteBehindBuffer(
+            Mock(side_effect=ValueError('blah')), max_atoms=1000, max_age_seconds=60
+        )
+        buffer.regard_added_atoms(5)
+        with pytest.raises(ValueError):
+            buffer.flush()
+        assert buffer.pending == 5
+        buffer.flush_function = Mock()
+        buffer.close()
+
+    def test_backpressure(self):
+        release = Event()
+        buffer = WriteBehindBuffer(
+            lambda: release.wait(timeout=5), max_atoms=2, max_age_seconds=60, max_pending=4
+        )
+        writer = Thread(target=lambda: [buffer.regard_added_atoms() for _ in range(6)])
+        writer.start()
+        time.sleep(0.2)
+        assert writer.is_alive()
+        release.set()
+        writer.join(timeout=5)
+        assert not writer.is_alive()
+        buffer.close()
+
+    def test_backpressure_timeout(self):
+        buffer = WriteBehindBuffer(
+            Mock(side_effect=ValueError('blah')),
+            max_atoms=2,
+            max_age_seconds=60,
+            max_pending=2,
+            max_wait_seconds=0.2,
+        )
+        with pytest.raises(WriteBehindBufferFull) as exc:
+            buffer.regard_added_atoms(2)
+        assert 'blah' in exc.value.details
+        assert buffer.pending == 2
+        buffer.flush_function = Mock()
+        buffer.close()
+
+    def test_close_stops_thread_and_unregisters_exit_hook(self):
+        with patch('hyperon_das.write_behind.atexit') as atexit_mock:
+            buffer = WriteBehindBuffer(Mock(), max_atoms=1000, max_age_seconds=60)
+            atexit_mock.register.assert_called_once_with(buffer._close_on_exit)
+            buffer.close()
+            buffer.close()
+        assert not buffer.thread.is_alive()
+        atexit_mock.unregister.assert_called_once_with(buffer._close_on_exit)